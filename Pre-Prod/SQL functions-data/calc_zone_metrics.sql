@@ -136,9 +136,11 @@ END;
 $$;
 
 -- Create the trigger
+-- Metrics only depend on present/zone/time, so updates to derived feature columns
+-- (e.g. the recompute_features backfill) don't recompute them row by row
 DROP TRIGGER IF EXISTS trg_orcasighting_zone_metrics ON "data_pipeline_orcasighting";
 CREATE TRIGGER trg_orcasighting_zone_metrics
-AFTER INSERT OR UPDATE OR DELETE ON "data_pipeline_orcasighting"
+AFTER INSERT OR DELETE OR UPDATE OF "present", "zone", "time" ON "data_pipeline_orcasighting"
 FOR EACH ROW
 EXECUTE FUNCTION fn_update_zone_metrics();
 
@@ -1,4 +1,4 @@
-BEGIN;  --run to force update all rows "docker compose exec -T db psql -U orca -d orca_tracker -c 'UPDATE "data_pipeline_orcasighting" SET "zone"="zone";'"
+BEGIN;  --run to force update all rows "docker compose exec -T db psql -U orca -d orca_tracker -c 'UPDATE "data_pipeline_orcasighting" SET "zone"="zone"; UPDATE "data_pipeline_absence" SET "zone"="zone";'"
 
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_orcasighting_zone_time
@@ -31,8 +31,11 @@ BEGIN
     zone_num := NULL;
   END;
 
-  -- Calculate sunUp flag for ALL records
-  IF NEW."time" IS NOT NULL THEN
+  -- sunUp from the monthly table, unless the application supplied it (solar.py writes this
+  -- table's value, or the sun's position at the zone with SOLAR_SUN_UP=1); a changed time
+  -- invalidates a supplied value
+  IF NEW."time" IS NOT NULL
+     AND (NEW."sunUp" IS NULL OR (TG_OP = 'UPDATE' AND NEW."time" IS DISTINCT FROM OLD."time")) THEN
     m := EXTRACT(MONTH FROM NEW."time")::int;
     t_local := (NEW."time")::time;
 
@@ -59,6 +62,16 @@ BEGIN
     NEW."sunUp" := (t_local >= sunrise AND t_local < sunset);
   END IF;
 
+  -- Inserts that already carry the recency features (computed in-process by the ingest
+  -- runs' FeatureEngine) keep them. FeatureEngine only sees its own writes, so it leaves
+  -- them NULL while another ingest run holds the writer advisory lock too
+  -- (feature_engine.register_ingest_writer) and this function computes them instead
+  IF TG_OP = 'INSERT'
+     AND NEW."reportsIn5h" IS NOT NULL AND NEW."reportsIn24h" IS NOT NULL
+     AND NEW."reportsInAdjacentZonesIn5h" IS NOT NULL AND NEW."reportsInAdjacentPlusZonesIn5h" IS NOT NULL THEN
+    RETURN NEW;
+  END IF;
+
   -- Calculate time since last sighting for ALL records (only counts present=TRUE sightings)
   SELECT MAX(os."time") INTO last_sighting_time
   FROM "data_pipeline_orcasighting" os
@@ -142,4 +155,18 @@ BEFORE UPDATE OF "time","zone" ON "data_pipeline_orcasighting"
 FOR EACH ROW
 EXECUTE FUNCTION public.fn_update_orcasighting_recency();
 
+-- Absences (their own table, partitioned by year) get the same features; the function only
+-- touches columns both tables have, and every partition inherits the triggers
+DROP TRIGGER IF EXISTS trg_absence_recency_ins ON "data_pipeline_absence";
+CREATE TRIGGER trg_absence_recency_ins
+BEFORE INSERT ON "data_pipeline_absence"
+FOR EACH ROW
+EXECUTE FUNCTION public.fn_update_orcasighting_recency();
+
+DROP TRIGGER IF EXISTS trg_absence_recency_upd ON "data_pipeline_absence";
+CREATE TRIGGER trg_absence_recency_upd
+BEFORE UPDATE OF "time","zone" ON "data_pipeline_absence"
+FOR EACH ROW
+EXECUTE FUNCTION public.fn_update_orcasighting_recency();
+
 COMMIT;
\ No newline at end of file
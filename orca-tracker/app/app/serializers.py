@@ -16,7 +16,8 @@ class RawReportSerializer(serializers.ModelSerializer):
 class PredictionBatchSerializer(serializers.ModelSerializer):
     class Meta:
         model = dp_models.PredictionBatch
-        fields = '__all__'
+        # The packed buckets are served as buckets
+        exclude = ['compacted']
 
 class PredictionBucketSerializer(serializers.ModelSerializer):
     class Meta:
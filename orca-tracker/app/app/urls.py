@@ -29,5 +29,6 @@ urlpatterns = [
     path('api/sightings/zones/<str:start_date>/<str:end_date>/', app.views.get_sightings_by_zone_count, name='sightings-by-zone-count'),
     path('api/sightings/byhour/<str:start_date>/<str:end_date>/', app.views.get_sightings_count_by_hour, name='sightings-by-hour'),
     path('api/predictions/recent/', app.views.get_predictions_most_recent, name='predictions-most-recent'),
+    path('api/zones/lookup/', app.views.lookup_zones, name='zone-lookup'),
 
 ]
@@ -4,8 +4,13 @@ from rest_framework.decorators import api_view
 from app.serializers import RawReportSerializer, OrcaSightingSerializer,PredictionBatchSerializer, PredictionBucketSerializer, ZonePredictionSerializer
 from django.db.models import Count
 from core.management.commands.generate_predictions import Command
+from data_pipeline.prediction_store import batch_buckets
+from data_pipeline.zone_geometry import NO_ZONE, zone_geometry
 import time
 
+# Most points one zone lookup request may ask about
+MAX_LOOKUP_POINTS = 10000
+
 @api_view(['GET'])
 def get_raw_reports_by_date_range(request, start_date, end_date):
     """Get all raw reports for the date range. Must be in YYYY-MM-DD."""
@@ -60,15 +65,13 @@ def get_predictions_most_recent(request):
         latest_batch = models.PredictionBatch.objects.filter(source_sighting=latest_sighting).order_by('-created_at').first()
     # Serialize the predictions and related data
     batch_serializer = PredictionBatchSerializer(latest_batch)
-    bucket_serializer = PredictionBucketSerializer(models.PredictionBucket.objects.filter(batch=latest_batch).order_by('bucket_start_hour'), many=True)
     
-    # For each bucket, get zone predictions
-    bucket_data = bucket_serializer.data
-    for bucket_item in bucket_data:
-        bucket_id = bucket_item['id']
-        zone_predictions = models.ZonePrediction.objects.filter(bucket_id=bucket_id).order_by('rank')
-        zone_serializer = ZonePredictionSerializer(zone_predictions, many=True)
-        bucket_item['zone_predictions'] = zone_serializer.data
+    # Each bucket with its zone predictions, from the detail rows or the compacted batch
+    bucket_data = []
+    for bucket, zone_predictions in (batch_buckets(latest_batch) if latest_batch else []):
+        bucket_item = PredictionBucketSerializer(bucket).data
+        bucket_item['zone_predictions'] = ZonePredictionSerializer(zone_predictions, many=True).data
+        bucket_data.append(bucket_item)
     
     response_data = {
         'prediction_batch': batch_serializer.data,
@@ -87,4 +90,20 @@ def get_sightings_count_by_hour(request, start_date, end_date):
         .annotate(count=Count('id'))
     )
 
-    return Response(sightings)
\ No newline at end of file
+    return Response(sightings)
+
+@api_view(['GET'])
+def lookup_zones(request):
+    """Zone number containing each point. Takes comma-separated `lat` and `lon` lists of equal length; null where no zone contains the point."""
+    try:
+        lats = [float(v) for v in request.query_params.get('lat', '').split(',')]
+        lons = [float(v) for v in request.query_params.get('lon', '').split(',')]
+    except ValueError:
+        return Response({"error": "lat and lon must be comma-separated numbers."}, status=400)
+    if len(lats) != len(lons):
+        return Response({"error": "lat and lon must have the same number of values."}, status=400)
+    if len(lats) > MAX_LOOKUP_POINTS:
+        return Response({"error": f"At most {MAX_LOOKUP_POINTS} points per request."}, status=400)
+
+    zones = zone_geometry().lookup(lats, lons)
+    return Response({"zones": [None if z == NO_ZONE else int(z) for z in zones]})
@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as CoreUserAdmin
+from data_pipeline.feature_engine import FeatureEngine
 from data_pipeline.prediction_generator import load_models, generate_predictions
 from core import models
 from data_pipeline import models as dp_models
 from data_pipeline.email_retriver import get_emails 
 from data_pipeline.email_processor import process_unprocessed_reports
+from data_pipeline.zone_adjacency import zone_adjacency
 
 class UserAdmin(CoreUserAdmin):
     """Define the admin pages for users."""
@@ -57,11 +59,26 @@ class OrcaSightingAdmin(admin.ModelAdmin):
                       'reportsInAdjacentZonesIn5h', 'reportsInAdjacentPlusZonesIn5h']
     
     def generate_new_predictions(self, request, queryset):
+        features = FeatureEngine()
         for sighting in queryset:
             if sighting.present:
                 load_models()
-                generate_predictions(sighting)
+                generate_predictions(sighting, features)
         self.message_user(request, "New predictions generated for selected sightings.")
+
+
+class AbsenceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'time', 'zone', 'ZoneNumber', 'sunUp']
+    list_display_links = ['id']
+    date_hierarchy = 'time'
+    list_filter = ['ZoneNumber', 'sunUp']
+    search_fields = ['id', 'zone']
+    ordering = ['-time']
+    list_per_page = 50
+    readonly_fields = ['reportsIn5h', 'reportsIn24h', 'reportsInAdjacentZonesIn5h', 'reportsInAdjacentPlusZonesIn5h',
+                       'timeSinceLastSighting']
+
+
 class ZoneAdmin(admin.ModelAdmin):
     list_display = ['zoneNumber', 'name', 'get_adjacent_count', 'get_next_adjacent_count']
     list_display_links = ['zoneNumber', 'name']
@@ -70,11 +87,11 @@ class ZoneAdmin(admin.ModelAdmin):
     filter_horizontal = ['adjacentZones', 'nextAdjacentZones']
     
     def get_adjacent_count(self, obj):
-        return obj.adjacentZones.count()
+        return zone_adjacency().degree(obj.zoneNumber)
     get_adjacent_count.short_description = 'Adjacent Zones'
     
     def get_next_adjacent_count(self, obj):
-        return obj.nextAdjacentZones.count()
+        return zone_adjacency().degree(obj.zoneNumber, next_adjacent=True)
     get_next_adjacent_count.short_description = 'Next Adjacent Zones'
 
 
@@ -102,14 +119,16 @@ class PredictionBatchAdmin(admin.ModelAdmin):
     list_display = ['id', 'source_sighting', 'created_at', 'model_version', 'overall_confidence', 'get_bucket_count']
     list_display_links = ['id']
     date_hierarchy = 'created_at'
-    list_filter = ['created_at', 'model_version', 'overall_confidence']
+    list_filter = ['created_at', 'model_version', 'overall_confidence', ('compacted', admin.EmptyFieldListFilter)]
     search_fields = ['id', 'source_sighting__id', 'source_sighting__zone']
     ordering = ['-created_at']
     list_per_page = 25
     inlines = [PredictionBucketInline]
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'compacted']
     
     def get_bucket_count(self, obj):
+        if obj.compacted is not None:
+            return len(obj.compacted['buckets'])
         return obj.buckets.count()
     get_bucket_count.short_description = 'Time Buckets'
 
@@ -169,6 +188,7 @@ class ZoneEffortAdmin(admin.ModelAdmin):
 admin.site.register(models.User, UserAdmin)
 admin.site.register(dp_models.RawReport, RawReportAdmin)
 admin.site.register(dp_models.OrcaSighting, OrcaSightingAdmin)
+admin.site.register(dp_models.Absence, AbsenceAdmin)
 admin.site.register(dp_models.Zone, ZoneAdmin)
 
 # Register the prediction models
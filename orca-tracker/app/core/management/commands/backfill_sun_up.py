@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from core.management.commands.recompute_features import _parse_date
+from data_pipeline.solar import BACKFILL_BATCH_SIZE, backfill_sun_up
+
+class Command(BaseCommand):
+    help = 'Recompute sunUp for stored sightings and absences (from the sun\'s position at each zone centroid with SOLAR_SUN_UP=1)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, help='First day to backfill, YYYY-MM-DD UTC (default: all)')
+        parser.add_argument('--end', type=str, help='Day to stop before, YYYY-MM-DD UTC (default: all)')
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Rows per update statement')
+        parser.add_argument('--only-missing', action='store_true', help='Only rows where sunUp is NULL')
+
+    def handle(self, *args, **options):
+        stats = backfill_sun_up(
+            start=_parse_date(options['start']) if options['start'] else None,
+            end=_parse_date(options['end']) if options['end'] else None,
+            batch_size=options['batch_size'],
+            only_missing=options['only_missing'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {stats['checked']} sightings in {stats['elapsed']:.1f}s: {stats['updated']} sunUp values changed"
+        ))
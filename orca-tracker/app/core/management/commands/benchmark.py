@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from data_pipeline.benchmarks import SUITES
+
+class Command(BaseCommand):
+    help = 'Run a data pipeline benchmark suite and print the timings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES), help='Benchmark suite to run')
+        parser.add_argument('--size', type=int, default=None, help='Problem size (suite specific)')
+        parser.add_argument('--path', default=None, help='Input folder for suites that read files (e.g. encoding)')
+
+    def handle(self, *args, **options):
+        bench = SUITES[options['suite']]
+        kwargs = {key: options[key] for key in ('size', 'path') if options[key]}
+        lines = bench(**kwargs)
+        for line in lines:
+            self.stdout.write(line)
@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand
+from data_pipeline.report_prefilter import evaluate_prefilter, labeled_holdout_sample
+
+class Command(BaseCommand):
+    help = 'Measure precision/recall of the orca pre-filter against a labeled sample of reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--labels',
+            type=str,
+            help='JSONL file of {"body": ..., "has_orca": true/false}; defaults to the pre-filter hold-out '
+                 '(reports sent to the LLM whatever the pre-filter said, labeled by their cached extraction)'
+        )
+        parser.add_argument('--limit', type=int, default=2000, help='Max hold-out reports to sample (default 2000)')
+
+    def handle(self, *args, **options):
+        if options['labels']:
+            with open(options['labels'], encoding='utf-8') as f:
+                samples = [(row['body'], bool(row['has_orca'])) for row in map(json.loads, f) if row]
+        else:
+            samples = labeled_holdout_sample(options['limit'])
+
+        if not samples:
+            self.stdout.write(self.style.WARNING('No labeled reports to evaluate'))
+            return
+
+        stats = evaluate_prefilter(samples)
+        self.stdout.write(
+            f"Pre-filter on {stats['total']} reports: precision {stats['precision']:.1%}, recall {stats['recall']:.1%}"
+        )
+        self.stdout.write(
+            f"  sent to LLM: {stats['tp'] + stats['fp']} ({stats['tp']} with sightings), "
+            f"skipped: {stats['avoided']} ({stats['fn']} missed sightings)"
+        )
+        self.stdout.write(f"  LLM calls avoided: {stats['avoided'] / stats['total']:.1%}")
@@ -1,17 +1,19 @@
 from datetime import datetime
 from typing import Optional
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
-from django.db.models import Min, Max, Q
+from django.db.models import Min, Max
 
-from data_pipeline.models import OrcaSighting
-from data_pipeline.report_absence_gen import generate_absence_reports_two_phase
+from data_pipeline.models import Absence, OrcaSighting
+from data_pipeline.report_absence_gen import (
+    generate_absence_reports_incremental, generate_absence_reports_single_phase, generate_absence_reports_two_phase,
+)
 
 class Command(BaseCommand):
     help = (
-        "Generate absence reports (present=False) historically in hourly buckets, "
+        "Generate absence reports (the Absence table) historically in hourly buckets, "
         "maintaining a global 1:3 sightings:absences ratio with effort×seasonality weighting."
     )
 
@@ -20,6 +22,18 @@ class Command(BaseCommand):
         parser.add_argument("--end", type=str, default=None, help="ISO datetime (e.g., 2024-12-31T23:00:00)")
         parser.add_argument("--step-hours", type=int, default=1, help="Bucket step in hours (default 1)")
         parser.add_argument("--debug", action="store_true", help="Show diagnostic information")
+        parser.add_argument(
+            "--single-phase", action="store_true",
+            help="Sample the kept absences before inserting instead of inserting all eligible ones and downsampling",
+        )
+        parser.add_argument(
+            "--incremental", action="store_true",
+            help="Only generate for the hours after the last full or incremental run, topping up to the 1:3 ratio",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Processes to compute eligibility in, one calendar month at a time (default 1)",
+        )
 
     def handle(self, *args, **options):
         start: Optional[str] = options["start"]
@@ -41,17 +55,16 @@ class Command(BaseCommand):
         if debug:
             # Show current counts and ratio
             total_present = OrcaSighting.objects.filter(present=True).count()
-            total_absent = OrcaSighting.objects.filter(present=False).count()
+            total_absent = Absence.objects.count()
             target_absent = 3 * total_present
             remaining = max(0, target_absent - total_absent)
             
             # Show date ranges - use Q objects for filters
-            bounds = OrcaSighting.objects.aggregate(
-                min_present=Min("time", filter=Q(present=True)),
-                max_present=Max("time", filter=Q(present=True)),
-                min_absent=Min("time", filter=Q(present=False)),
-                max_absent=Max("time", filter=Q(present=False))
+            bounds = OrcaSighting.objects.filter(present=True).aggregate(
+                min_present=Min("time"),
+                max_present=Max("time"),
             )
+            bounds.update(Absence.objects.aggregate(min_absent=Min("time"), max_absent=Max("time")))
             
             self.stdout.write(f"Current Stats:")
             self.stdout.write(f"  Present sightings: {total_present}")
@@ -72,12 +85,24 @@ class Command(BaseCommand):
         def progress_callback(message: str):
             self.stdout.write(f"[Progress] {message}")
 
-        buckets, generated, kept, deleted = generate_absence_reports_two_phase(
-            start=start_dt, 
-            end=end_dt, 
-            step_hours=step_hours,
-            progress_callback=progress_callback
-        )
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        if options["incremental"]:
+            if start or end or step_hours != 1 or options["single_phase"] or options["workers"] != 1:
+                raise CommandError(
+                    "--incremental can't be combined with --start, --end, --step-hours, --single-phase or --workers"
+                )
+            buckets, generated, kept, deleted = generate_absence_reports_incremental(progress_callback=progress_callback)
+        else:
+            generate = generate_absence_reports_single_phase if options["single_phase"] else generate_absence_reports_two_phase
+            buckets, generated, kept, deleted = generate(
+                start=start_dt, 
+                end=end_dt, 
+                step_hours=step_hours,
+                progress_callback=progress_callback,
+                workers=options["workers"],
+            )
         
         self.stdout.write(self.style.SUCCESS(
             f"Generation complete:\n"
@@ -1,15 +1,31 @@
 from django.core.management.base import BaseCommand
 #this command fetches text reports from emails and stores them in the database
 from data_pipeline.email_retriver import get_emails
-from data_pipeline.email_processor import process_unprocessed_reports
+from data_pipeline.email_processor import process_unprocessed_reports, process_unprocessed_reports_concurrent
 
 class Command(BaseCommand):
     help = 'Fetch and store raw email reports'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of LLM extractions in flight; above 1 uses per-report commits (default 1)'
+        )
+        parser.add_argument(
+            '--pack',
+            action='store_true',
+            help='Group short reports into shared LLM requests (uses the concurrent path)'
+        )
+
     def handle(self, *args, **kwargs):
         self.stdout.write('Fetching email reports...')
         
         get_emails()        
         self.stdout.write(self.style.SUCCESS('Successfully fetched and stored email reports.'))
-        process_unprocessed_reports()
+        if kwargs.get('concurrency', 1) > 1 or kwargs.get('pack'):
+            process_unprocessed_reports_concurrent(concurrency=kwargs['concurrency'], pack=kwargs['pack'])
+        else:
+            process_unprocessed_reports()
         self.stdout.write(self.style.SUCCESS('Successfully processed unprocessed reports.'))
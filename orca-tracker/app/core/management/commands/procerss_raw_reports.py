@@ -1,9 +1,28 @@
 import os
 from django.core.management.base import BaseCommand
-from data_pipeline.email_processor import process_unprocessed_reports
+from data_pipeline.email_processor import process_unprocessed_reports, process_unprocessed_reports_concurrent
 
 class Command(BaseCommand):
     help = 'Process unprocessed email reports'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='Max reports to process (default 25)')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of LLM extractions in flight; above 1 uses per-report commits (default 1)'
+        )
+        parser.add_argument(
+            '--pack',
+            action='store_true',
+            help='Group short reports into shared LLM requests (uses the concurrent path)'
+        )
+
     def handle(self, *args, **options):
-        process_unprocessed_reports()
\ No newline at end of file
+        if options['concurrency'] > 1 or options['pack']:
+            process_unprocessed_reports_concurrent(
+                limit=options['limit'], concurrency=options['concurrency'], pack=options['pack']
+            )
+        else:
+            process_unprocessed_reports(limit=options['limit'])
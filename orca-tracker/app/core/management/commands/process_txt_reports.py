@@ -1,6 +1,8 @@
 import os
 from django.core.management.base import BaseCommand
 from data_pipeline.email_processor import process_txt_files_from_nested_folders
+from data_pipeline.batch_extraction import run_batch_backfill
+from data_pipeline.txt_ingest import format_stage_throughput, ingest_txt_folder_parallel
 
 class Command(BaseCommand):
     help = 'Process raw text reports from a folder'
@@ -18,6 +20,36 @@ class Command(BaseCommand):
             help='Move processed files to processed subfolder',
             default=True
         )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Backfill through the offline batch API instead of one chat completion per file'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=30.0,
+            help='Seconds between batch status checks (default 30)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=None,
+            help='Stop waiting on batch jobs after this many seconds; rerun to resume'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Ingest in parallel with this many threads for file reads and LLM calls; '
+                 'files stay in place and a manifest skips unchanged ones on reruns'
+        )
+        parser.add_argument(
+            '--manifest',
+            type=str,
+            default=None,
+            help='Manifest path for --workers (default: <folder>/.ingest_manifest.json)'
+        )
 
     def handle(self, *args, **options):
         folder_path = options['folder']
@@ -32,7 +64,27 @@ class Command(BaseCommand):
         self.stdout.write(f'Processing text reports from: {folder_path}')
         
         try:
-            process_txt_files_from_nested_folders(folder_path, move_processed=move_processed)
+            if options['batch']:
+                summary = run_batch_backfill(
+                    folder_path, poll_interval=options['poll_interval'], timeout=options['timeout'],
+                    move_processed=move_processed
+                )
+                self.stdout.write(
+                    f"Batch backfill: {summary['applied']} reports, {summary['sightings']} sightings, "
+                    f"{summary['failed']} failed, {summary['moved']} files moved"
+                )
+            elif options['workers'] > 0:
+                stats = ingest_txt_folder_parallel(
+                    folder_path, workers=options['workers'], manifest_path=options['manifest']
+                )
+                self.stdout.write(
+                    f"Parallel ingest: {stats['ingested']} files, {stats['sightings']} sightings, "
+                    f"{stats['unchanged']} unchanged, {stats['failed']} failed"
+                )
+                for line in format_stage_throughput(stats):
+                    self.stdout.write(line)
+            else:
+                process_txt_files_from_nested_folders(folder_path, move_processed=move_processed)
             self.stdout.write(self.style.SUCCESS('Successfully processed text reports.'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error processing text reports: {e}'))
\ No newline at end of file
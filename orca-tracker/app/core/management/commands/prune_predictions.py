@@ -0,0 +1,37 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from data_pipeline.prediction_store import compact_batches, thin_batches
+
+class Command(BaseCommand):
+    help = (
+        'Apply the prediction retention policy: batches for recent sightings keep their bucket and zone rows, '
+        'older ones are compacted to one row and, optionally, thinned to one batch per window'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--detail-days', type=int, default=30,
+                            help='Keep full detail for batches whose sighting is newer than this (default 30)')
+        parser.add_argument('--sample-days', type=int, default=None,
+                            help='Thin batches whose sighting is older than this (default: never)')
+        parser.add_argument('--sample-hours', type=int, default=24,
+                            help='Keep one batch per this many hours when thinning (default 24)')
+
+    def handle(self, *args, **options):
+        if options['detail_days'] < 0 or options['sample_hours'] <= 0:
+            raise CommandError("--detail-days must be >= 0 and --sample-hours > 0")
+        if options['sample_days'] is not None and options['sample_days'] < options['detail_days']:
+            raise CommandError("--sample-days must be >= --detail-days")
+        now = timezone.now()
+
+        if options['sample_days'] is not None:
+            deleted = thin_batches(now - timedelta(days=options['sample_days']), timedelta(hours=options['sample_hours']))
+            self.stdout.write(
+                f"Thinned batches older than {options['sample_days']} days to one per "
+                f"{options['sample_hours']}h: {deleted} deleted"
+            )
+
+        compacted = compact_batches(now - timedelta(days=options['detail_days']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {compacted} batches older than {options['detail_days']} days"
+        ))
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from data_pipeline.feature_recompute import recompute_features, verify_features
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}' - use YYYY-MM-DD")
+
+class Command(BaseCommand):
+    help = 'Recompute the trigger-maintained recency features (reportsIn5h, ..., timeSinceLastSighting) for a time range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, help='First day to recompute, YYYY-MM-DD UTC (default: first sighting)')
+        parser.add_argument('--end', type=str, help='Day to stop before, YYYY-MM-DD UTC (default: after the last sighting)')
+        parser.add_argument('--chunk-months', type=int, default=1, help='Calendar months per statement (default 1)')
+        parser.add_argument(
+            '--verify',
+            type=int,
+            nargs='?',
+            const=1000,
+            default=None,
+            help='Afterwards check this many rows (default 1000) against the trigger\'s per-row queries'
+        )
+
+    def handle(self, *args, **options):
+        start = _parse_date(options['start']) if options['start'] else None
+        end = _parse_date(options['end']) if options['end'] else None
+
+        stats = recompute_features(start, end, chunk_months=options['chunk_months'])
+        self.stdout.write(
+            f"Recomputed {stats['chunks']} chunks in {stats['elapsed']:.1f}s: {stats['updated']} rows changed"
+        )
+
+        if options['verify']:
+            result = verify_features(start, end, limit=options['verify'])
+            if result['mismatched']:
+                self.stdout.write(self.style.ERROR(
+                    f"{len(result['mismatched'])} of {result['checked']} rows differ from the trigger: "
+                    f"{result['mismatched'][:20]}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"All {result['checked']} checked rows match the trigger"))
@@ -0,0 +1,58 @@
+import os
+from django.core.management.base import BaseCommand
+from data_pipeline.email_processor import EXTRACTION_CONCURRENCY
+from data_pipeline.ingest_pipeline import PIPELINE_QUEUE_SIZE, format_pipeline_summary, run_ingest_pipeline
+
+class Command(BaseCommand):
+    help = 'Stream reports through discover -> fetch/read -> dedupe -> extract -> persist with checkpointing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', choices=['txt', 'email'], help='Where reports come from')
+        parser.add_argument(
+            '--folder',
+            type=str,
+            default='Raw_text_reports',
+            help='Archive folder for the txt source (default: ../Raw_text_reports)'
+        )
+        parser.add_argument('--workers', type=int, default=EXTRACTION_CONCURRENCY, help='Extraction threads')
+        parser.add_argument('--read-workers', type=int, default=4, help='File read / message fetch threads')
+        parser.add_argument(
+            '--queue-size',
+            type=int,
+            default=PIPELINE_QUEUE_SIZE,
+            help='Items each stage may have waiting before upstream stages block'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=None,
+            help='Checkpoint file (txt default: <folder>/.pipeline_checkpoint.jsonl; email: none)'
+        )
+        parser.add_argument(
+            '--report-interval',
+            type=float,
+            default=30.0,
+            help='Seconds between queue depth / throughput log lines'
+        )
+
+    def handle(self, *args, **options):
+        folder_path = options['folder']
+        if options['source'] == 'txt' and not os.path.isabs(folder_path):
+            # Same resolution as process_txt_reports
+            current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+            folder_path = os.path.join(current_dir, folder_path)
+
+        summary = run_ingest_pipeline(
+            options['source'],
+            base_folder_path=folder_path,
+            workers=options['workers'],
+            read_workers=options['read_workers'],
+            queue_size=options['queue_size'],
+            checkpoint_path=options['checkpoint'],
+            report_interval=options['report_interval'],
+        )
+        for line in format_pipeline_summary(summary):
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f"Pipeline finished: {summary['reports']} reports, {summary['sightings']} sightings."
+        ))
@@ -5,6 +5,7 @@ from unittest.mock import patch
 from psycopg2 import OperationalError as Pyscopg2Error
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
@@ -24,4 +25,10 @@ class commandsTests(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 11)
         patched_check.assert_called_with(databases=['default'])
-    
+
+
+class prunePredictionsTests(SimpleTestCase):
+
+    def test_sample_days_before_detail_days(self):
+        with self.assertRaisesMessage(CommandError, "--sample-days"):
+            call_command('prune_predictions', '--detail-days', '30', '--sample-days', '7')
@@ -0,0 +1,38 @@
+"""
+Generated absences in their own table.
+
+Absences used to be OrcaSighting rows with present=False, three for every real sighting,
+carrying every nullable sighting column; each present-only query and index stepped over
+them. They now live in the narrow Absence table (time, zone, zone number, the recency
+features and sunUp), range-partitioned by year on `time`, so queries on the sightings only
+see sightings and the generator's time-range reads only open the years they ask for.
+
+Rows outside every yearly partition go to the DEFAULT partition. ensure_absence_partitions()
+creates the yearly partitions a batch needs before it is written, moving rows already in the
+default partition for those years across. TRAINING_VIEW unions the sightings with the
+absences in OrcaSighting's old column layout for training exports.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+ABSENCE_TABLE = "data_pipeline_absence"
+DEFAULT_PARTITION = "data_pipeline_absence_default"
+TRAINING_VIEW = "data_pipeline_training_sightings"
+
+
+def ensure_absence_partitions(times: Iterable[datetime]) -> int:
+    """Create the yearly (UTC) partitions `times` fall in that don't exist yet; returns how many were created."""
+    years = sorted({when.astimezone(dt_timezone.utc).year for when in times})
+    if not years:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT fn_add_absence_partition(year) FROM unnest(%s::integer[]) year", [years])
+        created = sum(made for made, in cursor.fetchall())
+    if created:
+        logger.info(f"Created {created} absence partitions for {years[0]}-{years[-1]}")
+    return created
@@ -0,0 +1,433 @@
+"""
+Offline batch extraction for historical backfills.
+
+Instead of one synchronous chat completion per archive file, pending reports are
+packaged into JSONL batch job files, submitted through a BatchClient, polled until
+the provider finishes, and the results are mapped back onto RawReport rows by
+messageId. Applying results is idempotent - reports already processed are skipped -
+so a crashed run can simply be started again.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .email_processor import (
+    ExtractionError,
+    ZoneRegistry,
+    _chat_request,
+    _extraction_cache_key,
+    _iter_txt_month_folders,
+    _log_cache_summary,
+    _lookup_cached_sightings,
+    _parse_sightings_content,
+    _persist_report_sightings,
+    _prefiltered,
+    _store_cached_sightings,
+    _txt_message_id,
+    _txt_subject,
+    get_openai_client,
+    read_file_with_encoding_detection,
+)
+from .feature_engine import FeatureEngine
+from .models import ExtractionBatchJob, RawReport
+from .report_chunking import archive_period, merge_sightings, split_report_body
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+ARCHIVE_MESSAGE_PREFIX = "txt_file_"
+# custom_id of one chunk of a large report: "<messageId>#chunk<i>/<n>"
+CHUNK_ID_SEPARATOR = "#chunk"
+# Provider limits are 50k requests / 200 MB per input file - stay a little under
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_BYTES = 190 * 1024 * 1024
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+FAILED_STATUSES = {"failed", "expired", "cancelled"}
+
+
+class BatchClient(ABC):
+    """Interface for batch providers - submit a JSONL job file, poll it, download its output."""
+
+    @abstractmethod
+    def submit(self, jsonl_path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        """Upload a job file and start the job; returns the provider's batch id."""
+
+    @abstractmethod
+    def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        """Return at least {"status": ..., "output_file_id": ..., "error_file_id": ...} for a submitted job."""
+
+    @abstractmethod
+    def download(self, file_id: str) -> str:
+        """The text of an output file."""
+
+
+class OpenAIBatchClient(BatchClient):
+    """Batch client for the OpenAI Batch API (or anything speaking it, like LocalOpenAIServer)."""
+
+    def __init__(self, client=None):
+        self.client = client or get_openai_client()
+
+    def submit(self, jsonl_path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        with open(jsonl_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata=metadata,
+        )
+        return batch.id
+
+    def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        batch = self.client.batches.retrieve(batch_id)
+        return {"status": batch.status, "output_file_id": batch.output_file_id, "error_file_id": batch.error_file_id}
+
+    def download(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+
+def ingest_txt_reports(base_folder_path: str, year_filter: List[int] = None, month_filter: List[str] = None):
+    """
+    Create unprocessed RawReport rows for every archive file not already stored.
+    Returns (reports_created, encoding_issues).
+    """
+    created = 0
+    encoding_issues = 0
+    for year_folder, month_folder, month_path, txt_files in _iter_txt_month_folders(
+        base_folder_path, year_filter, month_filter
+    ):
+        files_by_id = {_txt_message_id(year_folder, month_folder, f): f for f in txt_files}
+        # One existence query per month instead of one per file
+        existing = set(RawReport.objects.filter(messageId__in=files_by_id).values_list("messageId", flat=True))
+
+        new_reports = []
+        for message_id, filename in files_by_id.items():
+            if message_id in existing:
+                continue
+            try:
+                content = read_file_with_encoding_detection(os.path.join(month_path, filename))
+            except Exception as e:
+                logger.error(f"Failed to read {year_folder}/{month_folder}/{filename}: {e}")
+                encoding_issues += 1
+                continue
+            new_reports.append(RawReport(
+                messageId=message_id,
+                subject=_txt_subject(year_folder, month_folder, filename),
+                sender="orca_network_archive",
+                body=content,
+                processed=False,
+            ))
+        RawReport.objects.bulk_create(new_reports, ignore_conflicts=True)
+        created += len(new_reports)
+    return created, encoding_issues
+
+
+def _in_flight_message_ids() -> set:
+    """messageIds belonging to jobs that are still running or whose results are not yet applied."""
+    in_flight = set()
+    active = ExtractionBatchJob.objects.filter(applied_at__isnull=True).exclude(status__in=FAILED_STATUSES)
+    for message_ids in active.values_list("message_ids", flat=True):
+        in_flight.update(message_ids)
+    return in_flight
+
+
+def pending_archive_reports() -> QuerySet:
+    """Unprocessed archive reports that are not already part of an active batch job."""
+    return (
+        RawReport.objects.filter(processed=False, messageId__startswith=ARCHIVE_MESSAGE_PREFIX)
+        .exclude(messageId__in=_in_flight_message_ids())
+        .order_by("id")
+    )
+
+
+def _batch_lines(report: RawReport) -> List[str]:
+    """Job file lines for a report - one per date-segmented chunk for large bodies."""
+    expected_month, expected_year = archive_period(report.messageId)
+    chunks = split_report_body(report.body, expected_month=expected_month, expected_year=expected_year)
+    custom_ids = [report.messageId] if len(chunks) == 1 else [
+        f"{report.messageId}{CHUNK_ID_SEPARATOR}{i}/{len(chunks)}" for i in range(1, len(chunks) + 1)
+    ]
+    return [
+        json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": _chat_request(chunk)})
+        for custom_id, chunk in zip(custom_ids, chunks)
+    ]
+
+
+def _parse_custom_id(custom_id: str):
+    """Return (messageId, chunk number, chunk count) for a result line's custom_id."""
+    message_id, sep, part = (custom_id or "").rpartition(CHUNK_ID_SEPARATOR)
+    if sep:
+        index, _, total = part.partition("/")
+        if index.isdigit() and total.isdigit():
+            return message_id, int(index), int(total)
+    return custom_id, 1, 1
+
+
+def submit_batch_extraction(client: BatchClient, reports: Optional[Iterable[RawReport]] = None,
+                            cache_stats: Optional[Dict[str, int]] = None,
+                            work_dir: Optional[str] = None) -> List[ExtractionBatchJob]:
+    """
+    Package reports into batch job files and submit them.
+    Reports the pre-filter rules out or with a cached extraction are applied immediately
+    instead of being submitted.
+    """
+    if reports is None:
+        reports = pending_archive_reports()
+    if cache_stats is None:
+        cache_stats = {"hits": 0, "misses": 0}
+    if isinstance(reports, QuerySet):
+        reports = reports.iterator(chunk_size=500)
+
+    zones = ZoneRegistry()
+    jobs: List[ExtractionBatchJob] = []
+    chunk: List[RawReport] = []
+    chunk_lines: List[str] = []
+    chunk_bytes = 0
+
+    def flush():
+        nonlocal chunk_bytes
+        if chunk:
+            jobs.append(_submit_chunk(client, chunk, chunk_lines, work_dir))
+            chunk.clear()
+            chunk_lines.clear()
+            chunk_bytes = 0
+
+    def queue(report: RawReport):
+        nonlocal chunk_bytes
+        # All lines of one report go into the same job file
+        lines = _batch_lines(report)
+        size = sum(len(line.encode("utf-8")) + 1 for line in lines)
+        if chunk and (len(chunk_lines) + len(lines) > BATCH_MAX_REQUESTS or chunk_bytes + size > BATCH_MAX_BYTES):
+            flush()
+        chunk.append(report)
+        chunk_lines.extend(lines)
+        chunk_bytes += size
+
+    def route(group: List[RawReport]):
+        # Pre-filtered reports and cache hits are applied straight away - only misses go into the job file
+        remaining = []
+        for report in group:
+            if _prefiltered(report.body, cache_stats):
+                _persist_report_sightings(report, [], zones)
+            else:
+                remaining.append(report)
+        keys = {report.id: _extraction_cache_key(report.body) for report in remaining}
+        cached = _lookup_cached_sightings(keys.values())
+        for report in remaining:
+            sightings = cached.get(keys[report.id])
+            if sightings is not None:
+                cache_stats["hits"] += 1
+                _persist_report_sightings(report, sightings, zones)
+            else:
+                cache_stats["misses"] += 1
+                queue(report)
+
+    group: List[RawReport] = []
+    for report in reports:
+        group.append(report)
+        if len(group) >= 500:
+            route(group)
+            group = []
+    route(group)
+    flush()
+    return jobs
+
+
+def _submit_chunk(client: BatchClient, reports: List[RawReport], lines: List[str],
+                  work_dir: Optional[str]) -> ExtractionBatchJob:
+    fd, path = tempfile.mkstemp(prefix="orca_batch_", suffix=".jsonl", dir=work_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+        batch_id = client.submit(path, metadata={"purpose": "orca archive backfill"})
+    finally:
+        os.remove(path)
+    job = ExtractionBatchJob.objects.create(batch_id=batch_id, message_ids=[r.messageId for r in reports])
+    logger.info(f"Submitted batch {batch_id} with {len(reports)} reports")
+    return job
+
+
+def wait_for_batch_jobs(client: BatchClient, jobs: Optional[List[ExtractionBatchJob]] = None,
+                        poll_interval: float = 30.0, timeout: Optional[float] = None) -> List[ExtractionBatchJob]:
+    """Poll jobs until every one reaches a terminal status or the timeout elapses."""
+    if jobs is None:
+        jobs = list(ExtractionBatchJob.objects.filter(applied_at__isnull=True).exclude(status__in=FAILED_STATUSES))
+    deadline = time.monotonic() + timeout if timeout else None
+    pending = [job for job in jobs if job.status not in TERMINAL_STATUSES]
+
+    while pending:
+        for job in list(pending):
+            info = client.retrieve(job.batch_id)
+            if info["status"] != job.status:
+                job.status = info["status"]
+                job.output_file_id = info.get("output_file_id")
+                job.error_file_id = info.get("error_file_id")
+                if job.status in TERMINAL_STATUSES:
+                    job.completed_at = timezone.now()
+                job.save(update_fields=["status", "output_file_id", "error_file_id", "completed_at"])
+                logger.info(f"Batch {job.batch_id} is {job.status}")
+            if job.status in TERMINAL_STATUSES:
+                pending.remove(job)
+        if not pending:
+            break
+        if deadline and time.monotonic() >= deadline:
+            logger.warning(f"Stopped waiting with {len(pending)} batch job(s) still running - rerun to resume")
+            break
+        time.sleep(poll_interval)
+    return jobs
+
+
+def apply_batch_results(job: ExtractionBatchJob, client: BatchClient) -> Dict[str, int]:
+    """
+    Map a completed job's output and error files back onto its RawReports.
+    Safe to call repeatedly - reports that are already processed are left alone, and
+    reports whose request failed stay unprocessed so the next submission retries them.
+    The job is marked applied even when every request failed (only an error file), so
+    its reports go back into the pending pool.
+    """
+    stats = {"applied": 0, "sightings": 0, "failed": 0, "skipped": 0}
+    if job.status != "completed":
+        logger.warning(f"Batch {job.batch_id} is {job.status} - nothing to apply")
+        return stats
+    if not job.output_file_id:
+        logger.warning(f"Batch {job.batch_id} completed without an output file - every request failed")
+
+    reports = {r.messageId: r for r in RawReport.objects.filter(messageId__in=job.message_ids)}
+    zones = ZoneRegistry()
+    features = FeatureEngine()
+    # messageId -> {chunk number: sightings}; a report is applied once all its chunks are in
+    parts: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+    expected: Dict[str, int] = {}
+    failed = set()
+    lines = []
+    for file_id in (job.output_file_id, job.error_file_id):
+        if file_id:
+            lines.extend(client.download(file_id).splitlines())
+    for line in lines:
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        message_id, index, total = _parse_custom_id(result.get("custom_id"))
+        report = reports.get(message_id)
+        if report is None:
+            logger.warning(f"Batch {job.batch_id} returned unknown custom_id {result.get('custom_id')}")
+            continue
+        expected[message_id] = total
+
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            logger.warning(f"Batch request {result.get('custom_id')} failed: {result.get('error')}")
+            failed.add(message_id)
+            continue
+        try:
+            sightings = _parse_sightings_content(response["body"]["choices"][0]["message"]["content"])
+        except (ExtractionError, KeyError, IndexError, TypeError) as e:
+            logger.warning(f"Unusable batch result for {result.get('custom_id')}: {e}")
+            failed.add(message_id)
+            continue
+        parts.setdefault(message_id, {})[index] = sightings
+
+    for message_id, total in expected.items():
+        report = reports[message_id]
+        if report.processed:
+            stats["skipped"] += 1
+            continue
+        received = parts.get(message_id, {})
+        if message_id in failed or len(received) != total:
+            # Partial results are dropped - the report stays unprocessed and is resubmitted whole
+            stats["failed"] += 1
+            continue
+        sightings = received[1] if total == 1 else merge_sightings(received[i] for i in sorted(received))
+        _store_cached_sightings(_extraction_cache_key(report.body), sightings)
+        stats["sightings"] += _persist_report_sightings(report, sightings, zones, features)
+        stats["applied"] += 1
+
+    job.applied_at = timezone.now()
+    job.save(update_fields=["applied_at"])
+    logger.info(
+        f"Batch {job.batch_id}: applied {stats['applied']} reports ({stats['sightings']} sightings), "
+        f"{stats['failed']} failed, {stats['skipped']} already processed"
+    )
+    return stats
+
+
+def move_processed_files(base_folder_path: str, year_filter: List[int] = None,
+                         month_filter: List[str] = None) -> int:
+    """
+    Move archive files whose report has been processed into their month's "processed"
+    folder, as the per-file path does. Files still pending (or failed) stay put so a rerun
+    picks them up. Returns the number of files moved.
+    """
+    moved = 0
+    for year_folder, month_folder, month_path, txt_files in _iter_txt_month_folders(
+        base_folder_path, year_filter, month_filter
+    ):
+        files_by_id = {_txt_message_id(year_folder, month_folder, f): f for f in txt_files}
+        done = RawReport.objects.filter(messageId__in=files_by_id, processed=True).values_list("messageId", flat=True)
+        processed_folder = os.path.join(month_path, "processed")
+        for message_id in done:
+            os.makedirs(processed_folder, exist_ok=True)
+            filename = files_by_id[message_id]
+            os.rename(os.path.join(month_path, filename), os.path.join(processed_folder, filename))
+            moved += 1
+    if moved:
+        logger.info(f"Moved {moved} processed archive files")
+    return moved
+
+
+def run_batch_backfill(base_folder_path: Optional[str] = None, client: Optional[BatchClient] = None,
+                       year_filter: List[int] = None, month_filter: List[str] = None,
+                       poll_interval: float = 30.0, timeout: Optional[float] = None,
+                       reports: Optional[Iterable[RawReport]] = None, resume: bool = True,
+                       move_processed: bool = False) -> Dict[str, Any]:
+    """
+    Backfill archive reports through the batch API: ingest files, submit pending
+    reports, wait for every active job, then apply the results. With resume set, jobs
+    left running by an earlier run are waited on and applied too. With move_processed,
+    files whose report was applied are then moved into their "processed" folder.
+    Returns a summary including end-to-end throughput.
+    """
+    client = client or OpenAIBatchClient()
+    started = time.monotonic()
+    summary: Dict[str, Any] = {"ingested": 0, "jobs": 0, "applied": 0, "sightings": 0, "failed": 0, "moved": 0}
+    cache_stats = {"hits": 0, "misses": 0}
+
+    if base_folder_path:
+        if not os.path.exists(base_folder_path):
+            logger.error(f"Base folder does not exist: {base_folder_path}")
+            return summary
+        summary["ingested"], encoding_issues = ingest_txt_reports(base_folder_path, year_filter, month_filter)
+        if encoding_issues:
+            logger.warning(f"Encoding issues encountered in {encoding_issues} files")
+
+    submitted = submit_batch_extraction(client, reports, cache_stats)
+    summary["jobs"] = len(submitted)
+    summary["applied"] += cache_stats["hits"] + cache_stats.get("prefiltered", 0)
+
+    jobs = None if resume else submitted
+    for job in wait_for_batch_jobs(client, jobs, poll_interval=poll_interval, timeout=timeout):
+        if job.status == "completed" and job.applied_at is None:
+            stats = apply_batch_results(job, client)
+            summary["applied"] += stats["applied"]
+            summary["sightings"] += stats["sightings"]
+            summary["failed"] += stats["failed"]
+
+    if base_folder_path and move_processed:
+        summary["moved"] = move_processed_files(base_folder_path, year_filter, month_filter)
+
+    summary["elapsed"] = time.monotonic() - started
+    summary["reports_per_second"] = summary["applied"] / max(summary["elapsed"], 1e-6)
+    logger.info(
+        f"Batch backfill complete! Reports: {summary['applied']}, Sightings: {summary['sightings']}, "
+        f"Failed: {summary['failed']}, {summary['reports_per_second']:.2f} reports/s"
+    )
+    _log_cache_summary(cache_stats)
+    return summary
@@ -0,0 +1,708 @@
+"""
+Benchmarks for the data pipeline, run with `python manage.py benchmark <suite>`.
+
+Every suite returns printable result lines. Suites that write to the database run
+inside a transaction that is rolled back, so they are safe against a dev database.
+"""
+import json
+import os
+import random
+import re
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+import chardet
+import numpy as np
+import openai
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from app import views as api_views
+from . import email_processor
+from .absence_store import ensure_absence_partitions
+from .bulk_load import copy_rows, copy_sightings
+from .batch_extraction import OpenAIBatchClient, run_batch_backfill
+from .feature_recompute import recompute_features, verify_features
+from .solar import DEFAULT_CENTROID, sun_up, table_sun_up
+from .zone_geometry import NO_ZONE, ZoneGeometry, _points_in_edges, parse_boundary, polygon_edges
+from .local_openai_server import LocalOpenAIServer
+from .prediction_store import compact_batches
+from .models import Absence, OrcaSighting, PredictionBatch, PredictionBucket, RawReport, Zone, ZonePrediction
+from .weight_store import WeightStore
+from .zone_adjacency import zone_adjacency
+from .report_absence_gen import (
+    EligibilitySweep, _build_weight_caches, _eligible_zones_at, _iter_hourly_range,
+    DOWNSAMPLE_CHUNK_SIZE, WeightedReservoir, _weighted_downsample_absences, _zone_adjacency_map,
+    ABSENCE_COLUMNS, generate_absence_reports_incremental, generate_absence_reports_single_phase,
+    generate_absence_reports_two_phase,
+)
+
+SUITES: Dict[str, Callable[..., List[str]]] = {}
+
+RAW_TEXT_REPORTS = os.path.join(settings.BASE_DIR.parent.parent, "Pre-Prod", "Raw_text_reports")
+
+
+def suite(name: str):
+    def register(func):
+        SUITES[name] = func
+        return func
+    return register
+
+
+@contextmanager
+def _rolled_back():
+    """Run the block in a transaction that is always rolled back."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def _openai_client(client):
+    """Temporarily route email_processor's LLM calls through another client."""
+    previous = email_processor._client
+    email_processor._client = client
+    try:
+        yield
+    finally:
+        email_processor._client = previous
+
+
+_SIGHTING = {"time": "2024-07-01T10:00:00Z", "zone": "6", "direction": "N", "count": 6}
+
+
+def _one_sighting_responder(request_body):
+    """One sighting per report - tagged with each report_id for packed requests."""
+    prompt = request_body["messages"][-1]["content"]
+    report_ids = re.findall(r"^Report ID: (R\d+)$", prompt, flags=re.MULTILINE)
+    if report_ids:
+        return json.dumps({"sightings": [{"report_id": rid, **_SIGHTING} for rid in report_ids]})
+    return json.dumps({"sightings": [_SIGHTING]})
+
+
+@suite("extraction")
+def bench_extraction(size: int = 200, latency: float = 0.05) -> List[str]:
+    """
+    End-to-end throughput of the synchronous per-file path against the batch backfill
+    path, both talking to the local stand-in server with `latency` seconds per completion.
+    """
+    lines = [f"Extraction: {size} reports, {latency * 1000:.0f} ms simulated LLM latency"]
+    with LocalOpenAIServer(_one_sighting_responder, latency=latency, batch_workers=32) as server:
+        client = openai.OpenAI(base_url=server.url, api_key="local", max_retries=0)
+        with _rolled_back():
+            reports = RawReport.objects.bulk_create([
+                RawReport(
+                    messageId=f"txt_file_bench_{i}",
+                    subject="benchmark",
+                    sender="orca_network_archive",
+                    body=f"Report {i}: about 6 orcas heading north off Lime Kiln at 10:{i % 60:02d} am",
+                )
+                for i in range(size)
+            ])
+            ids = [r.id for r in reports]
+
+            started = time.monotonic()
+            with _openai_client(client):
+                for report in reports:
+                    email_processor._persist_report_sightings(report, email_processor._extract_sightings(report.body))
+            sync_elapsed = time.monotonic() - started
+
+            # Reset so the batch path starts from the same state
+            OrcaSighting.objects.filter(raw_report_id__in=ids).delete()
+            RawReport.objects.filter(id__in=ids).update(processed=False)
+
+            summary = run_batch_backfill(
+                client=OpenAIBatchClient(client),
+                reports=RawReport.objects.filter(id__in=ids).order_by("id"),
+                poll_interval=0.1,
+                resume=False,
+            )
+
+    lines.append(f"  synchronous: {sync_elapsed:8.2f}s  {size / sync_elapsed:8.1f} reports/s")
+    lines.append(
+        f"  batch:       {summary['elapsed']:8.2f}s  {summary['reports_per_second']:8.1f} reports/s"
+        f"  ({summary['jobs']} job(s), {summary['applied']} applied)"
+    )
+    return lines
+
+
+@suite("packing")
+def bench_packing(size: int = 200, latency: float = 0.05) -> List[str]:
+    """LLM requests, prompt tokens and wall time for short reports sent one per request vs packed."""
+    bodies = {
+        str(i): f"Report {i}: about 6 orcas heading north off Lime Kiln at 10:{i % 60:02d} am"
+        for i in range(size)
+    }
+    lines = [f"Packing: {size} short reports, {latency * 1000:.0f} ms simulated LLM latency"]
+    with LocalOpenAIServer(_one_sighting_responder, latency=latency) as server:
+        client = openai.OpenAI(base_url=server.url, api_key="local", max_retries=0)
+        with _openai_client(client):
+            for label, packs in (("single", [[key] for key in bodies]), ("packed", email_processor._pack_bodies(bodies))):
+                requests_before, tokens_before = server.request_count, server.prompt_tokens
+                started = time.monotonic()
+                with ThreadPoolExecutor(max_workers=email_processor.EXTRACTION_CONCURRENCY) as pool:
+                    results = list(pool.map(
+                        lambda keys: email_processor._extract_sightings_batch({k: bodies[k] for k in keys}), packs
+                    ))
+                elapsed = time.monotonic() - started
+                extracted = sum(len(s) for result in results for s in result.values() if isinstance(s, list))
+                lines.append(
+                    f"  {label:7s} {server.request_count - requests_before:6d} requests "
+                    f"{server.prompt_tokens - tokens_before:9d} prompt tokens {elapsed:8.2f}s "
+                    f"({extracted} sightings)"
+                )
+    return lines
+
+
+@suite("sighting_writes")
+def bench_sighting_writes(size: int = 200, per_report: int = 10) -> List[str]:
+    """Per-row sighting creates (one zone query and insert each) against the bulk writer."""
+    lines = [f"Sighting writes: {size} reports x {per_report} sightings"]
+    sightings = [
+        {"time": f"2024-07-01T{10 + i % 10:02d}:{i % 60:02d}:00Z", "zone": str(1 + i % 16), "direction": "N", "count": 4}
+        for i in range(per_report)
+    ]
+    with _rolled_back():
+        reports = RawReport.objects.bulk_create([
+            RawReport(messageId=f"bench_writes_{i}", subject="benchmark", sender="benchmark", body=f"Report {i}")
+            for i in range(size)
+        ])
+        ids = [r.id for r in reports]
+
+        started = time.monotonic()
+        for report in reports:
+            for data in sightings:
+                email_processor._create_sighting(report, data)
+        per_row_elapsed = time.monotonic() - started
+        OrcaSighting.objects.filter(raw_report_id__in=ids).delete()
+
+        started = time.monotonic()
+        zones = email_processor.ZoneRegistry()
+        for report in reports:
+            email_processor._write_report_sightings(report, sightings, zones)
+        bulk_elapsed = time.monotonic() - started
+
+    rows = size * per_report
+    lines.append(f"  per-row: {per_row_elapsed:8.2f}s  {rows / per_row_elapsed:10.0f} sightings/s")
+    lines.append(f"  bulk:    {bulk_elapsed:8.2f}s  {rows / bulk_elapsed:10.0f} sightings/s")
+    return lines
+
+
+def _legacy_read_file(file_path: str) -> str:
+    """read_file_with_encoding_detection as it was before the single-read fast path - kept for comparison."""
+    try:
+        with open(file_path, 'rb') as f:
+            raw_data = f.read()
+        detected = chardet.detect(raw_data)
+        if detected.get('encoding') and detected.get('confidence', 0) > 0.7:
+            try:
+                return raw_data.decode(detected['encoding'])
+            except (UnicodeDecodeError, LookupError):
+                pass
+    except Exception:
+        pass
+    for encoding in ['utf-8', 'utf-8-sig', 'utf-16', 'utf-16le', 'utf-16be', 'windows-1252', 'iso-8859-1', 'cp1252']:
+        try:
+            with open(file_path, 'r', encoding=encoding) as f:
+                return f.read()
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+    with open(file_path, 'rb') as f:
+        return f.read().decode('utf-8', errors='replace')
+
+
+@suite("encoding")
+def bench_encoding(size: int = 0, path: str = RAW_TEXT_REPORTS) -> List[str]:
+    """Time the legacy and single-read report file decoders over the archive and check they agree."""
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(path)
+        for name in names if name.endswith(".txt")
+    )
+    if size:
+        paths = paths[:size]
+    if not paths:
+        return [f"Encoding: no .txt files under {path}"]
+
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    lines = [f"Encoding: {len(paths)} files, {total_bytes / 1e6:.1f} MB from {path}"]
+    results = {}
+    for label, reader in (("legacy", _legacy_read_file), ("single-read", email_processor.read_file_with_encoding_detection)):
+        started = time.monotonic()
+        results[label] = [reader(p) for p in paths]
+        elapsed = time.monotonic() - started
+        lines.append(f"  {label:11s} {elapsed:8.2f}s  {len(paths) / elapsed:8.0f} files/s  {total_bytes / 1e6 / elapsed:6.1f} MB/s")
+
+    mismatched = [(p, new) for p, old, new in zip(paths, results["legacy"], results["single-read"]) if old != new]
+    # chardet on a whole file regularly calls valid UTF-8 Latin-1, EUC-KR etc. and the legacy reader
+    # returned mojibake ("Â½" for "½") - those differences are fixes, anything else is a regression
+    misdetected = []
+    for p, new in mismatched:
+        with open(p, 'rb') as f:
+            raw_data = f.read()
+        if raw_data.decode('utf-8', errors='replace') == new:
+            misdetected.append(p)
+    regressions = [p for p, _ in mismatched if p not in misdetected]
+    lines.append(f"  identical output: {len(paths) - len(mismatched)}/{len(paths)}")
+    lines.append(f"  valid UTF-8 the legacy reader mis-decoded: {len(misdetected)}")
+    lines.append(f"  other differences: {len(regressions)}")
+    lines.extend(f"    differs: {p}" for p in regressions[:10])
+    return lines
+
+
+@suite("features")
+def bench_features(size: int = 20000, sample: int = 2000) -> List[str]:
+    """Set-based feature recompute over a synthetic year against the trigger's per-row queries on a sample."""
+    lines = [f"Features: {size} synthetic sightings over one year"]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=366) / size
+    with _rolled_back():
+        OrcaSighting.objects.bulk_create([
+            OrcaSighting(
+                time=start + step * i, zone=str(1 + (i * 7) % 16), count=1,
+                month=(start + step * i).month, dayOfWeek=(start + step * i).isoweekday(), hour=(start + step * i).hour,
+            )
+            for i in range(size)
+        ], batch_size=5000)
+
+        stats = recompute_features(start, start + timedelta(days=366))
+        lines.append(
+            f"  set-based: {stats['elapsed']:8.2f}s  {stats['updated'] / stats['elapsed']:10.0f} rows/s"
+            f"  ({stats['chunks']} chunks)"
+        )
+
+        started = time.monotonic()
+        result = verify_features(start, start + timedelta(days=366), limit=sample)
+        elapsed = time.monotonic() - started
+        lines.append(f"  per-row:   {elapsed:8.2f}s  {result['checked'] / elapsed:10.0f} rows/s  ({result['checked']} sampled)")
+        lines.append(f"  mismatched: {len(result['mismatched'])}")
+    return lines
+
+
+@suite("solar")
+def bench_solar(size: int = 1_000_000, per_row: int = 5000) -> List[str]:
+    """Vectorized sunUp over `size` (time, centroid) pairs against calling it row by row, and agreement with the old trigger table."""
+    rng = np.random.default_rng(0)
+    start = np.datetime64("2015-01-01T00:00:00", "s")
+    times = start + rng.integers(0, 10 * 365 * 86400, size).astype("timedelta64[s]")
+    lat = DEFAULT_CENTROID[0] + rng.uniform(-1.0, 1.0, size)
+    lon = DEFAULT_CENTROID[1] + rng.uniform(-1.5, 1.5, size)
+    lines = [f"Solar: {size} sightings"]
+
+    started = time.monotonic()
+    values = sun_up(times, lat, lon)
+    elapsed = time.monotonic() - started
+    lines.append(f"  vectorized: {elapsed:8.2f}s  {size / elapsed:12.0f} rows/s")
+
+    started = time.monotonic()
+    for i in range(per_row):
+        sun_up(times[i:i + 1], lat[i], lon[i])
+    elapsed = time.monotonic() - started
+    lines.append(f"  per-row:    {elapsed:8.2f}s  {per_row / elapsed:12.0f} rows/s  ({per_row} rows)")
+
+    # The old table compared UTC clock time against local sunrise/sunset
+    legacy = table_sun_up(times)
+    lines.append(f"  differs from the old trigger table: {(values != legacy).mean():.1%} of rows")
+    return lines
+
+
+def _synthetic_zones(rng, zones: int = 16, vertices: int = 500):
+    """A 4x4-ish tiling of jagged, slightly overlapping zone polygons around the default centroid, as WKT."""
+    side = int(np.ceil(np.sqrt(zones)))
+    result = []
+    for n in range(zones):
+        row, col = divmod(n, side)
+        lat = DEFAULT_CENTROID[0] - 1.0 + (row + 0.5) * 2.0 / side
+        lon = DEFAULT_CENTROID[1] - 1.5 + (col + 0.5) * 3.0 / side
+        angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+        radius = rng.uniform(0.6, 0.8, vertices)
+        ring = np.column_stack([lon + radius * 1.5 / side * np.cos(angles), lat + radius / side * np.sin(angles)])
+        ring = np.vstack([ring, ring[:1]])
+        result.append((n + 1, "POLYGON ((" + ", ".join(f"{x} {y}" for x, y in ring) + "))"))
+    return result
+
+
+@suite("zone_lookup")
+def bench_zone_lookup(size: int = 1_000_000, per_point: int = 2000) -> List[str]:
+    """Grid-indexed point -> zone lookups for `size` points against ray casting every zone one point at a time."""
+    rng = np.random.default_rng(0)
+    zones = _synthetic_zones(rng)
+    lat = DEFAULT_CENTROID[0] + rng.uniform(-1.0, 1.0, size)
+    lon = DEFAULT_CENTROID[1] + rng.uniform(-1.5, 1.5, size)
+    lines = [f"Zone lookup: {size} points, {len(zones)} zones"]
+
+    started = time.monotonic()
+    geometry = ZoneGeometry(zones)
+    lines.append(f"  build:      {time.monotonic() - started:8.2f}s  grid {geometry.shape[1]}x{geometry.shape[0]}")
+
+    started = time.monotonic()
+    found = geometry.lookup(lat, lon)
+    elapsed = time.monotonic() - started
+    lines.append(f"  vectorized: {elapsed:8.2f}s  {size / elapsed:12.0f} points/s  ({(found != NO_ZONE).mean():.1%} in a zone)")
+
+    # What a lookup without the index does: every zone's edges for every point
+    all_edges = [polygon_edges(parse_boundary(boundary)) for _, boundary in zones]
+    started = time.monotonic()
+    brute = np.full(per_point, NO_ZONE)
+    for i in range(per_point):
+        for (number, _), zone_edges in zip(zones, all_edges):
+            if _points_in_edges(lon[i:i + 1], lat[i:i + 1], zone_edges)[0]:
+                brute[i] = number
+                break
+    elapsed = time.monotonic() - started
+    lines.append(f"  per-point:  {elapsed:8.2f}s  {per_point / elapsed:12.0f} points/s  ({per_point} points)")
+    lines.append(f"  mismatches: {int((brute != found[:per_point]).sum())}")
+    return lines
+
+
+def _synthetic_history(rng, start: datetime, step: timedelta, size: int):
+    """`size` present sightings about `step` apart over chained zones 1-16 (created if there are no zones)."""
+    if not Zone.objects.exists():
+        zones = Zone.objects.bulk_create([
+            Zone(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 17)
+        ])
+        for zone in zones:
+            zone.adjacentZones.set([z for z in zones if abs(z.zoneNumber - zone.zoneNumber) == 1])
+    numbers = list(Zone.objects.values_list("zoneNumber", flat=True))
+    times = start + step * np.sort(rng.uniform(0, size, size))
+    OrcaSighting.objects.bulk_create([
+        OrcaSighting(
+            time=when, zone=str(number), ZoneNumber_id=number, count=1,
+            month=when.month, dayOfWeek=when.isoweekday(), hour=when.hour,
+        )
+        for when, number in zip(times.tolist(), rng.choice(numbers, size).tolist())
+    ], batch_size=5000)
+
+
+@suite("absence_eligibility")
+def bench_absence_eligibility(size: int = 50000, sample: int = 500) -> List[str]:
+    """Absence eligibility for every hour of a synthetic history: one sweep against three queries per hour on a sample."""
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(hours=6)  # one present sighting every 6 hours on average
+    hours = list(_iter_hourly_range(start, start + step * size))
+    lines = [f"Absence eligibility: {size} present sightings, {len(hours)} hours"]
+    rng = np.random.default_rng(0)
+    with _rolled_back():
+        _synthetic_history(rng, start, step, size)
+        adj_map = _zone_adjacency_map()
+
+        started = time.monotonic()
+        sweep = EligibilitySweep(zone_adjacency(), hours[0], hours[-1])
+        swept = [sweep.eligible_at(ts) for ts in hours]
+        elapsed = time.monotonic() - started
+        lines.append(f"  sweep:     {elapsed:8.2f}s  {len(hours) / elapsed:10.0f} hours/s")
+
+        picked = sorted(rng.choice(len(hours), min(sample, len(hours)), replace=False).tolist())
+        started = time.monotonic()
+        queried = [_eligible_zones_at(hours[i], adj_map) for i in picked]
+        elapsed = time.monotonic() - started
+        lines.append(f"  per-hour:  {elapsed:8.2f}s  {len(picked) / elapsed:10.0f} hours/s  ({len(picked)} sampled)")
+        lines.append(f"  mismatched: {sum(swept[i] != q for i, q in zip(picked, queried))}")
+    return lines
+
+
+def _timed_and_traced(func):
+    """(seconds, peak traced MB) of func - timed on one call, memory traced on a second since tracing slows it."""
+    started = time.monotonic()
+    func()
+    elapsed = time.monotonic() - started
+    tracemalloc.start()
+    try:
+        func()
+        return elapsed, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def _legacy_selection(weights: List[float], target: int) -> int:
+    """The old downsampler's in-memory work: key loop, full sort, id sets and the per-batch list() copies."""
+    keyed = [(random.random() ** (1.0 / w), i) for i, w in enumerate(weights)]
+    keyed.sort(reverse=True, key=lambda x: x[0])
+    keep = {i for _, i in keyed[:target]}
+    doomed = set(range(len(weights))) - keep
+    batches = 0
+    for i in range(0, len(doomed), 5000):
+        list(doomed)[i:i + 5000]
+        batches += 1
+    return batches
+
+
+@suite("downsample")
+def bench_downsample(size: int = 10_000_000, legacy: int = 1_000_000, db_size: int = 200_000) -> List[str]:
+    """Weighted absence downsampling: key computation and top-k selection in memory, then the full DB pass."""
+    rng = np.random.default_rng(0)
+    target = size * 3 // 10
+    lines = [f"Downsample: {size} absences in memory (keep {target}), {db_size} through the database"]
+    zones = rng.integers(1, 17, size)
+    hours = rng.integers(0, 24, size)
+    months = rng.integers(1, 13, size)
+    effort = {(z, h): float(rng.uniform(0.1, 20)) for z in range(1, 17) for h in range(24)}
+    season = {(z, m): float(rng.uniform(0.1, 5)) for z in range(1, 17) for m in range(1, 13)}
+    store = WeightStore.from_rows(
+        [(z, h, avg) for (z, h), avg in effort.items()], [(z, m, avg) for (z, m), avg in season.items()]
+    )
+
+    ids = np.arange(size)
+
+    def vectorized():
+        # As _weighted_downsample_absences does it, one chunk of columns at a time
+        reservoir = WeightedReservoir(target, rng)
+        for i in range(0, size, DOWNSAMPLE_CHUNK_SIZE):
+            chunk = slice(i, i + DOWNSAMPLE_CHUNK_SIZE)
+            reservoir.offer(store.weights(zones[chunk], hours[chunk], months[chunk]), ids[chunk])
+        return np.sort(reservoir.sample())
+
+    elapsed, peak = _timed_and_traced(vectorized)
+    lines.append(f"  vectorized: {elapsed:8.2f}s  peak {peak:8.0f} MB")
+
+    started = time.monotonic()
+    store.weights(zones, hours, months)
+    elapsed = time.monotonic() - started
+    lines.append(f"  weights:    {elapsed:8.2f}s  {size / elapsed:10.0f} rows/s (WeightStore)")
+    # The dict lookups the weight caches used to be read with, one row at a time
+    legacy_rows = list(zip(zones[:legacy].tolist(), hours[:legacy].tolist(), months[:legacy].tolist()))
+    started = time.monotonic()
+    [max(effort.get((z, h), 1.0) * season.get((z, m), 1.0), 1e-6) for z, h, m in legacy_rows]
+    elapsed = time.monotonic() - started
+    lines.append(f"  dict rows:  {elapsed:8.2f}s  {legacy / elapsed:10.0f} rows/s ({legacy} rows)")
+
+    weights = store.weights(zones[:legacy], hours[:legacy], months[:legacy]).tolist()
+    elapsed, peak = _timed_and_traced(lambda: _legacy_selection(weights, legacy * 3 // 10))
+    scale = size / legacy
+    lines.append(
+        f"  legacy:     {elapsed:8.2f}s  peak {peak:8.0f} MB  ({legacy} rows; x{scale:.0f} rows is >= "
+        f"{elapsed * scale:.0f}s and {peak * scale:.0f} MB, the list() copies grow quadratically)"
+    )
+
+    with _rolled_back():
+        if not Zone.objects.exists():
+            Zone.objects.bulk_create([Zone(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 17)])
+        numbers = list(Zone.objects.values_list("zoneNumber", flat=True))
+        start = datetime(2000, 1, 1, tzinfo=timezone.utc)
+        times = [start + timedelta(hours=i // len(numbers)) for i in range(db_size)]
+        ensure_absence_partitions(times)
+        # One absence per zone per hour, as the table allows
+        Absence.objects.bulk_create([
+            Absence(time=when, zone=str(numbers[i % len(numbers)]), ZoneNumber_id=numbers[i % len(numbers)])
+            for i, when in enumerate(times)
+        ], batch_size=5000)
+        _, weight_store = _build_weight_caches()
+        started = time.monotonic()
+        deleted = _weighted_downsample_absences(db_size * 3 // 10, weight_store)
+        elapsed = time.monotonic() - started
+        lines.append(f"  database:   {elapsed:8.2f}s  {db_size / elapsed:10.0f} absences/s  ({deleted} deleted)")
+    return lines
+
+
+@suite("absence_generation")
+def bench_absence_generation(size: int = 5000) -> List[str]:
+    """Two-phase generation (insert every eligible absence, then downsample) against single-phase sampling."""
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    lines = [f"Absence generation: {size} present sightings, one every ~6 hours"]
+    for label, generate in (("two-phase", generate_absence_reports_two_phase),
+                            ("single-phase", generate_absence_reports_single_phase)):
+        with _rolled_back():
+            _synthetic_history(np.random.default_rng(0), start, timedelta(hours=6), size)
+            started = time.monotonic()
+            _, eligible, kept, deleted = generate()
+            elapsed = time.monotonic() - started
+            inserted = kept + deleted
+            lines.append(
+                f"  {label:12s} {elapsed:8.2f}s  {eligible} eligible, {inserted} rows inserted, "
+                f"{deleted} deleted, {kept} kept"
+            )
+
+            if label == "single-phase":
+                # A day of new sightings after the full run, as a scheduled run sees it
+                latest = OrcaSighting.objects.filter(present=True).latest("time").time
+                OrcaSighting.objects.bulk_create([
+                    OrcaSighting(time=latest + timedelta(hours=6 * i), zone="1", ZoneNumber_id=1, count=1,
+                                 month=latest.month, dayOfWeek=latest.isoweekday(), hour=latest.hour)
+                    for i in range(1, 5)
+                ])
+                started = time.monotonic()
+                buckets, eligible, kept, deleted = generate_absence_reports_incremental()
+                elapsed = time.monotonic() - started
+                lines.append(f"  {'incremental':12s} {elapsed:8.2f}s  {buckets} new hours, {eligible} eligible, {kept} kept")
+    return lines
+
+
+@suite("bulk_load")
+def bench_bulk_load(size: int = 100000) -> List[str]:
+    """Rows per second writing generated absences with bulk_create against the COPY loader."""
+    start = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    lines = [f"Bulk load: {size} absences, then the same rows again (every one a conflict)"]
+    # Zones 1-16 are created in each rolled-back block if the table is empty
+    numbers = list(Zone.objects.values_list("zoneNumber", flat=True)) or list(range(1, 17))
+    times = [start + timedelta(hours=i // len(numbers)) for i in range(size)]
+    rows = [
+        (ts, str(numbers[i % len(numbers)]), numbers[i % len(numbers)], i % 2 == 0) for i, ts in enumerate(times)
+    ]
+
+    def bulk_create():
+        objs = [Absence(**dict(zip(ABSENCE_COLUMNS, row))) for row in rows]
+        for i in range(0, len(objs), 1000):
+            Absence.objects.bulk_create(objs[i:i + 1000], ignore_conflicts=True)
+
+    def copy():
+        copy_rows(Absence, ABSENCE_COLUMNS, rows, ignore_conflicts=True)
+
+    for label, insert in (("bulk_create", bulk_create), ("copy", copy)):
+        with _rolled_back():
+            if not Zone.objects.exists():
+                Zone.objects.bulk_create([
+                    Zone(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 17)
+                ])
+            ensure_absence_partitions(times)
+            timings = []
+            for _ in range(2):
+                started = time.monotonic()
+                insert()
+                timings.append(time.monotonic() - started)
+            stored = Absence.objects.filter(time__gte=start, time__lte=times[-1]).count()
+        lines.append(
+            f"  {label:14s} {size / timings[0]:10.0f} rows/s new, {size / timings[1]:10.0f} rows/s conflicting  "
+            f"({stored} stored)"
+        )
+    return lines
+
+
+# Every column an absence stored as an OrcaSighting row set
+_LEGACY_ABSENCE_COLUMNS = (
+    "time", "zone", "ZoneNumber_id", "direction", "count", "month", "dayOfWeek", "hour", "present", "isWeekend", "sunUp",
+)
+
+
+@suite("api_queries")
+def bench_api_queries(size: int = 20000, requests: int = 50) -> List[str]:
+    """The sighting API's queries with absences (3 per sighting) stored as OrcaSighting rows, then in the Absence table."""
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(hours=6)
+    hours = list(_iter_hourly_range(start, start + step * size))
+    lines = [f"API queries: {size} present sightings, {3 * size} absences, {requests} requests per query"]
+    rng = np.random.default_rng(0)
+    # 30-day windows, as the charts page asks for them
+    first_days = rng.integers(0, max(1, len(hours) // 24 - 30), requests).tolist()
+    windows = [
+        ((start + timedelta(days=d)).strftime("%Y-%m-%d"), (start + timedelta(days=d + 30)).strftime("%Y-%m-%d"))
+        for d in first_days
+    ]
+    factory = RequestFactory()
+    endpoints = (
+        ("by date range", api_views.get_sightings_by_date_range),
+        ("zone counts", api_views.get_sightings_by_zone_count),
+        ("hour counts", api_views.get_sightings_count_by_hour),
+    )
+
+    for label, in_sightings_table in (("before (OrcaSighting rows)", True), ("after (Absence table)", False)):
+        lines.append(f"  {label}")
+        with _rolled_back():
+            _synthetic_history(np.random.default_rng(0), start, step, size)
+            numbers = list(Zone.objects.values_list("zoneNumber", flat=True))
+            # Distinct (hour, zone) pairs, at most one absence per zone and hour
+            picked = np.sort(rng.choice(len(hours) * len(numbers), 3 * size, replace=False))
+            times = [hours[i // len(numbers)] for i in picked.tolist()]
+            zones = [numbers[i % len(numbers)] for i in picked.tolist()]
+            if in_sightings_table:
+                copy_sightings(_LEGACY_ABSENCE_COLUMNS, [
+                    (ts, str(zn), zn, "none", 0, ts.month, ts.isoweekday(), ts.hour, False, ts.weekday() >= 5, None)
+                    for ts, zn in zip(times, zones)
+                ])
+            else:
+                ensure_absence_partitions(times)
+                copy_rows(Absence, ABSENCE_COLUMNS, [(ts, str(zn), zn, None) for ts, zn in zip(times, zones)])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE data_pipeline_orcasighting")
+                cursor.execute("ANALYZE data_pipeline_absence")
+                # Live row bytes; the rolled-back pass leaves dead tuples behind in the relations
+                cursor.execute(
+                    "SELECT (SELECT sum(pg_column_size(s.*)) FROM data_pipeline_orcasighting s), "
+                    "(SELECT coalesce(sum(pg_column_size(a.*)), 0) FROM data_pipeline_absence a)"
+                )
+                sighting_mb, absence_mb = (float(b) / 2**20 for b in cursor.fetchone())
+
+            for name, view in endpoints:
+                started = time.monotonic()
+                with warnings.catch_warnings():
+                    # The views take bare YYYY-MM-DD dates
+                    warnings.simplefilter("ignore", RuntimeWarning)
+                    for start_date, end_date in windows:
+                        view(factory.get("/"), start_date=start_date, end_date=end_date)
+                elapsed = time.monotonic() - started
+                lines.append(f"    {name:14s} {elapsed / requests * 1000:8.2f} ms/request")
+            started = time.monotonic()
+            for _ in range(requests):
+                # get_predictions_most_recent's lookup
+                OrcaSighting.objects.filter(present=True).order_by("-time").first()
+            elapsed = time.monotonic() - started
+            lines.append(f"    {'latest':14s} {elapsed / requests * 1000:8.2f} ms/request")
+            lines.append(f"    rows: sightings {sighting_mb:.1f} MB, absences {absence_mb:.1f} MB")
+    return lines
+
+
+def _prediction_tables_mb() -> float:
+    """Live row bytes of the three prediction tables."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT (SELECT coalesce(sum(pg_column_size(t.*)), 0) FROM data_pipeline_predictionbatch t)"
+            " + (SELECT coalesce(sum(pg_column_size(t.*)), 0) FROM data_pipeline_predictionbucket t)"
+            " + (SELECT coalesce(sum(pg_column_size(t.*)), 0) FROM data_pipeline_zoneprediction t)"
+        )
+        return float(cursor.fetchone()[0]) / 2**20
+
+
+@suite("prediction_history")
+def bench_prediction_history(size: int = 2000, requests: int = 50) -> List[str]:
+    """Rows, bytes and latest-prediction API time for `size` batches, with full detail and compacted."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rng = np.random.default_rng(0)
+    factory = RequestFactory()
+    lines = [f"Prediction history: {size} batches x 8 buckets x 16 zones"]
+    with _rolled_back():
+        zones = [Zone.objects.update_or_create(zoneNumber=n, defaults={"name": f"Zone {n}", "boundary": "", "localities": ""})[0]
+                 for n in range(1, 17)]
+        sightings = OrcaSighting.objects.bulk_create([
+            OrcaSighting(time=start + timedelta(hours=6 * i), zone="1", ZoneNumber=zones[0], count=1, month=1,
+                         dayOfWeek=1, hour=0, present=True, sunUp=True)
+            for i in range(size)
+        ])
+        batches = PredictionBatch.objects.bulk_create([
+            PredictionBatch(source_sighting=sighting, overall_confidence="low") for sighting in sightings
+        ])
+        buckets = PredictionBucket.objects.bulk_create([
+            PredictionBucket(batch=batch, time_bucket=f"{h}-{h + 6}h", bucket_start_hour=h, bucket_end_hour=h + 6,
+                             forecast_start_time=batch.source_sighting.time + timedelta(hours=h),
+                             forecast_end_time=batch.source_sighting.time + timedelta(hours=h + 6),
+                             overall_probability=float(rng.random()))
+            for batch in batches for h in range(0, 48, 6)
+        ])
+        probabilities = rng.random((len(buckets), len(zones)))
+        for first in range(0, len(buckets), 1000):
+            ZonePrediction.objects.bulk_create([
+                ZonePrediction(bucket=bucket, zone=zones[z].name, zone_number=zones[z], probability=float(p[z]),
+                               rank=rank, is_top_5=rank <= 5)
+                for bucket, p in zip(buckets[first:first + 1000], probabilities[first:first + 1000])
+                for rank, z in enumerate(np.argsort(-p).tolist(), start=1)
+            ])
+
+        for label in ("detail", "compacted"):
+            if label == "compacted":
+                started = time.monotonic()
+                compact_batches(sightings[-1].time + timedelta(seconds=1))
+                lines.append(f"  {'compact':10s} {time.monotonic() - started:8.2f}s")
+            rows = (PredictionBatch.objects.count() + PredictionBucket.objects.count()
+                    + ZonePrediction.objects.count())
+            started = time.monotonic()
+            for _ in range(requests):
+                response = api_views.get_predictions_most_recent(factory.get("/"))
+            elapsed = time.monotonic() - started
+            zone_count = sum(len(bucket["zone_predictions"]) for bucket in response.data["buckets"])
+            lines.append(f"  {label:10s} {rows:8d} rows {_prediction_tables_mb():7.1f} MB  "
+                         f"latest {elapsed / requests * 1000:6.2f} ms/request ({zone_count} zone predictions)")
+    return lines
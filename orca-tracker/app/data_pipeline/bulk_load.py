@@ -0,0 +1,183 @@
+"""
+Bulk inserts of OrcaSighting and Absence rows through COPY.
+
+bulk_create sends a multi-row INSERT per batch of model instances. copy_rows()
+streams plain value tuples into a temporary staging table with COPY and moves them
+into the table with one INSERT ... SELECT, which skips rows that hit a unique index
+(one absence per zone and hour) when ignore_conflicts is set. Ids come from
+OrcaSighting's sequence - absences share it - before the COPY, so rows go in in the
+order given - the row-level recency trigger sees them as it would a multi-row INSERT -
+and load_sightings() can hand instances their pk as bulk_create does.
+
+Small batches and databases other than PostgreSQL go through bulk_create.
+"""
+import io
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List, Sequence
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OrcaSighting
+
+logger = logging.getLogger(__name__)
+
+# Fewer rows than this go through bulk_create; the staging round trips cost more than they save
+# (measured break-even: 10-20 rows)
+COPY_MIN_ROWS = 20
+# Rows per COPY statement (and per id allocation)
+COPY_CHUNK_ROWS = 100000
+
+
+def _model_columns(model) -> tuple:
+    return tuple(f.attname for f in model._meta.concrete_fields if not f.primary_key)
+
+
+SIGHTING_COLUMNS = _model_columns(OrcaSighting)
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value) -> str:
+    """One field in COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.get_current_timezone())
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return f"{value.days} days {value.seconds} seconds {value.microseconds} microseconds"
+    return str(value).translate(_ESCAPES)
+
+
+def _staging_table(model) -> str:
+    return f"{model._meta.db_table}_staging"
+
+
+def _quoted(model, columns: Sequence[str]) -> str:
+    db_columns = {f.attname: f.column for f in model._meta.concrete_fields}
+    return ", ".join(connection.ops.quote_name(db_columns[c]) for c in (model._meta.pk.attname, *columns))
+
+
+def _can_copy(cursor) -> bool:
+    return connection.vendor == "postgresql" and hasattr(cursor, "copy_expert")
+
+
+def _allocate_ids(cursor, count: int) -> List[int]:
+    # Absence ids come from the same sequence
+    table = OrcaSighting._meta.db_table
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)", [table, count]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _copy_chunk(cursor, model, columns: Sequence[str], rows: List[tuple]) -> List[int]:
+    """COPY one chunk into the staging table under freshly allocated ids; returns the ids."""
+    ids = _allocate_ids(cursor, len(rows))
+    buffer = io.StringIO()
+    for row_id, row in zip(ids, rows):
+        buffer.write(str(row_id))
+        for value in row:
+            buffer.write("\t")
+            buffer.write(_copy_value(value))
+        buffer.write("\n")
+    buffer.seek(0)
+    # copy_expert isn't one of the cursor methods Django wraps
+    with connection.wrap_database_errors:
+        cursor.copy_expert(f"COPY {_staging_table(model)} ({_quoted(model, columns)}) FROM STDIN", buffer)
+    return ids
+
+
+def _bulk_create(model, objs: list, ignore_conflicts: bool) -> int:
+    for i in range(0, len(objs), 1000):
+        model.objects.bulk_create(objs[i:i + 1000], ignore_conflicts=ignore_conflicts)
+    return len(objs)
+
+
+def _copy_insert(model, columns: Sequence[str], rows: Iterable[tuple], ignore_conflicts: bool, returning: bool):
+    """
+    COPY every row through the model's staging table. Returns the ids given to the rows, in
+    order, and the set of ids inserted if `returning`, else the number of rows inserted.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    staging = _staging_table(model)
+    quoted = _quoted(model, columns)
+    every_column = _quoted(model, _model_columns(model))
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Dropped at commit; emptied here in case an earlier load in this transaction left it behind
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+            f"SELECT {every_column} FROM {table} WITH NO DATA"
+        )
+        cursor.execute(f"TRUNCATE {staging}")
+        ids: List[int] = []
+        chunk: List[tuple] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= COPY_CHUNK_ROWS:
+                ids += _copy_chunk(cursor, model, columns, chunk)
+                chunk = []
+        if chunk:
+            ids += _copy_chunk(cursor, model, columns, chunk)
+        # No conflict target: like bulk_create(ignore_conflicts=True), any unique index counts
+        cursor.execute(
+            f"INSERT INTO {table} ({quoted}) SELECT {quoted} FROM {staging} ORDER BY id"
+            + (" ON CONFLICT DO NOTHING" if ignore_conflicts else "")
+            + (" RETURNING id" if returning else "")
+        )
+        result = {row[0] for row in cursor.fetchall()} if returning else cursor.rowcount
+        cursor.execute(f"TRUNCATE {staging}")
+    return ids, result
+
+
+def copy_rows(model, columns: Sequence[str], rows: Iterable[tuple], ignore_conflicts: bool = False) -> int:
+    """
+    Insert value tuples for the OrcaSighting or Absence `columns` (attnames, e.g.
+    "ZoneNumber_id"; the rest are left NULL) in order. Returns the number of rows inserted;
+    with ignore_conflicts the bulk_create fallback can't tell which collided and counts every row.
+    """
+    unknown = set(columns) - set(_model_columns(model))
+    if unknown:
+        raise ValueError(f"Not {model.__name__} columns: {sorted(unknown)}")
+    rows = rows if isinstance(rows, list) else list(rows)
+    if not rows:
+        return 0
+    with connection.cursor() as cursor:
+        use_copy = len(rows) >= COPY_MIN_ROWS and _can_copy(cursor)
+    if not use_copy:
+        return _bulk_create(model, [model(**dict(zip(columns, row))) for row in rows], ignore_conflicts)
+    _, inserted = _copy_insert(model, columns, rows, ignore_conflicts, returning=False)
+    logger.debug(f"Copied {len(rows)} {model._meta.verbose_name_plural}, {inserted} inserted")
+    return inserted
+
+
+def copy_sightings(columns: Sequence[str], rows: Iterable[tuple], ignore_conflicts: bool = False) -> int:
+    """copy_rows() for OrcaSighting."""
+    return copy_rows(OrcaSighting, columns, rows, ignore_conflicts)
+
+
+def load_sightings(objs: List[OrcaSighting], ignore_conflicts: bool = False) -> int:
+    """
+    bulk_create() for unsaved OrcaSighting instances through COPY: inserted rows get their
+    pk, rows skipped as conflicts keep None. Returns the number of rows inserted, counted
+    as copy_rows() counts them.
+    """
+    if not objs:
+        return 0
+    with connection.cursor() as cursor:
+        use_copy = len(objs) >= COPY_MIN_ROWS and _can_copy(cursor)
+    if not use_copy:
+        return _bulk_create(OrcaSighting, objs, ignore_conflicts)
+    rows = [tuple(getattr(obj, c) for c in SIGHTING_COLUMNS) for obj in objs]
+    ids, inserted = _copy_insert(OrcaSighting, SIGHTING_COLUMNS, rows, ignore_conflicts, returning=True)
+    for obj, row_id in zip(objs, ids):
+        if row_id in inserted:
+            obj.pk = row_id
+            obj._state.adding = False
+            obj._state.db = connection.alias
+    return len(inserted)
@@ -1,11 +1,25 @@
 import os
+import hashlib
+import codecs
+import copy
 import logging
 import json  # Move this to the top level imports
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
 from dateutil import parser as dtparser
-from django.db import transaction
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
 import openai
-from .models import RawReport, OrcaSighting, Zone
+from .bulk_load import load_sightings
+from .feature_engine import FEATURE_FIELDS, FeatureEngine, register_ingest_writer
+from .models import ExtractionCache, RawReport, OrcaSighting, Zone
+from .rate_limiter import RateLimiter, parse_reset_duration
+from .report_chunking import archive_period, merge_sightings, split_report_body
+from .report_prefilter import in_holdout, needs_extraction, prefilter_features
+from .solar import fill_sun_up, zone_centroids
+from .zone_geometry import ZoneGeometry, locate_zone
 import chardet  # Add this import for encoding detection
 import time
 import random
@@ -14,8 +28,32 @@ logger = logging.getLogger(__name__)
 
 MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-5")
 
+# Concurrent extraction - max LLM calls in flight and how long a claimed report stays leased
+EXTRACTION_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "4"))
+CLAIM_LEASE = timedelta(minutes=int(os.getenv("REPORT_CLAIM_LEASE_MINUTES", "15")))
+
+# Chunk extractions of one large body run in parallel on up to this many threads
+CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", str(EXTRACTION_CONCURRENCY)))
+
+# Packing mode - several short reports share one request (and one copy of the zone reference)
+PACK_TOKEN_BUDGET = int(os.getenv("PACK_TOKEN_BUDGET", "3000"))
+PACK_MAX_REPORTS = int(os.getenv("PACK_MAX_REPORTS", "8"))
+
+# Skip the LLM for reports the local pre-filter finds no orca content in (REPORT_PREFILTER=0 to disable)
+PREFILTER_ENABLED = os.getenv("REPORT_PREFILTER", "1") != "0"
+
+# Account limits for the shared rate limiter - adapted from the API's rate limit headers once calls start
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+# Completion tokens reserved per call on top of the prompt estimate
+EXPECTED_COMPLETION_TOKENS = 300
+
 # Global client variable - will be initialized when needed
 _client = None
+_rate_limiter = RateLimiter(OPENAI_RPM, OPENAI_TPM)
+
+class ExtractionError(Exception):
+    """Raised when an LLM extraction fails, as opposed to finding no sightings."""
 
 def get_openai_api_key():
     """Get OpenAI API key from secrets folder or environment variables with encoding detection."""
@@ -50,75 +88,114 @@ def get_openai_api_key():
     
     raise ValueError("OpenAI API key not found in secrets folder or environment variables")
 
+def _update_rate_limits(response):
+    """httpx response hook - feeds the rate limit headers of every API response to the limiter."""
+    _rate_limiter.update_from_headers(response.headers)
+
 def get_openai_client():
     """Get or create OpenAI client instance."""
     global _client
     if _client is None:
-        _client = openai.OpenAI(api_key=get_openai_api_key())
+        # Retries are handled in _extract_sightings so they go through the rate limiter
+        _client = openai.OpenAI(
+            api_key=get_openai_api_key(),
+            max_retries=0,
+            http_client=openai.DefaultHttpxClient(event_hooks={"response": [_update_rate_limits]}),
+        )
     return _client
 
-def read_file_with_encoding_detection(file_path: str) -> str:
+def _create_completion(request: Dict[str, Any]):
+    """Chat completion call paced by the shared rate limiter."""
+    prompt = "".join(m["content"] for m in request["messages"])
+    estimated = _estimate_tokens(prompt) + EXPECTED_COMPLETION_TOKENS
+    waited = _rate_limiter.acquire(estimated)
+    if waited > 1:
+        logger.debug(f"Rate limiter held request for {waited:.1f}s")
+    response = get_openai_client().chat.completions.create(**request)
+    usage = getattr(response, "usage", None)
+    if isinstance(getattr(usage, "total_tokens", None), int):
+        _rate_limiter.record_usage(estimated, usage.total_tokens)
+    return response
+
+def _retry_after(error: Exception) -> float:
+    """Seconds the API asked us to wait in a 429 response, if it said."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return parse_reset_duration(headers.get("retry-after")) or parse_reset_duration(
+        headers.get("x-ratelimit-reset-requests")
+    ) or 0.0
+
+# Fallback encodings, tried in order when a file is neither BOM-marked nor valid UTF-8
+# (UTF-16 decodes almost any even-length buffer, so it goes after windows-1252)
+FALLBACK_ENCODINGS = [
+    'windows-1252',  # Windows encoding
+    'utf-16le',   # UTF-16 Little Endian
+    'utf-16be',   # UTF-16 Big Endian
+    'iso-8859-1',    # Latin-1
+]
+# chardet first looks at this many leading bytes, and at the whole buffer only if that guess fails
+ENCODING_SAMPLE_BYTES = 64 * 1024
+_BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+def decode_report_bytes(raw_data: bytes, source: str = "<bytes>") -> str:
     """
-    Read a file with automatic encoding detection.
-    Tries multiple encodings to handle various file formats.
+    Decode report file contents: BOM, then strict UTF-8, then chardet on a bounded sample,
+    then chardet on the whole buffer (a sample that is all ASCII says nothing about the
+    rest), then the fallback encodings. Everything decodes from the one in-memory buffer.
     """
-    # List of encodings to try in order
-    encodings_to_try = [
-        'utf-8',
-        'utf-8-sig',  # UTF-8 with BOM
-        'utf-16',     # UTF-16 with BOM
-        'utf-16le',   # UTF-16 Little Endian
-        'utf-16be',   # UTF-16 Big Endian
-        'windows-1252',  # Windows encoding
-        'iso-8859-1',    # Latin-1
-        'cp1252',        # Windows CP1252
-    ]
-    
-    # First, try to detect encoding using chardet
+    for bom, encoding in _BOM_ENCODINGS:
+        if raw_data.startswith(bom):
+            try:
+                return raw_data.decode(encoding)
+            except UnicodeDecodeError:
+                break
     try:
-        with open(file_path, 'rb') as f:
-            raw_data = f.read()
-        
-        # Detect encoding
-        detected = chardet.detect(raw_data)
+        return raw_data.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+
+    samples = [raw_data[:ENCODING_SAMPLE_BYTES]]
+    if len(raw_data) > ENCODING_SAMPLE_BYTES:
+        samples.append(raw_data)
+    for sample in samples:
+        detected = chardet.detect(sample)
         detected_encoding = detected.get('encoding')
-        confidence = detected.get('confidence', 0)
-        
-        logger.debug(f"Detected encoding for {file_path}: {detected_encoding} (confidence: {confidence:.2f})")
-        
-        # If confidence is high, try the detected encoding first
+        confidence = detected.get('confidence') or 0
+        logger.debug(f"Detected encoding for {source} from {len(sample)} bytes: {detected_encoding} "
+                     f"(confidence: {confidence:.2f})")
         if detected_encoding and confidence > 0.7:
             try:
                 return raw_data.decode(detected_encoding)
             except (UnicodeDecodeError, LookupError):
                 logger.warning(f"Failed to decode with detected encoding {detected_encoding}")
-        
-    except Exception as e:
-        logger.warning(f"Error detecting encoding for {file_path}: {e}")
-    
-    # Try each encoding in our list
-    for encoding in encodings_to_try:
+
+    for encoding in FALLBACK_ENCODINGS:
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
-            logger.debug(f"Successfully read {file_path} with encoding: {encoding}")
-            return content
-        except (UnicodeDecodeError, UnicodeError):
-            continue
-        except Exception as e:
-            logger.warning(f"Error reading {file_path} with encoding {encoding}: {e}")
+            content = raw_data.decode(encoding)
+        except UnicodeDecodeError:
             continue
-    
-    # If all else fails, read as binary and decode with errors='replace'
+        logger.debug(f"Successfully read {source} with encoding: {encoding}")
+        # Same newline handling the old text-mode reads applied
+        return content.replace('\r\n', '\n').replace('\r', '\n')
+
+    logger.warning(f"Read {source} with error replacement - some characters may be corrupted")
+    return raw_data.decode('utf-8', errors='replace')
+
+def read_file_with_encoding_detection(file_path: str) -> str:
+    """
+    Read a file with automatic encoding detection.
+    The file is read once; most archive files are UTF-8 and never reach chardet.
+    """
     try:
         with open(file_path, 'rb') as f:
             raw_data = f.read()
-        content = raw_data.decode('utf-8', errors='replace')
-        logger.warning(f"Read {file_path} with error replacement - some characters may be corrupted")
-        return content
-    except Exception as e:
+    except OSError as e:
         logger.error(f"Failed to read {file_path} with any encoding: {e}")
         raise
+    return decode_report_bytes(raw_data, file_path)
 
 JSON_SCHEMA = {
     "name": "orca_sightings_schema",
@@ -146,6 +223,14 @@ JSON_SCHEMA = {
                         "count": {
                             "type": "integer",
                             "description": "Estimated number of orcas; use best single integer. If a range, pick the midpoint rounded."
+                        },
+                        "latitude": {
+                            "type": "number",
+                            "description": "Decimal latitude of the sighting, only if the report gives coordinates."
+                        },
+                        "longitude": {
+                            "type": "number",
+                            "description": "Decimal longitude of the sighting (negative = west), only if the report gives coordinates."
                         }
                     }
                 }
@@ -165,6 +250,7 @@ Rules:
 - Normalize direction to a short cardinal/ordinal if possible (N,S,E,W,NE,NW,SE,SW) else 'unknown'.
 - If time not explicitly given, omit the sighting (do not guess).
 - Convert all times to ISO 8601; if date missing assume today's date in reporter's apparent timezone, else leave.
+- If coordinates are given (decimal or degrees/minutes/seconds), add them as decimal latitude/longitude; otherwise leave both out.
 - Count: if a range like 6-8, take midpoint (7). If vague like "several", use a reasonable guess: several=5, few=3, couple=2, many=10, pod=6. If calves mentioned add them.
 
 Zone Reference:
@@ -193,6 +279,30 @@ Email body:
 {body}
 ---"""
 
+# Changes whenever the prompt or schema changes so cached extractions from an older prompt are never reused
+PROMPT_VERSION = hashlib.sha256(
+    (PROMPT_TEMPLATE + json.dumps(JSON_SCHEMA, sort_keys=True)).encode("utf-8")
+).hexdigest()[:16]
+
+# Same schema with every sighting tagged by the report it came from
+PACKED_JSON_SCHEMA = copy.deepcopy(JSON_SCHEMA)
+PACKED_JSON_SCHEMA["name"] = "orca_packed_sightings_schema"
+_packed_item = PACKED_JSON_SCHEMA["schema"]["properties"]["sightings"]["items"]
+_packed_item["required"] = ["report_id"] + _packed_item["required"]
+_packed_item["properties"] = {
+    "report_id": {
+        "type": "string",
+        "description": "Report ID of the email the sighting was extracted from."
+    },
+    **_packed_item["properties"],
+}
+
+PACKED_PROMPT_TEMPLATE = PROMPT_TEMPLATE.split("Email body:")[0].replace(
+    "Extract every distinct Orca sighting from the email body.",
+    "Extract every distinct Orca sighting from each of the emails below. Every email starts with a "
+    "\"Report ID:\" line - tag each sighting with the report_id of the email it came from.",
+) + "Emails:\n{bodies}"
+
 def _coerce_int(value):
     try:
         return int(value)
@@ -221,67 +331,229 @@ def _get_zone_by_number(zone_value):
         logger.warning(f"Invalid zone value: {zone_value}")
         return None
 
-def _create_sighting(raw: RawReport, data: Dict[str, Any]):
-    """Create OrcaSighting with new nullable fields left blank (None)."""
+class ZoneRegistry:
+    """
+    Zone number -> Zone map for one processing run. There are only ~16 zones, so they are
+    loaded with a single query the first time a sighting needs one instead of once per sighting.
+    """
+
+    def __init__(self):
+        self._zones: Optional[Dict[int, Zone]] = None
+        self._centroids = None
+        self._geometry: Optional[ZoneGeometry] = None
+
+    def _load(self) -> Dict[int, Zone]:
+        if self._zones is None:
+            self._zones = {zone.zoneNumber: zone for zone in Zone.objects.only("zoneNumber", "name", "boundary")}
+        return self._zones
+
+    def centroids(self):
+        """zoneNumber -> (lat, lon) from the zone boundaries, parsed once per run."""
+        if self._centroids is None:
+            self._centroids = zone_centroids((zone.zoneNumber, zone.boundary) for zone in self._load().values())
+        return self._centroids
+
+    def locate(self, lat: float, lon: float) -> Optional[int]:
+        """Number of the zone whose boundary contains the point, or None."""
+        if self._geometry is None:
+            self._geometry = ZoneGeometry((zone.zoneNumber, zone.boundary) for zone in self._load().values())
+        return self._geometry.locate(lat, lon)
+
+    def get(self, zone_value) -> Optional[Zone]:
+        if not zone_value:
+            return None
+        try:
+            zone_number = int(str(zone_value).strip())
+        except (ValueError, TypeError):
+            logger.warning(f"Invalid zone value: {zone_value}")
+            return None
+        return self._load().get(zone_number)
+
+def _coerce_coordinates(data: Dict[str, Any]) -> Optional[tuple]:
+    """(lat, lon) if the sighting has a plausible pair of coordinates."""
+    try:
+        lat, lon = float(data["latitude"]), float(data["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
+
+def _build_sighting(raw: RawReport, data: Dict[str, Any], zone_lookup=_get_zone_by_number,
+                    locate=locate_zone) -> Optional[OrcaSighting]:
+    """Validate and normalize one extracted sighting into an unsaved OrcaSighting; logs and returns None if invalid."""
     # Check if data is a string instead of a dict
     if isinstance(data, str):
         logger.warning(f"Received string instead of dict for sighting data: {data[:100]}... - skipping")
-        return
+        return None
     
     # Check if data is a dict
     if not isinstance(data, dict):
         logger.warning(f"Received unexpected data type {type(data)} for sighting data: {data} - skipping")
-        return
+        return None
     
     try:
         dt = dtparser.parse(data["time"])
     except KeyError:
         logger.warning(f"Missing 'time' field in sighting data for report {raw.messageId}")
-        return
+        return None
     except Exception:
         logger.warning(f"Could not parse time '{data.get('time')}' for report {raw.messageId}")
-        return
+        return None
 
     month, dow, hour, weekend = _calc_derived_fields(dt)
     count = _coerce_int(data.get("count"))
     if count is None or count < 0:
         logger.warning(f"Invalid count '{data.get('count')}' for report {raw.messageId}")
-        return
+        return None
     
     # Get zone string and Zone foreign key
-    zone_str = data.get("zone", "").strip()[:100]
-    zone_instance = _get_zone_by_number(zone_str)
+    zone_str = str(data.get("zone") or "").strip()[:100]
+
+    # Coordinates beat the extracted zone name whenever they fall inside a zone boundary
+    coordinates = _coerce_coordinates(data)
+    located = locate(*coordinates) if coordinates else None
+    if located is not None and str(located) != zone_str:
+        if zone_str.isdigit():
+            logger.warning(f"Zone {zone_str} does not contain {coordinates} for report {raw.messageId}, using zone {located}")
+        else:
+            logger.info(f"Zone '{zone_str}' set to {located} from {coordinates} for report {raw.messageId}")
+        zone_str = str(located)
+    zone_instance = zone_lookup(zone_str)
     
     # Log warning if zone not found but continue with creation
     if zone_str.isdigit() and not zone_instance:
         logger.warning(f"Zone {zone_str} not found in database for report {raw.messageId}")
     
+    return OrcaSighting(
+        raw_report=raw,
+        time=dt,
+        zone=zone_str,  # Keep original zone string
+        ZoneNumber=zone_instance,  # Set foreign key (can be None)
+        direction=str(data.get("direction") or "").strip()[:50],
+        count=count,
+        month=month,
+        dayOfWeek=dow,
+        hour=hour,
+        # Leave derived fields blank; the writers fill sunUp (and recency features when they
+        # have a FeatureEngine), DB triggers populate whatever is left
+        reportsIn5h=None,
+        reportsIn24h=None,
+        reportsInAdjacentZonesIn5h=None,
+        reportsInAdjacentPlusZonesIn5h=None,
+        timeSinceLastSighting=None,
+        sunUp=None,
+        isWeekend=weekend,
+        present=True,
+    )
+
+def _create_sighting(raw: RawReport, data: Dict[str, Any]):
+    """Create OrcaSighting with new nullable fields left blank (None)."""
+    sighting = _build_sighting(raw, data)
+    if sighting is None:
+        return
+    fill_sun_up([sighting])
+    register_ingest_writer()
     try:
-        OrcaSighting.objects.create(
-            raw_report=raw,
-            time=dt,
-            zone=zone_str,  # Keep original zone string
-            ZoneNumber=zone_instance,  # Set foreign key (can be None)
-            direction=data.get("direction", "").strip()[:50],
-            count=count,
-            month=month,
-            dayOfWeek=dow,
-            hour=hour,
-            # Leave new/derived fields blank; DB triggers will populate for present=True
-            reportsIn5h=None,
-            reportsIn24h=None,
-            reportsInAdjacentZonesIn5h=None,
-            reportsInAdjacentPlusZonesIn5h=None,
-            timeSinceLastSighting=None,
-            sunUp=None,
-            isWeekend=weekend,
-            present=True,
-        )
-        logger.debug(f"Created sighting for zone {zone_str} with ZoneNumber: {zone_instance}")
+        sighting.save()
+        logger.debug(f"Created sighting for zone {sighting.zone} with ZoneNumber: {sighting.ZoneNumber}")
     except Exception as e:
         logger.error(f"Failed to create OrcaSighting for report {raw.messageId}: {e}")
 
-def _extract_sightings(body: str) -> List[Dict[str, Any]]:
+def _write_report_sightings(raw: RawReport, sightings: List[Dict[str, Any]],
+                            zones: Optional[ZoneRegistry] = None,
+                            features: Optional[FeatureEngine] = None) -> int:
+    """
+    Validate a whole report's sightings and insert the valid ones in one go (load_sightings:
+    COPY for large reports, bulk_create otherwise).
+    Invalid items are logged and skipped one by one; if the insert itself fails, rows are
+    retried individually so the offending row is reported and the rest are still saved.
+    Rows keep their extraction order, so the row-level DB triggers see the same inserts
+    as with per-row creates. With `features`, the recency features are filled in before the
+    insert instead of by the trigger. Sightings with coordinates get the zone containing
+    them. Returns the number of sightings created.
+    """
+    zones = zones or ZoneRegistry()
+    rows = [row for row in (_build_sighting(raw, data, zones.get, zones.locate) for data in sightings) if row is not None]
+    if not rows:
+        return 0
+    fill_sun_up(rows, zones.centroids())
+    if features is not None:
+        features.fill_new(rows)
+    else:
+        register_ingest_writer()
+    try:
+        with transaction.atomic():
+            load_sightings(rows)
+        return len(rows)
+    except DatabaseError as e:
+        logger.warning(f"Bulk insert of {len(rows)} sightings for report {raw.messageId} failed, inserting row by row: {e}")
+
+    # Filled values assumed every row goes in - leave them to the trigger
+    for row in rows:
+        for field in FEATURE_FIELDS:
+            setattr(row, field, None)
+
+    created = 0
+    for i, row in enumerate(rows):
+        try:
+            with transaction.atomic():
+                row.save()
+            created += 1
+        except DatabaseError as e:
+            logger.error(f"Failed to create OrcaSighting {i} for report {raw.messageId}: {e}")
+    return created
+
+def _chat_request(body: str) -> Dict[str, Any]:
+    """Chat completion parameters for extracting the sightings in one report body."""
+    return {
+        "model": MODEL_NAME,
+        "messages": [{"role": "user", "content": PROMPT_TEMPLATE.format(body=body)}],
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": JSON_SCHEMA
+        },
+    }
+
+def _validate_sightings(sightings: List[Any]) -> List[Dict[str, Any]]:
+    """Drop non-dict items and items missing required keys, logging each one."""
+    valid_sightings = []
+    for i, sight in enumerate(sightings):
+        if isinstance(sight, dict):
+            # Validate required fields
+            if all(key in sight for key in ["time", "zone", "direction", "count"]):
+                valid_sightings.append(sight)
+            else:
+                missing_keys = [key for key in ["time", "zone", "direction", "count"] if key not in sight]
+                logger.warning(f"Sighting {i} missing required keys {missing_keys}: {sight}")
+        else:
+            logger.warning(f"Sighting {i} is not a dict, got {type(sight)}: {sight}")
+    
+    logger.debug(f"Extracted {len(valid_sightings)} valid sightings out of {len(sightings)} total")
+    return valid_sightings
+
+def _parse_sightings_content(content: str) -> List[Dict[str, Any]]:
+    """Parse a JSON extraction response into validated sightings; raises ExtractionError if malformed."""
+    try:
+        parsed = json.loads(content)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ExtractionError(f"invalid JSON response: {e}")
+    sightings = parsed.get("sightings", []) if isinstance(parsed, dict) else None
+    if not isinstance(sightings, list):
+        raise ExtractionError(f"expected sightings to be a list, got {type(sightings)}")
+    return _validate_sightings(sightings)
+
+def _failed_extraction(raise_errors: bool, reason: str) -> List[Dict[str, Any]]:
+    if raise_errors:
+        raise ExtractionError(reason)
+    return []
+
+def _extract_sightings(body: str, raise_errors: bool = False) -> List[Dict[str, Any]]:
+    """
+    Extract sightings from a report body with the LLM.
+    Failures return an empty list, or raise ExtractionError when raise_errors is set
+    so callers can tell a failed call apart from a report with no sightings.
+    """
     if not body.strip():
         return []
     
@@ -291,14 +563,8 @@ def _extract_sightings(body: str) -> List[Dict[str, Any]]:
     
     for attempt in range(max_retries):
         try:
-            client = get_openai_client()
-            response = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[{"role": "user", "content": PROMPT_TEMPLATE.format(body=body)}],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": JSON_SCHEMA
-                },
+            response = _create_completion(
+                _chat_request(body),
                 #service_tier="flex",
                 #timeout=30  # Add timeout
             )
@@ -310,28 +576,14 @@ def _extract_sightings(body: str) -> List[Dict[str, Any]]:
             # Validate that sightings is a list and contains dicts
             if not isinstance(sightings, list):
                 logger.error(f"Expected sightings to be a list, got {type(sightings)}: {sightings}")
-                return []
+                return _failed_extraction(raise_errors, "sightings is not a list")
             
-            # Filter out non-dict items and log them
-            valid_sightings = []
-            for i, sight in enumerate(sightings):
-                if isinstance(sight, dict):
-                    # Validate required fields
-                    if all(key in sight for key in ["time", "zone", "direction", "count"]):
-                        valid_sightings.append(sight)
-                    else:
-                        missing_keys = [key for key in ["time", "zone", "direction", "count"] if key not in sight]
-                        logger.warning(f"Sighting {i} missing required keys {missing_keys}: {sight}")
-                else:
-                    logger.warning(f"Sighting {i} is not a dict, got {type(sight)}: {sight}")
-            
-            logger.debug(f"Extracted {len(valid_sightings)} valid sightings out of {len(sightings)} total")
-            return valid_sightings
+            return _validate_sightings(sightings)
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON response: {e}")
             logger.error(f"Raw response: {response.choices[0].message.content if 'response' in locals() else 'No response'}")
-            return []
+            return _failed_extraction(raise_errors, f"invalid JSON response: {e}")
         except openai.APITimeoutError as e:
             logger.warning(f"OpenAI API timeout (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
@@ -339,15 +591,16 @@ def _extract_sightings(body: str) -> List[Dict[str, Any]]:
                 logger.info(f"Retrying in {delay:.2f} seconds...")
                 time.sleep(delay)
                 continue
-            return []
+            return _failed_extraction(raise_errors, f"timed out after {max_retries} attempts")
         except openai.RateLimitError as e:
             logger.warning(f"OpenAI rate limit hit (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt) + random.uniform(5, 10)  # Longer delay for rate limits
+                # Pause the shared limiter so every thread backs off, not just this one
+                delay = _retry_after(e) or base_delay * (2 ** attempt) + random.uniform(0, 1)
                 logger.info(f"Retrying in {delay:.2f} seconds...")
-                time.sleep(delay)
+                _rate_limiter.pause(delay)
                 continue
-            return []
+            return _failed_extraction(raise_errors, f"rate limited after {max_retries} attempts")
         except openai.APIError as e:
             if e.status_code == 500:
                 logger.warning(f"OpenAI server error (attempt {attempt + 1}/{max_retries}): {e}")
@@ -357,21 +610,212 @@ def _extract_sightings(body: str) -> List[Dict[str, Any]]:
                     time.sleep(delay)
                     continue
             logger.error(f"OpenAI API error: {e}")
-            return []
+            return _failed_extraction(raise_errors, f"API error: {e}")
+        except ExtractionError:
+            raise
         except Exception as e:
             logger.error(f"Failed to extract sightings: {e}")
-            return []
+            return _failed_extraction(raise_errors, str(e))
     
     logger.error(f"Failed to extract sightings after {max_retries} attempts")
-    return []
+    return _failed_extraction(raise_errors, f"no result after {max_retries} attempts")
+
+def _extract_body_sightings(body: str, message_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Extract a whole report body. Large bodies are split at their date headers (checked
+    against the archive month and year in `message_id`, if it has them) and the chunks
+    extracted in parallel, so per-call latency stays bounded whatever the size.
+    Raises ExtractionError if any chunk fails - the report is then retried as a whole.
+    """
+    expected_month, expected_year = archive_period(message_id)
+    chunks = split_report_body(body, expected_month=expected_month, expected_year=expected_year)
+    if len(chunks) == 1:
+        return _extract_sightings(body, raise_errors=True)
+
+    logger.info(f"Split {len(body)} char body into {len(chunks)} chunks")
+    with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), CHUNK_CONCURRENCY))) as pool:
+        results = list(pool.map(lambda chunk: _extract_sightings(chunk, raise_errors=True), chunks))
+    return merge_sightings(results)
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English report text
+    return len(text) // 4 + 1
+
+def _pack_bodies(bodies: Dict[str, str], token_budget: int = PACK_TOKEN_BUDGET,
+                 max_reports: int = PACK_MAX_REPORTS) -> List[List[str]]:
+    """
+    Greedily group {key: body} into packs whose bodies fit the token budget.
+    Bodies too long to share a request (over half the budget) get a pack of their own.
+    """
+    packs: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for key, body in bodies.items():
+        tokens = _estimate_tokens(body)
+        if tokens > token_budget // 2:
+            packs.append([key])
+            continue
+        if current and (used + tokens > token_budget or len(current) >= max_reports):
+            packs.append(current)
+            current, used = [], 0
+        current.append(key)
+        used += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+def _packed_chat_request(bodies: List[str]) -> Dict[str, Any]:
+    """Chat completion parameters for one request covering several report bodies, tagged R1..Rn."""
+    emails = "\n".join(f"Report ID: R{i}\n---\n{body}\n---" for i, body in enumerate(bodies, start=1))
+    return {
+        "model": MODEL_NAME,
+        "messages": [{"role": "user", "content": PACKED_PROMPT_TEMPLATE.format(bodies=emails)}],
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": PACKED_JSON_SCHEMA
+        },
+    }
+
+def _parse_packed_content(content: str, report_count: int) -> List[List[Dict[str, Any]]]:
+    """
+    Split a packed response back into per-report sightings; raises ExtractionError on any
+    untagged item or any item validation drops, so a half-read pack is redone report by report.
+    """
+    try:
+        parsed = json.loads(content)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ExtractionError(f"invalid JSON response: {e}")
+    sightings = parsed.get("sightings", []) if isinstance(parsed, dict) else None
+    if not isinstance(sightings, list):
+        raise ExtractionError(f"expected sightings to be a list, got {type(sightings)}")
+
+    per_report: List[List[Any]] = [[] for _ in range(report_count)]
+    for sight in sightings:
+        report_id = sight.get("report_id") if isinstance(sight, dict) else None
+        index = int(report_id[1:]) - 1 if isinstance(report_id, str) and report_id[1:].isdigit() else -1
+        if not 0 <= index < report_count:
+            raise ExtractionError(f"sighting tagged with unknown report_id {report_id!r}")
+        per_report[index].append({k: v for k, v in sight.items() if k != "report_id"})
+    validated = [_validate_sightings(items) for items in per_report]
+    dropped = sum(len(items) for items in per_report) - sum(len(items) for items in validated)
+    if dropped:
+        raise ExtractionError(f"{dropped} packed sightings failed validation")
+    return validated
+
+def _extract_packed_sightings(bodies: List[str]) -> List[List[Dict[str, Any]]]:
+    """One LLM call for several report bodies; raises ExtractionError if the call or its validation fails."""
+    try:
+        response = _create_completion(_packed_chat_request(bodies))
+        content = response.choices[0].message.content
+    except openai.RateLimitError as e:
+        # Back everyone off before the single-report fallback starts its own calls
+        _rate_limiter.pause(_retry_after(e) or 1.0)
+        raise ExtractionError(f"packed request rate limited: {e}")
+    except Exception as e:
+        raise ExtractionError(f"packed request failed: {e}")
+    return _parse_packed_content(content, len(bodies))
+
+def _extract_sightings_batch(bodies: Dict[str, str], message_ids: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Extract {key: body} in one packed request, falling back to one call per body if the
+    packed request fails validation. A body the packed response found nothing in although
+    it names orcas is re-extracted on its own rather than cached as empty.
+    `message_ids` ({key: messageId}) dates the chunks of large archive bodies.
+    Values are sightings, or the exception for that body.
+    """
+    keys = list(bodies)
+    results: Dict[str, Any] = {}
+    if len(keys) > 1:
+        try:
+            results = dict(zip(keys, _extract_packed_sightings([bodies[k] for k in keys])))
+        except ExtractionError as e:
+            logger.warning(f"Packed extraction of {len(keys)} reports failed, falling back to single calls: {e}")
+        else:
+            keys = [key for key in keys if not results[key] and prefilter_features(bodies[key])["orca_terms"]]
+            if keys:
+                logger.info(f"Packed extraction found nothing in {len(keys)} reports naming orcas, extracting them alone")
+
+    for key in keys:
+        try:
+            results[key] = _extract_body_sightings(bodies[key], (message_ids or {}).get(key))
+        except Exception as e:
+            results[key] = e
+    return results
+
+def _normalize_body(body: str) -> str:
+    """Collapse whitespace so re-wrapped or re-forwarded copies of a report hash the same."""
+    return " ".join(body.split())
+
+def _extraction_cache_key(body: str) -> str:
+    payload = "\x1f".join((_normalize_body(body), MODEL_NAME, PROMPT_VERSION))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _lookup_cached_sightings(keys) -> Dict[str, List[Dict[str, Any]]]:
+    return dict(ExtractionCache.objects.filter(key__in=list(keys)).values_list("key", "sightings"))
+
+def _store_cached_sightings(key: str, sightings: List[Dict[str, Any]]):
+    # ignore_conflicts so two runs caching the same body don't break the surrounding transaction
+    ExtractionCache.objects.bulk_create(
+        [ExtractionCache(key=key, model_name=MODEL_NAME, prompt_version=PROMPT_VERSION, sightings=sightings)],
+        ignore_conflicts=True,
+    )
+
+def _prefiltered(body: str, cache_stats: Dict[str, int], reports: int = 1) -> bool:
+    """True (and counted as an avoided LLM call) if the pre-filter finds no orca content in the body."""
+    if not PREFILTER_ENABLED or needs_extraction(body):
+        return False
+    if in_holdout(body):
+        # Sent anyway: the hold-out's LLM labels are what evaluate_prefilter measures misses on
+        cache_stats["holdout"] = cache_stats.get("holdout", 0) + reports
+        return False
+    cache_stats["prefiltered"] = cache_stats.get("prefiltered", 0) + reports
+    return True
+
+def _extract_report_sightings(body: str, cache_stats: Dict[str, int],
+                              message_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Extract sightings for a report body, consulting the pre-filter and extraction cache before the LLM."""
+    if _prefiltered(body, cache_stats):
+        return []
+    key = _extraction_cache_key(body)
+    cached = _lookup_cached_sightings([key]).get(key)
+    if cached is not None:
+        cache_stats["hits"] += 1
+        return cached
+
+    cache_stats["misses"] += 1
+    try:
+        sightings = _extract_body_sightings(body, message_id)
+    except ExtractionError as e:
+        # Failed calls are not cached so the report gets a real extraction next time
+        logger.warning(f"Extraction failed, result not cached: {e}")
+        return []
+    _store_cached_sightings(key, sightings)
+    return sightings
+
+def _log_cache_summary(cache_stats: Dict[str, int]):
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    if lookups:
+        logger.info(f"Extraction cache: {cache_stats['hits']}/{lookups} hits ({cache_stats['hits'] / lookups:.0%})")
+    if cache_stats.get("prefiltered"):
+        logger.info(f"Pre-filter: {cache_stats['prefiltered']} reports without orca content, LLM calls avoided")
+    if cache_stats.get("holdout"):
+        logger.info(f"Pre-filter hold-out: {cache_stats['holdout']} reports sent to the LLM for evaluation")
+
+def _unclaimed_reports():
+    """Unprocessed reports that are not currently leased by a concurrent run."""
+    stale_before = timezone.now() - CLAIM_LEASE
+    return RawReport.objects.filter(processed=False).filter(
+        Q(claimedAt__isnull=True) | Q(claimedAt__lt=stale_before)
+    )
 
 @transaction.atomic
 def process_unprocessed_reports(limit: int = 25):
-    reports = RawReport.objects.select_for_update(skip_locked=True).filter(processed=False)[:limit]
+    reports = _unclaimed_reports().select_for_update(skip_locked=True)[:limit]
     logger.info(f"Reports to process: {len(reports)}")
+    cache_stats = {"hits": 0, "misses": 0}
     for report in reports:
         try:
-            sightings = _extract_sightings(report.body)
+            sightings = _extract_report_sightings(report.body, cache_stats, report.messageId)
             created = 0
             for sight in sightings:
                 _create_sighting(report, sight)
@@ -381,26 +825,127 @@ def process_unprocessed_reports(limit: int = 25):
             logger.info(f"Report {report.messageId}: created {created} sightings.")
         except Exception as e:
             logger.exception(f"Error processing report {report.messageId}: {e}")
+    _log_cache_summary(cache_stats)
 
-def process_txt_files_from_nested_folders(base_folder_path: str, move_processed: bool = True, year_filter: List[int] = None, month_filter: List[str] = None):
+def _claim_reports(limit: int) -> List[RawReport]:
     """
-    Process all .txt files from the nested year/month folder structure created by txt_fetcher.py.
-    Skips files that are in folders named "processed" to avoid reprocessing already handled reports.
-    
-    Args:
-        base_folder_path: Path to base folder containing year folders (e.g., Raw_text_reports)
-        move_processed: If True, move processed files to 'processed' subfolder within each month
-        year_filter: Optional list of years to process (e.g., [2022, 2023])
-        month_filter: Optional list of months to process (e.g., ['June', 'July'])
+    Lease up to `limit` unprocessed reports by stamping claimedAt.
+    Row locks are only held for the duration of the claim update, not the LLM calls.
     """
-    if not os.path.exists(base_folder_path):
-        logger.error(f"Base folder does not exist: {base_folder_path}")
+    with transaction.atomic():
+        reports = list(
+            _unclaimed_reports().select_for_update(skip_locked=True).order_by("id")[:limit]
+        )
+        if reports:
+            RawReport.objects.filter(id__in=[r.id for r in reports]).update(claimedAt=timezone.now())
+    return reports
+
+def _release_claim(report: RawReport):
+    """Drop the lease on a report so the next run can pick it up again."""
+    RawReport.objects.filter(id=report.id, processed=False).update(claimedAt=None)
+
+def _persist_report_sightings(report: RawReport, sightings: List[Dict[str, Any]],
+                              zones: Optional[ZoneRegistry] = None,
+                              features: Optional[FeatureEngine] = None) -> int:
+    """Store one report's sightings and mark it processed in a single short transaction."""
+    with transaction.atomic():
+        # Conditional update doubles as a guard against a run whose lease expired mid-call
+        marked = RawReport.objects.filter(id=report.id, processed=False).update(processed=True, claimedAt=None)
+        if not marked:
+            logger.warning(f"Report {report.messageId} was already processed by another run - skipping")
+            return 0
+        report.processed = True
+        report.claimedAt = None
+        return _write_report_sightings(report, sightings, zones, features)
+
+def process_unprocessed_reports_concurrent(limit: int = 25, concurrency: int = EXTRACTION_CONCURRENCY,
+                                           pack: bool = False):
+    """
+    Process unprocessed reports with up to `concurrency` LLM extractions in flight.
+
+    Reports are leased via RawReport.claimedAt instead of being locked for the whole batch,
+    and each report's sightings are committed in their own transaction as soon as its
+    extraction finishes, so one slow call never holds up the rest of the batch.
+    With `pack`, short reports are grouped into shared requests under PACK_TOKEN_BUDGET.
+    """
+    reports = _claim_reports(limit)
+    logger.info(f"Reports to process: {len(reports)} (concurrency {concurrency}{', packed' if pack else ''})")
+    if not reports:
         return
-    
-    total_files_processed = 0
-    total_sightings_created = 0
-    encoding_issues = 0
-    
+
+    started = time.monotonic()
+    processed = 0
+    total_created = 0
+    cache_stats = {"hits": 0, "misses": 0}
+    zones = ZoneRegistry()
+    features = FeatureEngine()
+
+    # Group reports by cache key so duplicate bodies in one batch share a single LLM call
+    reports_by_key: Dict[str, List[RawReport]] = {}
+    for report in reports:
+        reports_by_key.setdefault(_extraction_cache_key(report.body), []).append(report)
+    cached = _lookup_cached_sightings(reports_by_key.keys())
+
+    def finish(report, sightings):
+        nonlocal processed, total_created
+        try:
+            created = _persist_report_sightings(report, sightings, zones, features)
+            processed += 1
+            total_created += created
+            logger.info(f"Report {report.messageId}: created {created} sightings.")
+        except Exception as e:
+            logger.exception(f"Error processing report {report.messageId}: {e}")
+            _release_claim(report)
+
+    misses: Dict[str, str] = {}
+    for key, group in reports_by_key.items():
+        if _prefiltered(group[0].body, cache_stats, len(group)):
+            for report in group:
+                finish(report, [])
+        elif key in cached:
+            cache_stats["hits"] += len(group)
+            for report in group:
+                finish(report, cached[key])
+        else:
+            cache_stats["misses"] += 1
+            cache_stats["hits"] += len(group) - 1
+            misses[key] = group[0].body
+    packs = _pack_bodies(misses) if pack else [[key] for key in misses]
+    if pack and misses:
+        logger.info(f"Packed {len(misses)} reports into {len(packs)} LLM requests")
+
+    # Only the LLM calls run on the pool - all DB work stays on this thread
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [
+            pool.submit(_extract_sightings_batch, {key: misses[key] for key in keys},
+                        {key: reports_by_key[key][0].messageId for key in keys})
+            for keys in packs
+        ]
+        for future in as_completed(futures):
+            for key, sightings in future.result().items():
+                if isinstance(sightings, Exception):
+                    logger.warning(
+                        f"Extraction failed for {[r.messageId for r in reports_by_key[key]]}, releasing: {sightings}"
+                    )
+                    for report in reports_by_key[key]:
+                        _release_claim(report)
+                    continue
+                _store_cached_sightings(key, sightings)
+                for report in reports_by_key[key]:
+                    finish(report, sightings)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Processed {processed}/{len(reports)} reports, {total_created} sightings in {elapsed:.1f}s "
+        f"({processed / max(elapsed, 1e-6):.2f} reports/s)"
+    )
+    _log_cache_summary(cache_stats)
+
+def _iter_txt_month_folders(base_folder_path: str, year_filter: List[int] = None, month_filter: List[str] = None):
+    """
+    Walk the year/month folder structure created by txt_fetcher.py, skipping "processed" folders.
+    Yields (year_folder, month_folder, month_path, txt_files) for every month with .txt files.
+    """
     # Get all year folders
     year_folders = [f for f in os.listdir(base_folder_path) 
                    if os.path.isdir(os.path.join(base_folder_path, f)) and f.isdigit()]
@@ -463,78 +1008,103 @@ def process_txt_files_from_nested_folders(base_folder_path: str, move_processed:
             
             logger.info(f"Processing {year_folder}/{month_folder}: {len(txt_files)} files")
             
-            # Create processed subfolder if needed
-            if move_processed:
-                processed_folder = os.path.join(month_path, "processed")
-                if not os.path.exists(processed_folder):
-                    os.makedirs(processed_folder)
-            
-            # Process each txt file
-            for filename in txt_files:
-                file_path = os.path.join(month_path, filename)
-                
+            yield year_folder, month_folder, month_path, txt_files
+
+def _txt_message_id(year_folder: str, month_folder: str, filename: str) -> str:
+    # Filename format is YYYY_Month_DD.txt
+    base_name = os.path.splitext(filename)[0]
+    return f"txt_file_{year_folder}_{month_folder}_{base_name}"
+
+def _txt_subject(year_folder: str, month_folder: str, filename: str) -> str:
+    return f"Orca Network Archive: {year_folder} {month_folder} - {filename}"
+
+def process_txt_files_from_nested_folders(base_folder_path: str, move_processed: bool = True, year_filter: List[int] = None, month_filter: List[str] = None):
+    """
+    Process all .txt files from the nested year/month folder structure created by txt_fetcher.py.
+    Skips files that are in folders named "processed" to avoid reprocessing already handled reports.
+    
+    Args:
+        base_folder_path: Path to base folder containing year folders (e.g., Raw_text_reports)
+        move_processed: If True, move processed files to 'processed' subfolder within each month
+        year_filter: Optional list of years to process (e.g., [2022, 2023])
+        month_filter: Optional list of months to process (e.g., ['June', 'July'])
+    """
+    if not os.path.exists(base_folder_path):
+        logger.error(f"Base folder does not exist: {base_folder_path}")
+        return
+    
+    total_files_processed = 0
+    total_sightings_created = 0
+    encoding_issues = 0
+    cache_stats = {"hits": 0, "misses": 0}
+    zones = ZoneRegistry()
+    features = FeatureEngine()
+    
+    for year_folder, month_folder, month_path, txt_files in _iter_txt_month_folders(
+        base_folder_path, year_filter, month_filter
+    ):
+    
+        # Create processed subfolder if needed
+        if move_processed:
+            processed_folder = os.path.join(month_path, "processed")
+            if not os.path.exists(processed_folder):
+                os.makedirs(processed_folder)
+    
+        # Process each txt file
+        for filename in txt_files:
+            file_path = os.path.join(month_path, filename)
+        
+            try:
+                # Read file content with encoding detection
                 try:
-                    # Read file content with encoding detection
-                    try:
-                        content = read_file_with_encoding_detection(file_path)
-                    except Exception as e:
-                        logger.error(f"Failed to read {year_folder}/{month_folder}/{filename}: {e}")
-                        encoding_issues += 1
-                        continue
-                    
-                    # Extract date info from filename (format: YYYY_Month_DD.txt)
-                    base_name = os.path.splitext(filename)[0]
-                    
-                    # Create unique messageId including the full path info
-                    message_id = f"txt_file_{year_folder}_{month_folder}_{base_name}"
-                    
-                    # Check if already processed
-                    if RawReport.objects.filter(messageId=message_id).exists():
-                        logger.debug(f"File {year_folder}/{month_folder}/{filename} already processed, skipping")
-                        continue
-                    
-                    # Create RawReport entry
-                    with transaction.atomic():
-                        raw_report = RawReport.objects.create(
-                            messageId=message_id,
-                            subject=f"Orca Network Archive: {year_folder} {month_folder} - {filename}",
-                            sender="orca_network_archive",
-                            body=content,
-                            processed=False
-                        )
-                        
-                        # Extract sightings
-                        sightings = _extract_sightings(content)
-                        created = 0
-                        
-                        # Better error handling in the sighting creation loop
-                        for i, sight in enumerate(sightings):
-                            try:
-                                _create_sighting(raw_report, sight)
-                                created += 1
-                            except Exception as e:
-                                logger.error(f"Error creating sighting {i} for {message_id}: {e}")
-                                continue
-                        
-                        # Mark as processed
-                        raw_report.processed = True
-                        raw_report.save(update_fields=["processed"])
-                        
-                        total_files_processed += 1
-                        total_sightings_created += created
-                        
-                        logger.info(f"File {year_folder}/{month_folder}/{filename}: created {created} sightings from {message_id}")
-                    
-                    # Move file to processed folder if requested
-                    if move_processed:
-                        processed_file_path = os.path.join(processed_folder, filename)
-                        os.rename(file_path, processed_file_path)
-                        logger.debug(f"Moved {filename} to processed folder")
-                        
+                    content = read_file_with_encoding_detection(file_path)
                 except Exception as e:
-                    logger.exception(f"Error processing file {year_folder}/{month_folder}/{filename}: {e}")
-    
+                    logger.error(f"Failed to read {year_folder}/{month_folder}/{filename}: {e}")
+                    encoding_issues += 1
+                    continue
+            
+                # Create unique messageId including the full path info
+                message_id = _txt_message_id(year_folder, month_folder, filename)
+            
+                # Check if already processed
+                if RawReport.objects.filter(messageId=message_id).exists():
+                    logger.debug(f"File {year_folder}/{month_folder}/{filename} already processed, skipping")
+                    continue
+            
+                # Create RawReport entry
+                with transaction.atomic():
+                    raw_report = RawReport.objects.create(
+                        messageId=message_id,
+                        subject=_txt_subject(year_folder, month_folder, filename),
+                        sender="orca_network_archive",
+                        body=content,
+                        processed=False
+                    )
+                
+                    # Extract sightings
+                    sightings = _extract_report_sightings(content, cache_stats, message_id)
+                    created = _write_report_sightings(raw_report, sightings, zones, features)
+                
+                    # Mark as processed
+                    raw_report.processed = True
+                    raw_report.save(update_fields=["processed"])
+                
+                    total_files_processed += 1
+                    total_sightings_created += created
+                
+                    logger.info(f"File {year_folder}/{month_folder}/{filename}: created {created} sightings from {message_id}")
+            
+                # Move file to processed folder if requested
+                if move_processed:
+                    processed_file_path = os.path.join(processed_folder, filename)
+                    os.rename(file_path, processed_file_path)
+                    logger.debug(f"Moved {filename} to processed folder")
+                
+            except Exception as e:
+                logger.exception(f"Error processing file {year_folder}/{month_folder}/{filename}: {e}")
+
     logger.info(f"Processing complete! Total files: {total_files_processed}, Total sightings: {total_sightings_created}")
+    _log_cache_summary(cache_stats)
     if encoding_issues > 0:
         logger.warning(f"Encoding issues encountered in {encoding_issues} files")
 
@@ -76,28 +76,48 @@ def _iter_text_parts(service, msg_id: str, payload):
         if text:
             yield text
 
+def fetch_message_parts(service, msg_id: str):
+    """
+    Fetch one message and split it into report bodies.
+    Returns (subject, sender, [(part_msg_id, body_text), ...]); the first part keeps the message id.
+    """
+    detail = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
+    headers = detail.get('payload', {}).get('headers', [])
+    subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
+    sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
+
+    parts = list(_iter_text_parts(service, msg_id, detail.get('payload', {})))
+    # Fallback: single body if no parts
+    if not parts:
+        body = _b64decode(detail.get('payload', {}).get('body', {}).get('data', ''))
+        if body:
+            parts = [body]
+
+    return subject, sender, [
+        (msg_id if idx == 1 else f"{msg_id}pt{idx}", body_text)
+        for idx, body_text in enumerate(parts, start=1)
+    ]
+
+def iter_unread_message_ids(service, page_size: int = 100):
+    """Yield the ids of every unread INBOX message, following result pages."""
+    request = service.users().messages().list(userId='me', labelIds=['INBOX'], q='is:unread', maxResults=page_size)
+    while request is not None:
+        res = request.execute()
+        for msg in res.get('messages', []):
+            yield msg['id']
+        request = service.users().messages().list_next(request, res)
+
 def get_emails():
     service = get_gmail_service()
     res = service.users().messages().list(userId='me', labelIds=['INBOX'], q='is:unread', maxResults=20).execute()
     for msg in res.get('messages', []):
-        detail = service.users().messages().get(userId='me', id=msg['id'], format='full').execute()
-        headers = detail.get('payload', {}).get('headers', [])
-        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
-        sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
-
-        parts = list(_iter_text_parts(service, msg['id'], detail.get('payload', {})))
-        # Fallback: single body if no parts
-        if not parts:
-            body = _b64decode(detail.get('payload', {}).get('body', {}).get('data', ''))
-            if body:
-                parts = [body]
+        subject, sender, parts = fetch_message_parts(service, msg['id'])
 
         if not parts:
             logger.info(f"No text content for message {msg['id']} - skipped")
             continue
 
-        for idx, body_text in enumerate(parts, start=1):
-            part_msg_id = msg['id'] if idx == 1 else f"{msg['id']}pt{idx}"
+        for idx, (part_msg_id, body_text) in enumerate(parts, start=1):
             try:
                 if not RawReport.objects.filter(messageId=part_msg_id).exists():
                     RawReport.objects.create(
@@ -109,6 +129,3 @@ def get_emails():
                     logger.info(f"Saved {('part ' + str(idx)) if idx > 1 else 'message'} from {sender} | subject '{subject}' | id {part_msg_id}")
             except Exception as e:
                 logger.error(f"Failed to save RawReport {part_msg_id}: {e}")
-
-
-
@@ -0,0 +1,338 @@
+"""
+In-process version of the recency features the zone_calc.sql trigger computes on insert.
+
+The trigger runs five queries against the sightings table for every inserted row, so the
+features only exist once a row has been written. FeatureEngine keeps the present sightings
+around the times it is asked about in per-zone sorted lists, takes the zone neighbourhoods
+from the process-wide adjacency matrices (zone_adjacency.py), and answers the same
+questions with bisects:
+
+- reportsIn5h / reportsIn24h: present same-zone rows in [t-6h, t+1h) / [t-25h, t+1h)
+- reportsInAdjacentZonesIn5h / reportsInAdjacentPlusZonesIn5h: present rows whose zone
+  number is adjacent / next-adjacent, in [t-6h, t+1h)
+- timeSinceLastSighting: t minus the latest present same-zone row strictly before t
+
+Rows are read from the database for whatever window a query needs (the last 25h for a
+live sighting) and rows written through fill_new() are counted once their transaction
+commits, so a run gets the trigger's as-of-insert values without a query per row.
+Rows written by other processes are only seen when their window is next loaded, so
+the trigger stays authoritative while another ingest run is writing: every writer holds
+a shared advisory lock (register_ingest_writer), and fill_new() leaves the counts NULL
+for the trigger to compute whenever another connection holds it too.
+recompute_features() repairs any remaining drift.
+"""
+import bisect
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import OrcaSighting
+from .zone_adjacency import ZoneAdjacency, zone_adjacency
+
+logger = logging.getLogger(__name__)
+
+# Trigger windows: [t - 6h, t + 1h) and [t - 25h, t + 1h)
+WINDOW_5H = timedelta(hours=6)
+WINDOW_24H = timedelta(hours=25)
+LOOKAHEAD = timedelta(hours=1)
+# Rows older than this behind the newest query are dropped as ingestion moves forward
+MAX_SPAN = timedelta(days=7)
+# The window grows by at least this much per load so a run moving through time doesn't
+# query on every sighting
+READ_AHEAD = timedelta(hours=12)
+
+FEATURE_FIELDS = (
+    "reportsIn5h",
+    "reportsIn24h",
+    "reportsInAdjacentZonesIn5h",
+    "reportsInAdjacentPlusZonesIn5h",
+    "timeSinceLastSighting",
+)
+
+_ZONE_NUMBER = re.compile(r"^\s*[0-9]+\s*$")
+
+# Session-level advisory lock (shared) held by every connection that writes sightings;
+# released when the connection closes
+INGEST_WRITER_LOCK = 0x0CA5_0001
+_OTHER_WRITERS_SQL = """
+SELECT count(DISTINCT pid) FROM pg_locks
+WHERE locktype = 'advisory' AND classid = 0 AND objid = %s AND objsubid = 1 AND granted AND pid <> pg_backend_pid()
+"""
+# The DB-API connection this thread took the lock on
+_registered = threading.local()
+
+
+def zone_number(zone: str) -> Optional[int]:
+    """The zone as the trigger's ::int cast reads it, or None if it isn't a number."""
+    return int(zone) if zone and _ZONE_NUMBER.match(zone) else None
+
+
+def register_ingest_writer(count_others: bool = False) -> int:
+    """
+    Mark this connection as writing sightings (once per connection). With `count_others`,
+    returns how many other connections are writing too.
+    """
+    if connection.vendor != "postgresql":
+        return 0
+    with connection.cursor() as cursor:
+        if getattr(_registered, "connection", None) is not connection.connection:
+            cursor.execute("SELECT pg_advisory_lock_shared(%s)", [INGEST_WRITER_LOCK])
+            _registered.connection = connection.connection
+        if not count_others:
+            return 0
+        cursor.execute(_OTHER_WRITERS_SQL, [INGEST_WRITER_LOCK])
+        return cursor.fetchone()[0]
+
+
+def _aware(when: datetime) -> datetime:
+    # Naive times are stored in the default time zone, the same as Django does on save
+    return timezone.make_aware(when) if timezone.is_naive(when) else when
+
+
+def _count(times: List[datetime], start: datetime, end: datetime) -> int:
+    return bisect.bisect_left(times, end) - bisect.bisect_left(times, start)
+
+
+class FeatureEngine:
+    """Sliding per-zone windows of present sightings that answer the trigger's recency queries."""
+
+    def __init__(self):
+        self._adjacency: Optional[ZoneAdjacency] = None
+        # (zone, time) of the fill_new() rows filled so far - not in the table yet
+        self._pending: List[Tuple[str, datetime]] = []
+        self._deferring = False
+        self._clear_rows()
+
+    @classmethod
+    def warm_start(cls, now: Optional[datetime] = None) -> "FeatureEngine":
+        """An engine holding the adjacency and every present sighting a query at `now` needs."""
+        now = _aware(now or timezone.now())
+        engine = cls()
+        engine._adjacency = zone_adjacency()
+        engine._cover(now - WINDOW_24H, now + LOOKAHEAD)
+        return engine
+
+    def reset(self):
+        """Forget everything, including adjacency, so the next query reloads it."""
+        self._adjacency = None
+        self._clear_rows()
+
+    def features(self, zone: str, when: datetime, exclude_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        The five recency features for a sighting in `zone` at `when`. `exclude_id` is the
+        sighting's own id when it is already stored, so it doesn't count itself.
+        """
+        when = _aware(when)
+        if self._adjacency is None:
+            self._adjacency = zone_adjacency()
+        self._cover(when - WINDOW_24H, when + LOOKAHEAD)
+
+        start_5h, end = when - WINDOW_5H, when + LOOKAHEAD
+        times = self._by_zone.get(zone, [])
+        in_5h = _count(times, start_5h, end)
+        in_24h = _count(times, when - WINDOW_24H, end)
+        number = zone_number(zone)
+        adjacent = adjacent_plus = 0
+        if number is not None:
+            adjacent_zones = self._adjacency.neighbours(number).tolist()
+            next_adjacent_zones = self._adjacency.neighbours(number, next_adjacent=True).tolist()
+            adjacent = sum(_count(self._by_number.get(n, []), start_5h, end) for n in adjacent_zones)
+            adjacent_plus = sum(_count(self._by_number.get(n, []), start_5h, end) for n in next_adjacent_zones)
+            if self._stored.get(exclude_id) == (zone, when):
+                adjacent -= number in adjacent_zones
+                adjacent_plus -= number in next_adjacent_zones
+        if self._stored.get(exclude_id) == (zone, when):
+            in_5h -= 1
+            in_24h -= 1
+
+        last = self._last_present_before(zone, when)
+        return {
+            "reportsIn5h": in_5h,
+            "reportsIn24h": in_24h,
+            "reportsInAdjacentZonesIn5h": adjacent,
+            "reportsInAdjacentPlusZonesIn5h": adjacent_plus,
+            "timeSinceLastSighting": when - last if last is not None else None,
+        }
+
+    def fill(self, sighting: OrcaSighting) -> OrcaSighting:
+        """Set the recency features on a sighting (saved or not) without writing it."""
+        for field, value in self.features(sighting.zone, sighting.time, exclude_id=sighting.pk).items():
+            setattr(sighting, field, value)
+        return sighting
+
+    def fill_new(self, rows: List[OrcaSighting]):
+        """
+        Fill unsaved rows in insertion order, each one seeing the rows before it the way the
+        trigger sees earlier rows of a multi-row INSERT. The rows count towards later queries
+        once the surrounding transaction commits, so a rolled-back write leaves no trace.
+
+        Each row has to be in the lists before the next one is filled, so it is insorted:
+        a bisect plus a move of the later times of its zone, which is an append for rows in
+        time order. Everything else (loads, commits, the rollback of these inserts) is
+        merged with one sort per list, so no list costs more than O(window) per batch.
+
+        While another ingest run is writing, the features are left NULL so the trigger
+        computes them against its committed rows too.
+        """
+        register_ingest_writer()
+        try:
+            for row in rows:
+                self.fill(row)
+                if row.present:
+                    when = _aware(row.time)
+                    self._pending.append((row.zone, when))
+                    if self._lo <= when < self._hi:
+                        self._insert(row.zone, when)
+        finally:
+            self._discard_all([(zone, when) for zone, when in self._pending if self._lo <= when < self._hi])
+            self._pending = []
+        self._defer_to_trigger(rows)
+        transaction.on_commit(partial(self.add_all, rows))
+
+    def _defer_to_trigger(self, rows: List[OrcaSighting]):
+        # Checked after filling so a run that started meanwhile is seen too
+        deferring = register_ingest_writer(count_others=True) > 0
+        if deferring != self._deferring:
+            self._deferring = deferring
+            logger.info("Another ingest run is writing sightings - recency features left to the trigger"
+                        if deferring else "No other ingest run is writing - recency features computed in-process")
+        if deferring:
+            for row in rows:
+                for field in FEATURE_FIELDS:
+                    setattr(row, field, None)
+
+    def add_all(self, sightings: Iterable[OrcaSighting]):
+        """Count sightings that have been written to the table."""
+        self._insert_all([row for row in map(self._accept, sightings) if row is not None])
+
+    def add(self, sighting: OrcaSighting):
+        self.add_all([sighting])
+
+    def _accept(self, sighting: OrcaSighting) -> Optional[Tuple[str, datetime]]:
+        """Record a written sighting; returns its (zone, time) if it belongs in the lists."""
+        if not sighting.present or sighting.pk is None or sighting.pk in self._stored or self._lo is None:
+            return None
+        when = _aware(sighting.time)
+        if when >= self._hi:
+            # Read from the database once a query needs that window
+            return None
+        if when < self._lo:
+            if sighting.zone in self._last_before:
+                last = self._last_before[sighting.zone]
+                self._last_before[sighting.zone] = when if last is None else max(last, when)
+            return None
+        self._stored[sighting.pk] = (sighting.zone, when)
+        return sighting.zone, when
+
+    def _clear_rows(self):
+        self._by_zone: Dict[str, List[datetime]] = {}
+        self._by_number: Dict[int, List[datetime]] = {}
+        # id -> (zone, time) of the stored rows in memory
+        self._stored: Dict[int, Tuple[str, datetime]] = {}
+        # zone -> latest present time before self._lo, looked up when first needed
+        self._last_before: Dict[str, Optional[datetime]] = {}
+        self._lo: Optional[datetime] = None
+        self._hi: Optional[datetime] = None
+
+    def _cover(self, start: datetime, end: datetime):
+        """Make sure every present sighting in [start, end) is in memory."""
+        if self._lo is not None and start <= self._hi and end >= self._lo:
+            if start > self._lo and max(end, self._hi) - self._lo > MAX_SPAN:
+                self._drop_before(start)
+            if max(end, self._hi) - min(start, self._lo) <= MAX_SPAN:
+                if start < self._lo:
+                    start = min(start, self._lo - READ_AHEAD)
+                    self._load(start, self._lo)
+                    self._lo = start
+                    # Cached "latest before" times were for the old start
+                    self._last_before.clear()
+                if end > self._hi:
+                    end = max(end, self._hi + READ_AHEAD)
+                    self._load(self._hi, end)
+                    self._hi = end
+                return
+        logger.debug(f"Feature window moved to {start} - {end}, reloading")
+        self._clear_rows()
+        end += READ_AHEAD
+        self._load(start, end)
+        self._lo, self._hi = start, end
+
+    def _load(self, start: datetime, end: datetime):
+        rows = OrcaSighting.objects.filter(present=True, time__gte=start, time__lt=end).values_list("id", "zone", "time")
+        loaded = [(zone, when) for zone, when in self._pending if start <= when < end]
+        for row_id, zone, when in rows.iterator():
+            self._stored[row_id] = (zone, when)
+            loaded.append((zone, when))
+        self._insert_all(loaded)
+
+    def _drop_before(self, start: datetime):
+        for zone, times in self._by_zone.items():
+            i = bisect.bisect_left(times, start)
+            if i:
+                self._last_before[zone] = times[i - 1]
+                del times[:i]
+        for times in self._by_number.values():
+            del times[:bisect.bisect_left(times, start)]
+        self._stored = {row_id: row for row_id, row in self._stored.items() if row[1] >= start}
+        self._lo = start
+
+    def _insert(self, zone: str, when: datetime):
+        bisect.insort(self._by_zone.setdefault(zone, []), when)
+        number = zone_number(zone)
+        if number is not None:
+            bisect.insort(self._by_number.setdefault(number, []), when)
+
+    def _grouped(self, rows: List[Tuple[str, datetime]]) -> List[Tuple[List[datetime], List[datetime]]]:
+        """(list, times for it) for every zone and zone number list `rows` touch."""
+        by_zone: Dict[str, List[datetime]] = defaultdict(list)
+        by_number: Dict[int, List[datetime]] = defaultdict(list)
+        for zone, when in rows:
+            by_zone[zone].append(when)
+            number = zone_number(zone)
+            if number is not None:
+                by_number[number].append(when)
+        return [(self._by_zone.setdefault(zone, []), times) for zone, times in by_zone.items()] + [
+            (self._by_number.setdefault(number, []), times) for number, times in by_number.items()
+        ]
+
+    def _insert_all(self, rows: List[Tuple[str, datetime]]):
+        for times, added in self._grouped(rows):
+            times.extend(added)
+            # Timsort merges the sorted list and the new run in linear time
+            times.sort()
+
+    def _discard_all(self, rows: List[Tuple[str, datetime]]):
+        for times, removed in self._grouped(rows):
+            doomed = Counter(removed)
+            kept = []
+            for when in times:
+                if doomed[when]:
+                    doomed[when] -= 1
+                else:
+                    kept.append(when)
+            times[:] = kept
+
+    def _last_present_before(self, zone: str, when: datetime) -> Optional[datetime]:
+        times = self._by_zone.get(zone)
+        if times:
+            i = bisect.bisect_left(times, when)
+            if i:
+                return times[i - 1]
+        # Nothing in memory between the window start and `when`
+        if zone not in self._last_before:
+            self._last_before[zone] = OrcaSighting.objects.filter(
+                zone=zone, present=True, time__lt=self._lo
+            ).aggregate(last=Max("time"))["last"]
+        # Rows of the insert being filled can sit before the window if it moved on mid-batch
+        earlier = [t for z, t in self._pending if z == zone and t < self._lo]
+        if self._last_before[zone] is not None:
+            earlier.append(self._last_before[zone])
+        return max(earlier, default=None)
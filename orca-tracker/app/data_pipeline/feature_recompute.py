@@ -0,0 +1,263 @@
+"""
+Set-based recompute of the recency features the zone_calc.sql trigger maintains.
+
+fn_update_orcasighting_recency fills reportsIn5h, reportsIn24h,
+reportsInAdjacentZonesIn5h, reportsInAdjacentPlusZonesIn5h and timeSinceLastSighting
+one row at a time, as of the moment the row is inserted. After bulk backfills or
+adjacency edits the stored values go stale; the only fix used to be
+`UPDATE ... SET "zone"="zone"`, which re-runs the trigger (five correlated queries)
+for every row.
+
+recompute_features() produces the same values as that forced update with window
+functions instead: one pass per time chunk (a calendar month by default) over the
+chunk plus the 25h/1h context its windows need, a range join of each row against the
+adjacency tables, and one UPDATE that only writes rows whose values changed. Absences
+(their own table) get a second statement per chunk, with the same present sightings as
+context. verify_features() evaluates the trigger's own per-row queries and reports rows
+that disagree with what is stored.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from .models import Absence, OrcaSighting
+
+logger = logging.getLogger(__name__)
+
+# Windows must cover the widest trigger window: [t - 25h, t + 1h)
+CONTEXT_BEFORE = timedelta(hours=25)
+CONTEXT_AFTER = timedelta(hours=1)
+
+# zone text -> int the way the trigger's ::int cast reads it; anything else counts as no zone number
+_ZONE_NUM = """CASE WHEN "zone" ~ '^\\s*[0-9]+\\s*$' THEN btrim("zone")::int END"""
+
+# RANGE frames include both ends; timestamps are microsecond precision, so ending the
+# frame 1us before t + 1h gives the trigger's half-open [t - 6h, t + 1h)
+_UPPER = "INTERVAL '1 hour' - INTERVAL '1 microsecond' FOLLOWING"
+
+# Rows in the chunk's context; is_target marks the ones to update
+_SIGHTING_CTX = f"""
+    SELECT id, "time", "zone", "present" IS TRUE AS present, {_ZONE_NUM} AS zone_num,
+           ("time" >= %(start)s AND "time" < %(end)s) AS is_target
+    FROM data_pipeline_orcasighting
+    WHERE "time" >= %(ctx_start)s AND "time" < %(ctx_end)s
+"""
+_ABSENCE_CTX = f"""
+    SELECT id, "time", "zone", TRUE AS present, {_ZONE_NUM} AS zone_num, FALSE AS is_target
+    FROM data_pipeline_orcasighting
+    WHERE "present" IS TRUE AND "time" >= %(ctx_start)s AND "time" < %(ctx_end)s
+    UNION ALL
+    SELECT id, "time", "zone", FALSE, {_ZONE_NUM}, TRUE
+    FROM data_pipeline_absence
+    WHERE "time" >= %(start)s AND "time" < %(end)s
+"""
+
+_RECOMPUTE_SQL = f"""
+WITH ctx AS ({{ctx}}),
+-- Last present sighting before the context in every zone the chunk touches, so
+-- timeSinceLastSighting can look back past the start of the chunk
+seeds AS (
+    SELECT s.id, s."time", s."zone", TRUE AS present, NULL::int AS zone_num, FALSE AS is_target
+    FROM (SELECT DISTINCT "zone" FROM ctx WHERE is_target) z
+    CROSS JOIN LATERAL (
+        SELECT o.id, o."time", o."zone"
+        FROM data_pipeline_orcasighting o
+        WHERE o."zone" = z."zone" AND o."present" IS TRUE AND o."time" < %(ctx_start)s
+        ORDER BY o."time" DESC
+        LIMIT 1
+    ) s
+),
+same_zone AS (
+    SELECT id, "time", is_target,
+           COUNT(*) FILTER (WHERE present) OVER w6 AS reports_5h,
+           COUNT(*) FILTER (WHERE present) OVER w25 AS reports_24h,
+           MAX("time") FILTER (WHERE present) OVER earlier AS last_time
+    FROM (SELECT * FROM ctx UNION ALL SELECT * FROM seeds) rows
+    WINDOW
+        w6 AS (PARTITION BY "zone" ORDER BY "time"
+               RANGE BETWEEN INTERVAL '6 hours' PRECEDING AND {_UPPER} EXCLUDE CURRENT ROW),
+        w25 AS (PARTITION BY "zone" ORDER BY "time"
+                RANGE BETWEEN INTERVAL '25 hours' PRECEDING AND {_UPPER} EXCLUDE CURRENT ROW),
+        earlier AS (PARTITION BY "zone" ORDER BY "time"
+                   RANGE BETWEEN UNBOUNDED PRECEDING AND INTERVAL '1 microsecond' PRECEDING)
+),
+-- Present rows by zone number, plus one probe per (target, adjacent zone) dropped into
+-- that zone's timeline; each probe's window count is the target's count for that zone
+adjacent_rows AS (
+    SELECT NULL::bigint AS target_id, 0 AS kind, zone_num, "time", TRUE AS present, FALSE AS is_self
+    FROM ctx WHERE present AND zone_num IS NOT NULL
+    UNION ALL
+    SELECT c.id, 1, az.to_zone_id, c."time", FALSE, c.present AND c.zone_num = az.to_zone_id
+    FROM ctx c JOIN "data_pipeline_zone_adjacentZones" az ON az.from_zone_id = c.zone_num
+    WHERE c.is_target
+    UNION ALL
+    SELECT c.id, 2, naz.to_zone_id, c."time", FALSE, c.present AND c.zone_num = naz.to_zone_id
+    FROM ctx c JOIN "data_pipeline_zone_nextAdjacentZones" naz ON naz.from_zone_id = c.zone_num
+    WHERE c.is_target
+),
+adjacent_windows AS (
+    SELECT target_id, kind,
+           -- a zone listed as adjacent to itself would count the target row; the trigger excludes it
+           COUNT(*) FILTER (WHERE present) OVER w6 - is_self::int AS n
+    FROM adjacent_rows
+    WINDOW w6 AS (PARTITION BY zone_num ORDER BY "time" RANGE BETWEEN INTERVAL '6 hours' PRECEDING AND {_UPPER})
+),
+adjacent AS (
+    SELECT target_id,
+           SUM(n) FILTER (WHERE kind = 1) AS adjacent_5h,
+           SUM(n) FILTER (WHERE kind = 2) AS next_adjacent_5h
+    FROM adjacent_windows
+    WHERE target_id IS NOT NULL
+    GROUP BY target_id
+),
+features AS (
+    SELECT s.id, s.reports_5h, s.reports_24h,
+           COALESCE(a.adjacent_5h, 0) AS adjacent_5h,
+           COALESCE(a.next_adjacent_5h, 0) AS next_adjacent_5h,
+           s."time" - s.last_time AS since_last
+    FROM same_zone s LEFT JOIN adjacent a ON a.target_id = s.id
+    WHERE s.is_target
+)
+UPDATE {{table}} o SET
+    "reportsIn5h" = f.reports_5h,
+    "reportsIn24h" = f.reports_24h,
+    "reportsInAdjacentZonesIn5h" = f.adjacent_5h,
+    "reportsInAdjacentPlusZonesIn5h" = f.next_adjacent_5h,
+    "timeSinceLastSighting" = f.since_last
+FROM features f
+WHERE o.id = f.id
+  AND (o."reportsIn5h", o."reportsIn24h", o."reportsInAdjacentZonesIn5h",
+       o."reportsInAdjacentPlusZonesIn5h", o."timeSinceLastSighting")
+      IS DISTINCT FROM
+      (f.reports_5h, f.reports_24h, f.adjacent_5h, f.next_adjacent_5h, f.since_last)
+"""
+RECOMPUTE_SQL = _RECOMPUTE_SQL.format(ctx=_SIGHTING_CTX, table="data_pipeline_orcasighting")
+RECOMPUTE_ABSENCES_SQL = _RECOMPUTE_SQL.format(ctx=_ABSENCE_CTX, table="data_pipeline_absence")
+
+_FEATURE_COLUMNS = (
+    'id, "time", "zone", "reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h", '
+    '"reportsInAdjacentPlusZonesIn5h", "timeSinceLastSighting"'
+)
+
+# The trigger's own queries, evaluated per row - slow, only used to check a range
+VERIFY_SQL = f"""
+WITH expected AS (
+    SELECT n.id, n."reportsIn5h", n."reportsIn24h", n."reportsInAdjacentZonesIn5h",
+           n."reportsInAdjacentPlusZonesIn5h", n."timeSinceLastSighting",
+        (SELECT COUNT(*) FROM data_pipeline_orcasighting os
+         WHERE os."zone" = n."zone" AND os."present" IS TRUE AND os.id <> n.id
+           AND os."time" >= n."time" - INTERVAL '6 hours' AND os."time" < n."time" + INTERVAL '1 hour') AS reports_5h,
+        (SELECT COUNT(*) FROM data_pipeline_orcasighting os
+         WHERE os."zone" = n."zone" AND os."present" IS TRUE AND os.id <> n.id
+           AND os."time" >= n."time" - INTERVAL '25 hours' AND os."time" < n."time" + INTERVAL '1 hour') AS reports_24h,
+        (SELECT COUNT(*) FROM data_pipeline_orcasighting os
+         WHERE os."present" IS TRUE AND os.id <> n.id
+           AND os."time" >= n."time" - INTERVAL '6 hours' AND os."time" < n."time" + INTERVAL '1 hour'
+           AND (CASE WHEN os."zone" ~ '^\\s*[0-9]+\\s*$' THEN btrim(os."zone")::int END) IN (
+               SELECT az.to_zone_id FROM "data_pipeline_zone_adjacentZones" az
+               WHERE az.from_zone_id = (CASE WHEN n."zone" ~ '^\\s*[0-9]+\\s*$' THEN btrim(n."zone")::int END))
+        ) AS adjacent_5h,
+        (SELECT COUNT(*) FROM data_pipeline_orcasighting os
+         WHERE os."present" IS TRUE AND os.id <> n.id
+           AND os."time" >= n."time" - INTERVAL '6 hours' AND os."time" < n."time" + INTERVAL '1 hour'
+           AND (CASE WHEN os."zone" ~ '^\\s*[0-9]+\\s*$' THEN btrim(os."zone")::int END) IN (
+               SELECT naz.to_zone_id FROM "data_pipeline_zone_nextAdjacentZones" naz
+               WHERE naz.from_zone_id = (CASE WHEN n."zone" ~ '^\\s*[0-9]+\\s*$' THEN btrim(n."zone")::int END))
+        ) AS next_adjacent_5h,
+        n."time" - (SELECT MAX(os."time") FROM data_pipeline_orcasighting os
+                    WHERE os."zone" = n."zone" AND os."present" IS TRUE AND os."time" < n."time" AND os.id <> n.id
+        ) AS since_last
+    FROM (SELECT {_FEATURE_COLUMNS} FROM data_pipeline_orcasighting
+          UNION ALL
+          SELECT {_FEATURE_COLUMNS} FROM data_pipeline_absence) n
+    WHERE n."time" >= %(start)s AND n."time" < %(end)s
+    ORDER BY n."time"
+    LIMIT %(limit)s
+)
+SELECT id FROM expected
+WHERE ("reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h",
+       "reportsInAdjacentPlusZonesIn5h", "timeSinceLastSighting")
+      IS DISTINCT FROM (reports_5h, reports_24h, adjacent_5h, next_adjacent_5h, since_last)
+"""
+
+
+def _history_bounds():
+    bounds = [
+        model.objects.aggregate(first=Min("time"), last=Max("time")) for model in (OrcaSighting, Absence)
+    ]
+    firsts = [b["first"] for b in bounds if b["first"] is not None]
+    if not firsts:
+        return None, None
+    return min(firsts), max(b["last"] for b in bounds if b["last"] is not None) + timedelta(microseconds=1)
+
+
+def _month_start(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def recompute_features(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       chunk_months: int = 1) -> Dict[str, Any]:
+    """
+    Recompute the trigger-maintained recency features of every sighting and absence with
+    start <= time < end (whole history by default), chunk_months calendar months per
+    statement, each chunk in its own transaction. Returns chunk/row counts and timing.
+    """
+    first, last = _history_bounds()
+    start = start or first
+    end = end or last
+    stats = {"chunks": 0, "updated": 0, "elapsed": 0.0}
+    if start is None or end is None or start >= end:
+        logger.info("No sightings in range - nothing to recompute")
+        return stats
+
+    started = time.monotonic()
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(_month_start(chunk_start) + relativedelta(months=chunk_months), end)
+        params = {
+            "start": chunk_start,
+            "end": chunk_end,
+            "ctx_start": chunk_start - CONTEXT_BEFORE,
+            "ctx_end": chunk_end + CONTEXT_AFTER,
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(RECOMPUTE_SQL, params)
+            updated = cursor.rowcount
+            cursor.execute(RECOMPUTE_ABSENCES_SQL, params)
+            updated += cursor.rowcount
+        stats["chunks"] += 1
+        stats["updated"] += updated
+        logger.debug(f"Recomputed features {chunk_start:%Y-%m-%d} - {chunk_end:%Y-%m-%d}: {updated} rows changed")
+        chunk_start = chunk_end
+
+    stats["elapsed"] = time.monotonic() - started
+    logger.info(
+        f"Recomputed features for {start:%Y-%m-%d} - {end:%Y-%m-%d} in {stats['chunks']} chunks: "
+        f"{stats['updated']} rows changed in {stats['elapsed']:.1f}s"
+    )
+    return stats
+
+
+def verify_features(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    limit: int = 1000) -> Dict[str, Any]:
+    """
+    Check up to `limit` sightings and absences (earliest first) from [start, end) against the trigger's
+    per-row queries. Returns the number checked and the ids whose stored features differ.
+    """
+    first, last = _history_bounds()
+    start = start or first
+    end = end or last
+    if start is None:
+        return {"checked": 0, "mismatched": []}
+    with connection.cursor() as cursor:
+        cursor.execute(VERIFY_SQL, {"start": start, "end": end, "limit": limit})
+        mismatched = [row[0] for row in cursor.fetchall()]
+    checked = min(limit, sum(
+        model.objects.filter(time__gte=start, time__lt=end).count() for model in (OrcaSighting, Absence)
+    ))
+    return {"checked": checked, "mismatched": mismatched}
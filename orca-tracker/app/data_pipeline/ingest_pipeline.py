@@ -0,0 +1,498 @@
+"""
+Streaming, checkpointed ingestion pipeline.
+
+    discover -> fetch/read -> dedupe -> extract -> persist
+
+Each stage reads from a bounded queue, so a slow stage (usually extract) pushes back
+on the stages before it instead of letting work pile up in memory, and every stage
+runs at the same time as the others. Stages with workers run on their own threads;
+stages with workers=0 run on the calling thread, which is where all DB work goes
+(Django connections are per thread, and tests run inside the caller's transaction).
+
+Every source item carries a key. Once everything derived from it has left the last
+stage without an error, the key is appended to a checkpoint file, and a restarted
+run skips checkpointed keys - so a killed run resumes at the first unfinished item.
+Items that were in flight when the process died are simply done again: dedupe and
+persist are idempotent on messageId.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.db import connections
+
+from .email_processor import (
+    EXTRACTION_CONCURRENCY,
+    ZoneRegistry,
+    _extract_body_sightings,
+    _extraction_cache_key,
+    _iter_txt_month_folders,
+    _log_cache_summary,
+    _lookup_cached_sightings,
+    _persist_report_sightings,
+    _prefiltered,
+    _store_cached_sightings,
+    _txt_message_id,
+    _txt_subject,
+    read_file_with_encoding_detection,
+)
+from .feature_engine import FeatureEngine
+from .models import RawReport
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = ".pipeline_checkpoint.jsonl"
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+
+_END = object()  # end-of-stream marker passed down the queues
+
+
+class _Stopped(Exception):
+    pass
+
+
+class Checkpoint:
+    """Append-only file of finished item keys, one JSON string per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        self._file = None
+        self._needs_newline = False
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                content = f.read()
+            for line in content.splitlines():
+                try:
+                    self.done.add(json.loads(line))
+                except ValueError:
+                    # A run killed mid-write leaves a partial last line
+                    logger.warning(f"Ignoring damaged checkpoint line in {path}: {line[:80]!r}")
+            self._needs_newline = bool(content) and not content.endswith("\n")
+
+    def __contains__(self, key) -> bool:
+        return key in self.done
+
+    def mark(self, key):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+                if self._needs_newline:
+                    self._file.write("\n")
+            self._file.write(json.dumps(key) + "\n")
+            self._file.flush()
+            self.done.add(key)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Stage:
+    """
+    One pipeline step. `func(item)` returns an iterable of items for the next stage -
+    a generator, a list, or None/[] when the item is finished here.
+    workers=0 runs the stage on the calling thread; such stages must emit at most one
+    item per input.
+    """
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Optional[Iterable[Dict[str, Any]]]],
+                 workers: int = 1, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.done = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed: float, failed: bool = False):
+        with self._lock:
+            self.busy_seconds += elapsed
+            if failed:
+                self.failed += 1
+            else:
+                self.done += 1
+
+
+class Pipeline:
+    """
+    Runs `source` items through `stages`. run() blocks until the source is exhausted
+    and every item has finished, or until stop() is called.
+    """
+
+    def __init__(self, source: Iterable[Dict[str, Any]], stages: List[Stage],
+                 checkpoint: Optional[Checkpoint] = None, report_interval: float = 30.0):
+        self.source = source
+        self.stages = stages
+        self.checkpoint = checkpoint
+        self.report_interval = report_interval
+        self.discovered = 0
+        self.skipped = 0
+        self.completed = 0
+        self.failed_items = 0
+        self._outstanding: Dict[Any, int] = {}
+        self._failed_keys = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._started = 0.0
+
+    def stop(self):
+        """Stop as soon as possible; unfinished items are not checkpointed and are redone next run."""
+        self._stop.set()
+
+    # Queue plumbing
+
+    def _put(self, index: int, item):
+        stage_queue = self.stages[index].queue
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                stage_queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stage = self.stages[index]
+        stage.max_depth = max(stage.max_depth, stage_queue.qsize())
+
+    def _settle(self, key, delta: int, failed: bool = False):
+        with self._lock:
+            if failed:
+                self._failed_keys.add(key)
+            remaining = self._outstanding.get(key, 0) + delta
+            if remaining > 0:
+                self._outstanding[key] = remaining
+                return
+            self._outstanding.pop(key, None)
+            if key in self._failed_keys:
+                self._failed_keys.discard(key)
+                self.failed_items += 1
+                return
+            self.completed += 1
+        if self.checkpoint is not None:
+            self.checkpoint.mark(key)
+
+    def _process(self, index: int, item: Dict[str, Any]):
+        stage = self.stages[index]
+        key = item["key"]
+        started = time.monotonic()
+        try:
+            outputs = list(stage.func(item) or [])
+        except Exception as e:
+            stage.record(time.monotonic() - started, failed=True)
+            logger.warning(f"Pipeline stage {stage.name} failed for {key}: {e}")
+            self._settle(key, -1, failed=True)
+            return
+        stage.record(time.monotonic() - started)
+        if index + 1 < len(self.stages):
+            for output in outputs:
+                output["key"] = key
+                self._settle(key, +1)
+                self._put(index + 1, output)
+        self._settle(key, -1)
+
+    def _forward_end(self, index: int):
+        if index + 1 < len(self.stages):
+            self._put(index + 1, _END)
+
+    # Threads
+
+    def _discover(self):
+        try:
+            for item in self.source:
+                key = item["key"]
+                if self.checkpoint is not None and key in self.checkpoint:
+                    self.skipped += 1
+                    continue
+                self.discovered += 1
+                self._settle(key, +1)
+                self._put(0, item)
+        except _Stopped:
+            return
+        except Exception as e:
+            logger.exception(f"Pipeline discovery failed, finishing what was found: {e}")
+        try:
+            self._put(0, _END)
+        except _Stopped:
+            pass
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = stage.queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    # Leave the marker for this stage's other workers
+                    stage.queue.put(_END)
+                    break
+                self._process(index, item)
+        except _Stopped:
+            pass
+        finally:
+            connections.close_all()
+            with stage._lock:
+                stage._running -= 1
+                last = stage._running == 0
+        if last and not self._stop.is_set():
+            try:
+                self._forward_end(index)
+            except _Stopped:
+                pass
+
+    def _run_inline(self, inline: List[int]):
+        """Service the workers=0 stages on this thread, downstream first so queues drain."""
+        finished = set()
+        while len(finished) < len(inline) and not self._stop.is_set():
+            progressed = False
+            for index in reversed(inline):
+                if index in finished:
+                    continue
+                if index + 1 < len(self.stages) and self.stages[index + 1].queue.full():
+                    continue
+                try:
+                    item = self.stages[index].queue.get_nowait()
+                except queue.Empty:
+                    continue
+                progressed = True
+                if item is _END:
+                    finished.add(index)
+                    self._forward_end(index)
+                else:
+                    self._process(index, item)
+            if not progressed:
+                self._stop.wait(0.005)
+
+    def _report(self):
+        while not self._stop.wait(self.report_interval):
+            logger.info(self.progress_line())
+
+    def progress_line(self) -> str:
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        stages = " | ".join(
+            f"{s.name}: queue {s.queue.qsize()}/{s.queue.maxsize}, {s.done} done ({s.done / elapsed:.1f}/s)"
+            for s in self.stages
+        )
+        return f"Pipeline: {self.discovered} discovered, {self.completed} completed | {stages}"
+
+    def run(self) -> Dict[str, Any]:
+        self._started = time.monotonic()
+        threads = [threading.Thread(target=self._discover, name="pipeline-discover", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            stage._running = stage.workers
+            threads.extend(
+                threading.Thread(target=self._work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            )
+        reporter = threading.Thread(target=self._report, name="pipeline-report", daemon=True)
+        for thread in threads:
+            thread.start()
+        reporter.start()
+        try:
+            try:
+                self._run_inline([i for i, stage in enumerate(self.stages) if stage.workers == 0])
+            except _Stopped:
+                pass
+            for thread in threads:
+                thread.join()
+            if self._stop.is_set():
+                logger.warning("Pipeline stopped early - rerun to resume from the checkpoint")
+        except KeyboardInterrupt:
+            logger.warning("Pipeline interrupted - rerun to resume from the checkpoint")
+            self.stop()
+            for thread in threads:
+                thread.join()
+            raise
+        finally:
+            self._stop.set()
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        return {
+            "discovered": self.discovered,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed_items,
+            "elapsed": elapsed,
+            "stages": {
+                stage.name: {
+                    "done": stage.done,
+                    "failed": stage.failed,
+                    "busy_seconds": stage.busy_seconds,
+                    "items_per_second": stage.done / elapsed,
+                    "max_queue": stage.max_depth,
+                }
+                for stage in self.stages
+            },
+        }
+
+
+def format_pipeline_summary(summary: Dict[str, Any]) -> List[str]:
+    lines = [
+        f"Pipeline: {summary['completed']} completed, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped from checkpoint, {summary['elapsed']:.1f}s"
+    ]
+    for name, stage in summary["stages"].items():
+        lines.append(
+            f"  {name:8s} {stage['done']:7d} done {stage['failed']:5d} failed "
+            f"{stage['items_per_second']:9.1f} items/s  busy {stage['busy_seconds']:8.2f}s  max queue {stage['max_queue']}"
+        )
+    return lines
+
+
+# Report ingestion
+
+def txt_source(base_folder_path: str, year_filter: List[int] = None, month_filter: List[str] = None):
+    """Discover archive files in the year/month tree, one item per file keyed by messageId."""
+    for year_folder, month_folder, month_path, txt_files in _iter_txt_month_folders(
+        base_folder_path, year_filter, month_filter
+    ):
+        for filename in sorted(txt_files):
+            yield {
+                "key": _txt_message_id(year_folder, month_folder, filename),
+                "message_id": _txt_message_id(year_folder, month_folder, filename),
+                "path": os.path.join(month_path, filename),
+                "subject": _txt_subject(year_folder, month_folder, filename),
+                "sender": "orca_network_archive",
+            }
+
+
+def read_txt_stage(item: Dict[str, Any]):
+    item["body"] = read_file_with_encoding_detection(item["path"])
+    return [item]
+
+
+def email_source(service):
+    """Discover unread INBOX messages, one item per message keyed by Gmail id."""
+    from .email_retriver import iter_unread_message_ids
+    for msg_id in iter_unread_message_ids(service):
+        yield {"key": msg_id, "gmail_id": msg_id}
+
+
+def email_fetch_stage():
+    """Fetch stage emitting one item per text part. The Gmail client is not thread-safe, so each worker builds its own."""
+    from .email_retriver import fetch_message_parts, get_gmail_service
+    local = threading.local()
+
+    def fetch(item: Dict[str, Any]):
+        if not hasattr(local, "service"):
+            local.service = get_gmail_service()
+        subject, sender, parts = fetch_message_parts(local.service, item["gmail_id"])
+        if not parts:
+            logger.info(f"No text content for message {item['gmail_id']} - skipped")
+        for part_msg_id, body_text in parts:
+            yield {"message_id": part_msg_id, "subject": subject, "sender": sender, "body": body_text}
+    return fetch
+
+
+def report_stages(fetch: Stage, workers: int = EXTRACTION_CONCURRENCY, queue_size: int = PIPELINE_QUEUE_SIZE,
+                  cache_stats: Optional[Dict[str, int]] = None, totals: Optional[Dict[str, int]] = None) -> List[Stage]:
+    """
+    fetch -> dedupe -> extract -> persist for items carrying message_id, subject, sender and body.
+    dedupe stores the RawReport straight away (so a failed extraction leaves it for the
+    other processing paths) and resolves pre-filter and cache hits without the LLM.
+    """
+    cache_stats = cache_stats if cache_stats is not None else {"hits": 0, "misses": 0}
+    totals = totals if totals is not None else {}
+    totals.setdefault("reports", 0)
+    totals.setdefault("sightings", 0)
+    zones = ZoneRegistry()
+    features = FeatureEngine()
+
+    def dedupe(item: Dict[str, Any]):
+        report, _ = RawReport.objects.get_or_create(
+            messageId=item["message_id"],
+            defaults={"subject": item["subject"], "sender": item["sender"], "body": item["body"]},
+        )
+        if report.processed:
+            logger.debug(f"Report {report.messageId} already processed, skipping")
+            return None
+        item["report"] = report
+        if _prefiltered(report.body, cache_stats):
+            item["sightings"] = []
+            return [item]
+        item["cache_key"] = _extraction_cache_key(report.body)
+        cached = _lookup_cached_sightings([item["cache_key"]]).get(item["cache_key"])
+        if cached is not None:
+            cache_stats["hits"] += 1
+            item["sightings"] = cached
+        else:
+            cache_stats["misses"] += 1
+        return [item]
+
+    def extract(item: Dict[str, Any]):
+        if "sightings" not in item:
+            item["sightings"] = _extract_body_sightings(item["report"].body, item["report"].messageId)
+            item["store_cache"] = True
+        return [item]
+
+    def persist(item: Dict[str, Any]):
+        if item.get("store_cache"):
+            _store_cached_sightings(item["cache_key"], item["sightings"])
+        created = _persist_report_sightings(item["report"], item["sightings"], zones, features)
+        totals["reports"] += 1
+        totals["sightings"] += created
+        logger.info(f"Report {item['message_id']}: created {created} sightings.")
+        return None
+
+    return [
+        fetch,
+        Stage("dedupe", dedupe, workers=0, queue_size=queue_size),
+        Stage("extract", extract, workers=workers, queue_size=queue_size),
+        Stage("persist", persist, workers=0, queue_size=queue_size),
+    ]
+
+
+def run_ingest_pipeline(source: str, base_folder_path: Optional[str] = None, workers: int = EXTRACTION_CONCURRENCY,
+                        read_workers: int = 4, queue_size: int = PIPELINE_QUEUE_SIZE,
+                        checkpoint_path: Optional[str] = None, report_interval: float = 30.0,
+                        year_filter: List[int] = None, month_filter: List[str] = None) -> Dict[str, Any]:
+    """
+    Run the streaming pipeline for `source` ("txt" or "email"). The txt source keeps its
+    checkpoint in <base_folder_path>/.pipeline_checkpoint.jsonl unless checkpoint_path is given;
+    the email source only checkpoints when a path is given (dedupe already skips stored messages).
+    """
+    cache_stats = {"hits": 0, "misses": 0}
+    totals = {"reports": 0, "sightings": 0}
+    if source == "txt":
+        if not base_folder_path or not os.path.exists(base_folder_path):
+            raise ValueError(f"Base folder does not exist: {base_folder_path}")
+        items = txt_source(base_folder_path, year_filter, month_filter)
+        fetch = Stage("read", read_txt_stage, workers=read_workers, queue_size=queue_size)
+        checkpoint_path = checkpoint_path or os.path.join(base_folder_path, CHECKPOINT_NAME)
+    elif source == "email":
+        from .email_retriver import get_gmail_service
+        items = email_source(get_gmail_service())
+        # One fetch worker per Gmail client; Gmail throttles parallel fetches anyway
+        fetch = Stage("fetch", email_fetch_stage(), workers=max(1, min(read_workers, 4)), queue_size=queue_size)
+    else:
+        raise ValueError(f"Unknown pipeline source: {source}")
+
+    pipeline = Pipeline(
+        items,
+        report_stages(fetch, workers=workers, queue_size=queue_size, cache_stats=cache_stats, totals=totals),
+        checkpoint=Checkpoint(checkpoint_path) if checkpoint_path else None,
+        report_interval=report_interval,
+    )
+    summary = pipeline.run()
+    summary.update(totals)
+    for line in format_pipeline_summary(summary):
+        logger.info(line)
+    _log_cache_summary(cache_stats)
+    return summary
@@ -0,0 +1,294 @@
+"""
+Local stand-in for the subset of the OpenAI API the extraction pipeline uses.
+
+Serves chat completions, file upload/download and batch jobs over plain HTTP so the
+extraction flows can be run and benchmarked offline by pointing an openai.OpenAI
+client at LocalOpenAIServer.url. Completions are produced by a pluggable responder.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+Responder = Callable[[Dict[str, Any]], str]
+
+
+def empty_responder(request_body: Dict[str, Any]) -> str:
+    """Default responder - every report has no sightings."""
+    return json.dumps({"sightings": []})
+
+
+class LocalOpenAIServer:
+    """
+    Threaded HTTP server mimicking /v1/chat/completions, /v1/files and /v1/batches.
+
+    Args:
+        responder: Maps a chat completion request body to the assistant message content
+        latency: Seconds each chat completion takes, to mimic LLM response times
+        batch_workers: Completions processed in parallel inside a batch job
+        rpm_limit, tpm_limit: Enforce request/prompt-token limits per `limit_period` seconds on
+            chat completions, answering 429 with rate limit headers
+    """
+
+    def __init__(self, responder: Optional[Responder] = None, latency: float = 0.0, batch_workers: int = 8,
+                 rpm_limit: Optional[int] = None, tpm_limit: Optional[int] = None, limit_period: float = 60.0):
+        self.responder = responder or empty_responder
+        self.latency = latency
+        self.batch_workers = batch_workers
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.limit_period = limit_period
+        self.rejected_count = 0
+        self._remaining: Dict[str, float] = {}
+        self._limits_updated = time.monotonic()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.request_count = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.debug(f"Local OpenAI stand-in listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Request handling -----------------------------------------------------
+
+    def admit(self, body: Dict[str, Any]):
+        """
+        Apply the configured limits to a chat completion. Like the real API, the limits
+        replenish continuously. Returns (allowed, rate limit headers).
+        """
+        tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self._limits_updated = now - self._limits_updated, now
+            checks = []
+            for kind, limit, cost in (("requests", self.rpm_limit, 1), ("tokens", self.tpm_limit, tokens)):
+                if limit is None:
+                    continue
+                rate = limit / self.limit_period
+                self._remaining[kind] = min(limit, self._remaining.get(kind, limit) + elapsed * rate)
+                checks.append((kind, limit, min(cost, limit), rate))
+            allowed = all(self._remaining[kind] >= cost for kind, _, cost, _ in checks)
+            if allowed:
+                for kind, _, cost, _ in checks:
+                    self._remaining[kind] -= cost
+            else:
+                self.rejected_count += 1
+
+            headers = {}
+            retry_after = 0.0
+            for kind, limit, cost, rate in checks:
+                remaining = self._remaining[kind]
+                headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{kind}"] = str(int(remaining))
+                headers[f"x-ratelimit-reset-{kind}"] = f"{(limit - remaining) / rate:.3f}s"
+                retry_after = max(retry_after, (cost - remaining) / rate)
+        if not allowed:
+            headers["retry-after"] = f"{max(retry_after, 0.001):.3f}"
+        return allowed, headers
+
+    def chat_completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.responder(body)
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        with self._lock:
+            self.request_count += 1
+            self.prompt_tokens += prompt_chars // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "local"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (prompt_chars + len(content)) // 4,
+            },
+        }
+
+    def create_file(self, filename: str, purpose: str, data: bytes) -> Dict[str, Any]:
+        file_obj = {
+            "id": f"file-{uuid.uuid4().hex[:12]}",
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self._lock:
+            self.files[file_obj["id"]] = {"meta": file_obj, "data": data}
+        return file_obj
+
+    def create_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:12]}",
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "errors": None,
+            "input_file_id": body.get("input_file_id"),
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "in_progress_at": None,
+            "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        with self._lock:
+            self.batches[batch["id"]] = batch
+        threading.Thread(target=self._run_batch, args=(batch["id"],), daemon=True).start()
+        return batch
+
+    def _run_batch(self, batch_id: str):
+        batch = self.batches[batch_id]
+        source = self.files.get(batch["input_file_id"])
+        if source is None:
+            batch.update(status="failed", errors={"object": "list", "data": [{"message": "input file not found"}]})
+            return
+        lines = [json.loads(line) for line in source["data"].decode("utf-8").splitlines() if line.strip()]
+        batch.update(status="in_progress", in_progress_at=int(time.time()))
+        batch["request_counts"]["total"] = len(lines)
+
+        def run_line(line):
+            try:
+                body = self.chat_completion(line["body"])
+                return {
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": line["custom_id"],
+                    "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": body},
+                    "error": None,
+                }
+            except Exception as e:
+                return {
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": line.get("custom_id"),
+                    "response": None,
+                    "error": {"code": "server_error", "message": str(e)},
+                }
+
+        with ThreadPoolExecutor(max_workers=max(1, self.batch_workers)) as pool:
+            results = list(pool.map(run_line, lines))
+
+        output = "\n".join(json.dumps(r) for r in results).encode("utf-8")
+        out_file = self.create_file(f"{batch_id}_output.jsonl", "batch_output", output)
+        batch["request_counts"]["completed"] = sum(1 for r in results if r["error"] is None)
+        batch["request_counts"]["failed"] = sum(1 for r in results if r["error"] is not None)
+        batch.update(status="completed", output_file_id=out_file["id"], completed_at=int(time.time()))
+
+
+def _make_handler(server: LocalOpenAIServer):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            logger.debug("local-openai: " + fmt % args)
+
+        def _send_json(self, payload: Dict[str, Any], status: int = 200, headers: Optional[Dict[str, str]] = None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+            self._send_json({"error": {"message": message, "type": "invalid_request_error"}}, status, headers)
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def do_POST(self):
+            body = self._read_body()
+            if self.path == "/v1/chat/completions":
+                request = json.loads(body)
+                allowed, headers = server.admit(request)
+                if not allowed:
+                    self._send_json(
+                        {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                        429, headers,
+                    )
+                    return
+                self._send_json(server.chat_completion(request), headers=headers)
+            elif self.path == "/v1/files":
+                fields = _parse_multipart(self.headers.get("Content-Type", ""), body)
+                upload = fields.get("file") or (b"", "upload.jsonl")
+                purpose = fields.get("purpose", (b"batch", None))[0].decode("utf-8")
+                self._send_json(server.create_file(upload[1] or "upload.jsonl", purpose, upload[0]))
+            elif self.path == "/v1/batches":
+                self._send_json(server.create_batch(json.loads(body)))
+            else:
+                self._send_error(404, f"Unknown endpoint {self.path}")
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in server.batches:
+                self._send_json(server.batches[parts[2]])
+            elif parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content" and parts[2] in server.files:
+                data = server.files[parts[2]]["data"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._send_error(404, f"Unknown resource {self.path}")
+
+    return Handler
+
+
+def _parse_multipart(content_type: str, body: bytes) -> Dict[str, tuple]:
+    """Parse a multipart/form-data body into {field name: (bytes, filename)}."""
+    message = BytesParser(policy=default_policy).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = (part.get_payload(decode=True) or b"", part.get_filename())
+    return fields
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0009_predictionbatch_predictionbucket_zoneprediction_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawreport',
+            name='claimedAt',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
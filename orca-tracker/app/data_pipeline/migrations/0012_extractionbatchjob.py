@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-19 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0011_extractioncache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionBatchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=100, unique=True)),
+                ('status', models.CharField(default='validating', max_length=20)),
+                ('message_ids', models.JSONField(default=list)),
+                ('output_file_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0012_extractionbatchjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsenceWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generated_through', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,160 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Absences move out of data_pipeline_orcasighting into a narrow table range-partitioned by
+# year on "time". Ids keep coming from OrcaSighting's sequence so they stay unique across
+# both tables (the recency trigger excludes a row from its own counts by id). Rows outside
+# every yearly partition land in the DEFAULT one; fn_add_absence_partition(year) creates a
+# year's partition, moving that year's rows out of the default first.
+CREATE_SQL = """
+DO $$
+BEGIN
+    EXECUTE format($create$
+        CREATE TABLE "data_pipeline_absence" (
+            "id" bigint NOT NULL DEFAULT nextval(%L::regclass),
+            "time" timestamp with time zone NOT NULL,
+            "zone" varchar(100) NOT NULL,
+            "ZoneNumber_id" integer NULL
+                REFERENCES "data_pipeline_zone" ("zoneNumber") DEFERRABLE INITIALLY DEFERRED,
+            "reportsIn5h" integer NULL CHECK ("reportsIn5h" >= 0),
+            "reportsIn24h" integer NULL CHECK ("reportsIn24h" >= 0),
+            "reportsInAdjacentZonesIn5h" integer NULL CHECK ("reportsInAdjacentZonesIn5h" >= 0),
+            "reportsInAdjacentPlusZonesIn5h" integer NULL CHECK ("reportsInAdjacentPlusZonesIn5h" >= 0),
+            "timeSinceLastSighting" interval NULL,
+            "sunUp" boolean NULL,
+            PRIMARY KEY ("id", "time")
+        ) PARTITION BY RANGE ("time")
+    $create$, pg_get_serial_sequence('data_pipeline_orcasighting', 'id'));
+END
+$$;
+CREATE INDEX "data_pipeline_absence_time" ON "data_pipeline_absence" ("time");
+CREATE INDEX "data_pipeline_absence_ZoneNumber_id" ON "data_pipeline_absence" ("ZoneNumber_id");
+
+CREATE TABLE "data_pipeline_absence_default" PARTITION OF "data_pipeline_absence" DEFAULT;
+-- At most one absence per zone and hour bucket. A unique index on the partitioned table
+-- would have to include "time" itself, so each partition gets its own; an hour bucket never
+-- spans two yearly partitions.
+CREATE UNIQUE INDEX "data_pipeline_absence_default_zone_hour"
+    ON "data_pipeline_absence_default" ((date_trunc('hour', "time" AT TIME ZONE 'UTC')), "zone");
+
+CREATE FUNCTION fn_add_absence_partition(year integer) RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    part text := format('data_pipeline_absence_%s', year);
+    lower_bound timestamptz := make_timestamptz(year, 1, 1, 0, 0, 0, 'UTC');
+    upper_bound timestamptz := make_timestamptz(year + 1, 1, 1, 0, 0, 0, 'UTC');
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    -- One partition change at a time; a concurrent caller finds the table made
+    PERFORM pg_advisory_xact_lock(hashtext('data_pipeline_absence'));
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE "data_pipeline_absence" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM "data_pipeline_absence_default" WHERE "time" >= %L AND "time" < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, part
+    );
+    EXECUTE format(
+        'CREATE UNIQUE INDEX %I ON %I ((date_trunc(''hour'', "time" AT TIME ZONE ''UTC'')), "zone")',
+        part || '_zone_hour', part
+    );
+    EXECUTE format(
+        'ALTER TABLE "data_pipeline_absence" ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part, lower_bound, upper_bound
+    );
+    RETURN TRUE;
+END;
+$$;
+
+-- The old single-table layout, for training exports: sightings as stored, absences with
+-- the columns they all share and the ones derived from "time" filled back in
+CREATE VIEW "data_pipeline_training_sightings" AS
+SELECT "id", "raw_report_id", "time", "zone", "ZoneNumber_id", "direction", "count", "month", "dayOfWeek", "hour",
+       "reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h", "reportsInAdjacentPlusZonesIn5h",
+       "present", "timeSinceLastSighting", "isWeekend", "sunUp"
+FROM "data_pipeline_orcasighting"
+UNION ALL
+SELECT "id", NULL::bigint, "time", "zone", "ZoneNumber_id", 'none'::varchar(50), 0,
+       EXTRACT(MONTH FROM "time" AT TIME ZONE 'UTC')::integer,
+       EXTRACT(ISODOW FROM "time" AT TIME ZONE 'UTC')::integer,
+       EXTRACT(HOUR FROM "time" AT TIME ZONE 'UTC')::integer,
+       "reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h", "reportsInAdjacentPlusZonesIn5h",
+       FALSE, "timeSinceLastSighting", EXTRACT(ISODOW FROM "time" AT TIME ZONE 'UTC') >= 6, "sunUp"
+FROM "data_pipeline_absence";
+"""
+
+DROP_SQL = """
+DROP VIEW "data_pipeline_training_sightings";
+DROP FUNCTION fn_add_absence_partition(integer);
+DROP TABLE "data_pipeline_absence";
+"""
+
+# Existing absences, with the features they already have, into a partition per year
+MOVE_SQL = """
+SELECT fn_add_absence_partition(year)
+FROM (SELECT DISTINCT EXTRACT(YEAR FROM "time" AT TIME ZONE 'UTC')::integer AS year
+      FROM "data_pipeline_orcasighting" WHERE "present" IS FALSE) years;
+INSERT INTO "data_pipeline_absence"
+    ("id", "time", "zone", "ZoneNumber_id", "reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h",
+     "reportsInAdjacentPlusZonesIn5h", "timeSinceLastSighting", "sunUp")
+SELECT "id", "time", "zone", "ZoneNumber_id", "reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h",
+       "reportsInAdjacentPlusZonesIn5h", "timeSinceLastSighting", "sunUp"
+FROM "data_pipeline_orcasighting" WHERE "present" IS FALSE
+ORDER BY "id";
+DELETE FROM "data_pipeline_orcasighting" WHERE "present" IS FALSE;
+"""
+
+MOVE_BACK_SQL = """
+INSERT INTO "data_pipeline_orcasighting"
+    ("id", "raw_report_id", "time", "zone", "ZoneNumber_id", "direction", "count", "month", "dayOfWeek", "hour",
+     "reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h", "reportsInAdjacentPlusZonesIn5h",
+     "present", "timeSinceLastSighting", "isWeekend", "sunUp")
+SELECT * FROM "data_pipeline_training_sightings" WHERE "present" IS FALSE
+ORDER BY "id";
+DELETE FROM "data_pipeline_absence";
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0013_absencewatermark'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Absence',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('time', models.DateTimeField()),
+                        ('zone', models.CharField(max_length=100)),
+                        ('reportsIn5h', models.PositiveIntegerField(blank=True, null=True)),
+                        ('reportsIn24h', models.PositiveIntegerField(blank=True, null=True)),
+                        ('reportsInAdjacentZonesIn5h', models.PositiveIntegerField(blank=True, null=True)),
+                        ('reportsInAdjacentPlusZonesIn5h', models.PositiveIntegerField(blank=True, null=True)),
+                        ('timeSinceLastSighting', models.DurationField(blank=True, null=True)),
+                        ('sunUp', models.BooleanField(blank=True, null=True)),
+                        ('ZoneNumber', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='absences', to='data_pipeline.zone')),
+                    ],
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(CREATE_SQL, DROP_SQL),
+            ],
+        ),
+        migrations.RunSQL(MOVE_SQL, MOVE_BACK_SQL),
+        migrations.RemoveConstraint(
+            model_name='orcasighting',
+            name='uq_absence_zone_per_hour',
+        ),
+    ]
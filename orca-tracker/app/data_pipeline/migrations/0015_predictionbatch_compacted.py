@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0014_absence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionbatch',
+            name='compacted',
+            field=models.JSONField(blank=True, help_text='Buckets and zone probabilities packed into one value once the detail rows are pruned', null=True),
+        ),
+    ]
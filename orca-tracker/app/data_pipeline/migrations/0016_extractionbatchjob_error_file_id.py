@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0015_predictionbatch_compacted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractionbatchjob',
+            name='error_file_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
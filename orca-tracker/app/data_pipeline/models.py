@@ -1,6 +1,4 @@
 from django.db import models
-from django.db.models import Q, UniqueConstraint
-from django.db.models.functions import TruncHour
 
 # Create your models here.
 class Zone(models.Model):
@@ -21,6 +19,34 @@ class RawReport(models.Model):
     processed = models.BooleanField(default=False)
     subject = models.CharField(max_length=255)
     sender = models.CharField(max_length=255)
+    claimedAt = models.DateTimeField(null=True, blank=True)  # lease taken by a concurrent extraction run
+
+class ExtractionCache(models.Model):
+    """Model to cache LLM extraction results keyed by a hash of the normalized body, model and prompt version."""
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=16)
+    sightings = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ExtractionBatchJob(models.Model):
+    """Model to track offline LLM batch extraction jobs submitted for archive backfills."""
+    batch_id = models.CharField(max_length=100, unique=True)
+    status = models.CharField(max_length=20, default='validating')
+    message_ids = models.JSONField(default=list)  # RawReport.messageId of every request in the job
+    output_file_id = models.CharField(max_length=100, null=True, blank=True)
+    error_file_id = models.CharField(max_length=100, null=True, blank=True)  # failed requests, if any
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+
+class AbsenceWatermark(models.Model):
+    """Model to store the last hour bucket absences have been generated through (a single row)."""
+    generated_through = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
 
 class OrcaSighting(models.Model):
     """Model to store Orca sightings."""
@@ -56,15 +82,33 @@ class OrcaSighting(models.Model):
     isWeekend = models.BooleanField(default=False)
     sunUp = models.BooleanField(null=True, blank=True)
 
-    class Meta:
-        constraints = [
-            UniqueConstraint(
-                TruncHour('time'),
-                models.F('zone'),
-                name='uq_absence_zone_per_hour',
-                condition=Q(present=False),
-            ),
-        ]
+
+class Absence(models.Model):
+    """Model to store generated absences (no sighting in a zone for an hour bucket), apart from the sightings.
+
+    The table is range-partitioned by year on `time` and created by SQL (migration 0014); ids
+    come from OrcaSighting's sequence, so they are unique across both tables. The columns
+    every absence shares (count 0, direction "none", no raw report) and the ones derived from
+    `time` are left out - data_pipeline_training_sightings puts them back for training exports.
+    """
+    time = models.DateTimeField()
+    zone = models.CharField(max_length=100)
+    ZoneNumber = models.ForeignKey(
+        Zone,
+        on_delete=models.CASCADE,
+        related_name='absences',
+        to_field='zoneNumber',
+        null=True,
+        blank=True
+    )
+
+    # Filled by the same trigger function as OrcaSighting's
+    reportsIn5h = models.PositiveIntegerField(null=True, blank=True)
+    reportsIn24h = models.PositiveIntegerField(null=True, blank=True)
+    reportsInAdjacentZonesIn5h = models.PositiveIntegerField(null=True, blank=True)
+    reportsInAdjacentPlusZonesIn5h = models.PositiveIntegerField(null=True, blank=True)
+    timeSinceLastSighting = models.DurationField(null=True, blank=True)
+    sunUp = models.BooleanField(null=True, blank=True)
 
 
 class PredictionBatch(models.Model):
@@ -81,7 +125,12 @@ class PredictionBatch(models.Model):
         help_text="Version of the prediction model used"
     )
     overall_confidence = models.CharField()
-    
+    compacted = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Buckets and zone probabilities packed into one value once the detail rows are pruned"
+    )
+
 
 
 
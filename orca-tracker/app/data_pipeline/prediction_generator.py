@@ -1,3 +1,5 @@
+from .feature_engine import FeatureEngine
+from .solar import fill_sun_up
 from .models import PredictionBatch, PredictionBucket, OrcaSighting, ZonePrediction, Zone
 import xgboost as xgb
 import pandas as pd
@@ -37,9 +39,15 @@ def load_models():
         logging.error(f"Error loading models: {e}")
 
 
-def prep_sightings(sighting):
+def prep_sightings(sighting, features=None):
     """Prepares sighting data for model prediction."""
-    
+
+    if sighting.reportsIn5h is None or sighting.reportsIn24h is None:
+        # Trigger hasn't filled the recency features (yet) - compute them in-process
+        (features or FeatureEngine.warm_start(sighting.time)).fill(sighting)
+    if sighting.sunUp is None:
+        fill_sun_up([sighting])
+
     feature_data = {}
         
     # Direct feature mappings from sighting fields with handling for None values
@@ -54,7 +62,7 @@ def prep_sightings(sighting):
     feature_data['reportsIn24h'] = sighting.reportsIn24h if sighting.reportsIn24h is not None else 0
     feature_data['reportsInAdjacentZonesIn5h'] = sighting.reportsInAdjacentZonesIn5h if sighting.reportsInAdjacentZonesIn5h is not None else 0
     feature_data['reportsInAdjacentPlusZonesIn5h'] = sighting.reportsInAdjacentPlusZonesIn5h if sighting.reportsInAdjacentPlusZonesIn5h is not None else 0
-    feature_data['ZoneNumber_id'] = sighting.ZoneNumber.zoneNumber
+    feature_data['ZoneNumber_id'] = sighting.ZoneNumber_id
     if sighting.timeSinceLastSighting:
         feature_data['timeSinceLastSighting_hours'] = sighting.timeSinceLastSighting.total_seconds() / 3600
         feature_data['hours_since_last'] = sighting.timeSinceLastSighting.total_seconds() / 3600
@@ -89,9 +97,9 @@ def calculate_timeframes(start_time):
     return timeframes
 
 
-def generate_predictions(sighting):
+def generate_predictions(sighting, feature_engine=None):
     """Generates predictions for the given sighting for each zone and time bucket."""
-    features = prep_sightings(sighting) #formating the sighting data for model input
+    features = prep_sightings(sighting, feature_engine) #formating the sighting data for model input
     bucket_times = calculate_timeframes(sighting.time) #projecting bucket times to sighting time
     prediction_batch = PredictionBatch.objects.create(source_sighting=sighting) # new batch object to hold all bucket predictions
     batch_overall_prob = 0
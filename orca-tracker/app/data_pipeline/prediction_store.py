@@ -0,0 +1,151 @@
+"""
+Retention for prediction history.
+
+Every PredictionBatch writes 8 PredictionBucket rows and a ZonePrediction row per zone
+and bucket, and the admin's "generate new predictions" action writes a batch per
+selected sighting. Old batches are only read back as a whole, so compact_batches()
+packs a batch's buckets and zone probabilities into PredictionBatch.compacted and
+deletes the detail rows; thin_batches() keeps one batch per time window and deletes the
+rest. Both age batches by their source sighting's time, so batches backfilled for old
+sightings count as history as soon as they're written.
+
+batch_buckets() reads a batch's buckets and zone predictions from either format.
+
+compacted layout:
+    {"zones": [[zone, zone_number], ...],
+     "buckets": [{"time_bucket", "start_hour", "end_hour", "forecast_start", "forecast_end",
+                  "overall_probability", "ranked": [index into zones, best first],
+                  "probabilities": [probability of each ranked zone]}, ...]}
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import PredictionBatch, PredictionBucket, ZonePrediction
+
+logger = logging.getLogger(__name__)
+
+# Batches compacted (or deleted) per transaction
+PRUNE_CHUNK_SIZE = 500
+# Zones flagged is_top_5, as prediction_generator flags them
+TOP_ZONES = 5
+
+
+def _pack(batch_ids: List[int]) -> Dict[int, dict]:
+    """The compacted value of every batch in `batch_ids` that has detail rows."""
+    zones_by_bucket = defaultdict(list)
+    for bucket_id, zone, zone_number, probability in (
+        ZonePrediction.objects.filter(bucket__batch_id__in=batch_ids)
+        .order_by("bucket_id", "rank")
+        .values_list("bucket_id", "zone", "zone_number_id", "probability")
+    ):
+        zones_by_bucket[bucket_id].append((zone, zone_number, probability))
+
+    packed: Dict[int, dict] = {}
+    zone_index: Dict[int, dict] = defaultdict(dict)
+    for bucket in PredictionBucket.objects.filter(batch_id__in=batch_ids).order_by("batch_id", "bucket_start_hour"):
+        value = packed.setdefault(bucket.batch_id, {"zones": [], "buckets": []})
+        indexes = zone_index[bucket.batch_id]
+        ranked, probabilities = [], []
+        for zone, zone_number, probability in zones_by_bucket[bucket.id]:
+            if (zone, zone_number) not in indexes:
+                indexes[(zone, zone_number)] = len(value["zones"])
+                value["zones"].append([zone, zone_number])
+            ranked.append(indexes[(zone, zone_number)])
+            probabilities.append(probability)
+        value["buckets"].append({
+            "time_bucket": bucket.time_bucket,
+            "start_hour": bucket.bucket_start_hour,
+            "end_hour": bucket.bucket_end_hour,
+            "forecast_start": bucket.forecast_start_time.isoformat(),
+            "forecast_end": bucket.forecast_end_time.isoformat(),
+            "overall_probability": bucket.overall_probability,
+            "ranked": ranked,
+            "probabilities": probabilities,
+        })
+    return packed
+
+
+def compact_batches(before: datetime, chunk_size: int = PRUNE_CHUNK_SIZE) -> int:
+    """Compact every batch whose source sighting is older than `before`; returns how many were compacted."""
+    pending = PredictionBatch.objects.filter(compacted__isnull=True, source_sighting__time__lt=before).order_by("id")
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            batches = list(pending.only("id")[:chunk_size])
+            if not batches:
+                break
+            ids = [batch.id for batch in batches]
+            packed = _pack(ids)
+            for batch in batches:
+                batch.compacted = packed.get(batch.id, {"zones": [], "buckets": []})
+            PredictionBatch.objects.bulk_update(batches, ["compacted"])
+            PredictionBucket.objects.filter(batch_id__in=ids).delete()
+        compacted += len(batches)
+    if compacted:
+        logger.info(f"Compacted {compacted} prediction batches older than {before}")
+    return compacted
+
+
+def thin_batches(before: datetime, every: timedelta, chunk_size: int = PRUNE_CHUNK_SIZE) -> int:
+    """
+    Keep the latest batch (by source sighting time) in each `every`-long window before
+    `before` and delete the others; returns how many were deleted.
+    """
+    window_seconds = every.total_seconds()
+    kept: Dict[int, int] = {}
+    doomed: List[int] = []
+    for batch_id, sighting_time in (
+        PredictionBatch.objects.filter(source_sighting__time__lt=before)
+        .order_by("source_sighting__time", "id")
+        .values_list("id", "source_sighting__time")
+    ):
+        window = int(sighting_time.timestamp() // window_seconds)
+        if window in kept:
+            doomed.append(kept[window])
+        kept[window] = batch_id
+
+    for i in range(0, len(doomed), chunk_size):
+        with transaction.atomic():
+            PredictionBatch.objects.filter(id__in=doomed[i:i + chunk_size]).delete()
+    if doomed:
+        logger.info(f"Deleted {len(doomed)} prediction batches before {before}, kept {len(kept)}")
+    return len(doomed)
+
+
+def batch_buckets(batch: PredictionBatch) -> List[Tuple[PredictionBucket, List[ZonePrediction]]]:
+    """
+    The buckets of `batch` by start hour, each with its zone predictions by rank. A
+    compacted batch gives unsaved instances (no ids) built from the packed value.
+    """
+    if batch.compacted is None:
+        buckets = batch.buckets.order_by("bucket_start_hour").prefetch_related(
+            Prefetch("zone_predictions", queryset=ZonePrediction.objects.order_by("rank"))
+        )
+        return [(bucket, list(bucket.zone_predictions.all())) for bucket in buckets]
+
+    zones = batch.compacted["zones"]
+    result = []
+    for packed in batch.compacted["buckets"]:
+        bucket = PredictionBucket(
+            batch=batch,
+            time_bucket=packed["time_bucket"],
+            bucket_start_hour=packed["start_hour"],
+            bucket_end_hour=packed["end_hour"],
+            forecast_start_time=datetime.fromisoformat(packed["forecast_start"]).astimezone(dt_timezone.utc),
+            forecast_end_time=datetime.fromisoformat(packed["forecast_end"]).astimezone(dt_timezone.utc),
+            overall_probability=packed["overall_probability"],
+        )
+        predictions = [
+            ZonePrediction(
+                bucket=bucket, zone=zones[index][0], zone_number_id=zones[index][1], probability=probability,
+                rank=rank, is_top_5=rank <= TOP_ZONES,
+            )
+            for rank, (index, probability) in enumerate(zip(packed["ranked"], packed["probabilities"]), start=1)
+        ]
+        result.append((bucket, predictions))
+    return result
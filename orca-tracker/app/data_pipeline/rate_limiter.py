@@ -0,0 +1,126 @@
+"""
+Client-side rate limiting for OpenAI calls.
+
+One RateLimiter is shared by every thread that talks to the API. Each call first
+acquires one request and its estimated tokens from two token buckets (requests per
+minute, tokens per minute), so a concurrent run paces itself instead of stampeding
+into 429s and then stalling. The buckets adapt to the x-ratelimit-* headers the API
+returns on every response, and a 429 pauses all callers until its retry-after passes.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Callable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse reset headers like "1s", "6m0s" or "20ms" into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class _Bucket:
+    """Token bucket refilled continuously at limit / period."""
+
+    def __init__(self, limit: float, period: float, now: float):
+        self.limit = float(limit)
+        self.period = period
+        self.level = float(limit)
+        self.updated = now
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+    def refill(self, now: float):
+        self.level = min(self.limit, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        # Requests bigger than the whole bucket only wait for a full bucket
+        amount = min(amount, self.limit)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class RateLimiter:
+    """
+    Thread-safe requests/min and tokens/min limiter.
+
+    Args:
+        rpm: Requests allowed per period
+        tpm: Tokens allowed per period
+        period: Bucket period in seconds (60 for per-minute limits)
+    """
+
+    def __init__(self, rpm: float, tpm: float, period: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        now = clock()
+        self.requests = _Bucket(rpm, period, now)
+        self.tokens = _Bucket(tpm, period, now)
+        self._blocked_until = 0.0
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request and `tokens` tokens are available; returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(
+                    self._blocked_until - now,
+                    self.requests.wait_for(1),
+                    self.tokens.wait_for(tokens),
+                )
+                if wait <= 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= min(tokens, self.tokens.limit)
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+    def record_usage(self, estimated: int, actual: int):
+        """Correct the token bucket once the real token count of a call is known."""
+        with self._lock:
+            self.tokens.level = min(self.tokens.limit, self.tokens.level + estimated - actual)
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds`, e.g. after a 429 with retry-after."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+            self.requests.level = min(self.requests.level, 0.0)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Adopt the server's view of the limits from x-ratelimit-* response headers."""
+        with self._lock:
+            now = self._clock()
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                try:
+                    if limit is not None and float(limit) != bucket.limit:
+                        logger.info(f"Rate limit for {kind} is {limit} per {bucket.period:.0f}s")
+                        bucket.limit = float(limit)
+                    bucket.refill(now)
+                    if remaining is not None:
+                        # Trust the server when it has less left than we think - other clients share the quota
+                        bucket.level = min(bucket.level, float(remaining))
+                except ValueError:
+                    continue
@@ -1,52 +1,48 @@
 from __future__ import annotations
 import math
-import random
 import logging
 
 from collections import defaultdict
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
 from typing import Dict, Iterable, List, Tuple
 
-from django.db import IntegrityError, transaction
+import django
+import numpy as np
+from django.db import IntegrityError, connection, connections, transaction
 from django.utils import timezone
-from django.db.models import Min, Max
+from django.db.models import Min, Max, Value
+from django.db.models.functions import Coalesce, ExtractHour, ExtractMonth
 
-from .models import OrcaSighting, Zone, ZoneEffort, ZoneSeasonality
+from .absence_store import ensure_absence_partitions
+from .bulk_load import copy_rows
+from .models import Absence, AbsenceWatermark, OrcaSighting, Zone
+from .solar import zone_centroids, zone_sun_up
+from .weight_store import WeightStore
+from .zone_adjacency import ZoneAdjacency, zone_adjacency
 
 logger = logging.getLogger(__name__)
 
+# Eligibility windows, all (t - window, t]
+PRESENT_WINDOW = timedelta(hours=2)
+ADJACENT_PRESENT_WINDOW = timedelta(hours=3)
+ABSENCE_WINDOW = timedelta(hours=3)
+DOWNSAMPLE_CHUNK_SIZE = 200000
+DELETE_BATCH_SIZE = 5000
+# Smallest number of items a WeightedReservoir buffers before cutting back
+RESERVOIR_MIN_BUFFER = 100000
+# What a generated absence sets; the recency features are left to the trigger
+ABSENCE_COLUMNS = ("time", "zone", "ZoneNumber_id", "sunUp")
+
+
 def _zone_adjacency_map() -> Dict[int, List[int]]:
-    zones = Zone.objects.prefetch_related("adjacentZones").only("zoneNumber")
-    return {z.zoneNumber: [a.zoneNumber for a in z.adjacentZones.all()] for z in zones}
+    return zone_adjacency().adjacency_map()
 
 
-def _build_weight_caches():
-    # Map zoneNumber -> Zone instance for foreign key lookup
+def _build_weight_caches() -> Tuple[Dict[int, Zone], WeightStore]:
+    """zoneNumber -> Zone for every zone, and the effort×seasonality weights."""
     zones_by_number = {z.zoneNumber: z for z in Zone.objects.all()}
-    
-    # Effort/Seasonality keyed by Zone instance (zone foreign key)
-    effort = {
-        (zone, hour): float(avg)
-        for (zone, hour, avg) in ZoneEffort.objects.select_related('zone').values_list('zone', 'hour', 'avg_sightings')
-    }
-    season = {
-        (zone, month): float(avg)
-        for (zone, month, avg) in ZoneSeasonality.objects.select_related('zone').values_list('zone', 'month', 'avg_sightings')
-    }
-    return zones_by_number, effort, season
-
-
-def _zone_weights(at_time: datetime, zones_by_number: Dict[int, Zone],
-                  effort: Dict[tuple, float], season: Dict[tuple, float]) -> Dict[int, float]:
-    """Weight per zoneNumber using Effort(hour) * Seasonality(month); strictly positive."""
-    hour, month = at_time.hour, at_time.month
-    weights: Dict[int, float] = {}
-    for zone_num, zone_instance in zones_by_number.items():
-        e = effort.get((zone_instance, hour), 1.0)
-        s = season.get((zone_instance, month), 1.0)
-        w = max(e * s, 1e-6)
-        weights[zone_num] = w
-    return weights
+    return zones_by_number, WeightStore.load()
 
 
 def _eligible_zones_at(at_time: datetime, adj_map: Dict[int, List[int]]) -> List[int]:
@@ -54,7 +50,8 @@ def _eligible_zones_at(at_time: datetime, adj_map: Dict[int, List[int]]) -> List
     Determine eligible zones at timestamp 'at_time':
       - No present=true sightings in this zone in last 2 hours
       - No present=true sightings in any adjacent zone in last 3 hours
-      - No absence (present=false) already in this zone in last 3 hours
+      - No absence already in this zone in last 3 hours
+    Runs three queries; EligibilitySweep answers the same for a run of timestamps.
     """
     two_hours_ago = at_time - timedelta(hours=2)
     three_hours_ago = at_time - timedelta(hours=3)
@@ -79,8 +76,7 @@ def _eligible_zones_at(at_time: datetime, adj_map: Dict[int, List[int]]) -> List
 
     # Zones with any absence in last 3 hours (skip to avoid duplicates)
     zones_absent_3h = set(
-        OrcaSighting.objects.filter(
-            present=False, 
+        Absence.objects.filter(
             time__gt=three_hours_ago, 
             time__lte=at_time,
             ZoneNumber__isnull=False
@@ -106,6 +102,78 @@ def _eligible_zones_at(at_time: datetime, adj_map: Dict[int, List[int]]) -> List
     return eligible
 
 
+def _zone_events(events, start: datetime, end: datetime):
+    """(zoneNumber, time) of the `events` (sightings or absences) with a zone in (start, end], oldest first."""
+    return events.filter(
+        time__gt=start, time__lte=end, ZoneNumber__isnull=False
+    ).order_by("time").values_list("ZoneNumber_id", "time").iterator(chunk_size=10000)
+
+
+def _micros(when: datetime) -> int:
+    return (when - _EPOCH) // _MICROSECOND
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_NEVER = np.iinfo(np.int64).min
+
+
+class EligibilitySweep:
+    """
+    _eligible_zones_at() for a run of increasing timestamps from one ordered read of the
+    sightings instead of three queries per timestamp. Each zone's latest present and absent
+    time at or before the current timestamp is kept (as epoch microseconds, in ZoneAdjacency
+    order) as the two event streams are advanced, which is all the window checks need; the
+    adjacent-zone check is one product with the adjacency matrix. Absences the caller
+    generates along the way are reported through add_absences() so later timestamps see
+    them, as they would in the table.
+    """
+
+    def __init__(self, adjacency: ZoneAdjacency, start: datetime, end: datetime):
+        self._numbers = adjacency.numbers
+        self._index = adjacency.index
+        self._adjacent = adjacency.adjacent.astype(np.float64)
+        self._present_window = PRESENT_WINDOW // _MICROSECOND
+        self._adjacent_window = ADJACENT_PRESENT_WINDOW // _MICROSECOND
+        self._absence_window = ABSENCE_WINDOW // _MICROSECOND
+        lookback = max(PRESENT_WINDOW, ADJACENT_PRESENT_WINDOW, ABSENCE_WINDOW)
+        self._present = _zone_events(OrcaSighting.objects.filter(present=True), start - lookback, end)
+        self._absent = _zone_events(Absence.objects.all(), start - lookback, end)
+        self._next_present = next(self._present, None)
+        self._next_absent = next(self._absent, None)
+        self._last_present = np.full(len(self._numbers), _NEVER, dtype=np.int64)
+        self._last_absent = np.full(len(self._numbers), _NEVER, dtype=np.int64)
+        self._at: datetime | None = None
+
+    def eligible_at(self, at_time: datetime) -> List[int]:
+        """Eligible zones at `at_time`, in zone number order; timestamps must not go backwards."""
+        if self._at is not None and at_time < self._at:
+            raise ValueError(f"EligibilitySweep moved back from {self._at} to {at_time}")
+        self._at = at_time
+        while self._next_present is not None and self._next_present[1] <= at_time:
+            # Oldest first, so the latest always overwrites
+            self._record(self._last_present, *self._next_present)
+            self._next_present = next(self._present, None)
+        while self._next_absent is not None and self._next_absent[1] <= at_time:
+            self._record(self._last_absent, *self._next_absent)
+            self._next_absent = next(self._absent, None)
+
+        now = _micros(at_time)
+        blocked = (self._last_present > now - self._present_window) | (self._last_absent > now - self._absence_window)
+        blocked |= self._adjacent @ (self._last_present > now - self._adjacent_window) > 0
+        return self._numbers[~blocked].tolist()
+
+    def add_absences(self, at_time: datetime, zone_numbers: Iterable[int]):
+        """Count absences written at `at_time` (not later than the current timestamp)."""
+        for zone_num in zone_numbers:
+            self._record(self._last_absent, zone_num, at_time)
+
+    def _record(self, latest: np.ndarray, zone_num: int, at_time: datetime):
+        i = self._index.get(zone_num)
+        if i is not None:
+            latest[i] = max(latest[i], _micros(at_time))
+
+
 def _iter_hourly_range(start: datetime, end: datetime):
     """
     Yield hourly timestamps from start (inclusive) to end (inclusive), normalized to hour.
@@ -119,103 +187,221 @@ def _iter_hourly_range(start: datetime, end: datetime):
         t += timedelta(hours=1)
 
 
-def _weighted_downsample_absences(target_count: int, zones_by_number: Dict[int, Zone],
-                                 effort: Dict[tuple, float], season: Dict[tuple, float],
-                                 progress_callback=None) -> int:
+def _month_partitions(hours: List[datetime]) -> List[Tuple[int, int]]:
+    """(first, last + 1) index ranges of `hours` falling in the same calendar month."""
+    bounds = [0] + [
+        i for i in range(1, len(hours)) if (hours[i].year, hours[i].month) != (hours[i - 1].year, hours[i - 1].month)
+    ]
+    return list(zip(bounds, bounds[1:] + [len(hours)]))
+
+
+def _partition_eligibility(adjacency: ZoneAdjacency, zone_numbers: List[int],
+                           hours: List[datetime], offset: int) -> np.ndarray:
+    """
+    (hour index, zone number) rows eligible from the sightings alone - without the absences a
+    run would generate along the way - for one partition of the hours, in sweep order.
+    EligibilitySweep reads the 3-hour lookback before hours[0] itself, so partitions don't
+    depend on each other. Runs in a worker process.
+    """
+    known = set(zone_numbers)
+    sweep = EligibilitySweep(adjacency, hours[0], hours[-1])
+    rows = [(offset + i, zn) for i, ts in enumerate(hours) for zn in sweep.eligible_at(ts) if zn in known]
+    return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+
+def _init_partition_worker():
+    # Spawned workers start without Django; forked ones have it already. Either way the
+    # parent closed its connections first, so the worker opens its own on first query.
+    django.setup()
+
+
+def _without_generated_overlap(partitions: Iterable[np.ndarray], hours: List[datetime]) -> np.ndarray:
+    """
+    Merge per-partition eligibility in time order, dropping each candidate that falls within
+    ABSENCE_WINDOW of an earlier kept one in the same zone - what add_absences() does to a
+    serial sweep. A zone's eligibility depends only on its own generated absences, so
+    replaying them zone by zone gives exactly the serial result.
+    """
+    last_kept: Dict[int, datetime] = {}
+    kept = []
+    for rows in partitions:
+        keep = np.ones(len(rows), dtype=bool)
+        for i, (idx, zn) in enumerate(rows.tolist()):
+            ts = hours[idx]
+            last = last_kept.get(zn)
+            if last is not None and last > ts - ABSENCE_WINDOW:
+                keep[i] = False
+            else:
+                last_kept[zn] = ts
+        kept.append(rows[keep])
+    return np.concatenate(kept) if kept else np.empty((0, 2), dtype=np.int64)
+
+
+def _eligible_candidates(hours: List[datetime], zones_by_number: Dict[int, Zone],
+                         workers: int = 1, progress_callback=None) -> np.ndarray:
+    """
+    (hour index, zone number) of every absence a run over `hours` generates, each hour's
+    eligibility counting the earlier candidates. With several workers the hours are split
+    into calendar months, swept in a process pool and merged; the result is the same.
+    """
+    adjacency = zone_adjacency()
+    partitions = _month_partitions(hours)
+    if workers <= 1 or len(partitions) == 1:
+        sweep = EligibilitySweep(adjacency, hours[0], hours[-1])
+        rows = []
+        for idx, ts in enumerate(hours):
+            if progress_callback and idx % 1000 == 0:
+                progress_callback(f"Eligibility: hour {idx + 1}/{len(hours)} ({ts.strftime('%Y-%m-%d %H:%M')})")
+            candidates = [zn for zn in sweep.eligible_at(ts) if zn in zones_by_number]
+            sweep.add_absences(ts, candidates)
+            rows.extend((idx, zn) for zn in candidates)
+        return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+    if connection.in_atomic_block:
+        raise RuntimeError("Parallel eligibility can't run inside a transaction: the workers wouldn't see its rows")
+    logger.info(f"Sweeping {len(partitions)} monthly partitions with {workers} workers")
+    zone_numbers = list(zones_by_number)
+    results = []
+    # Don't hand open connections to forked workers; the parent reconnects on its next query
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_partition_worker) as pool:
+        futures = [
+            pool.submit(_partition_eligibility, adjacency, zone_numbers, hours[first:last], first)
+            for first, last in partitions
+        ]
+        for done, future in enumerate(futures, 1):
+            results.append(future.result())
+            if progress_callback:
+                month = hours[partitions[done - 1][0]].strftime("%Y-%m")
+                progress_callback(f"Eligibility: partition {done}/{len(partitions)} ({month})")
+    return _without_generated_overlap(results, hours)
+
+
+class WeightedReservoir:
+    """
+    Weighted sample without replacement of a fixed size from a stream of batches
+    (Efraimidis–Spirakis A-Res): every item gets the key log(u) / weight - u ** (1 / weight)
+    without underflow - and the `size` largest keys win. Batches are buffered and cut back
+    to `size` with argpartition whenever the buffer doubles, so memory stays O(size).
+    """
+
+    def __init__(self, size: int, rng: np.random.Generator | None = None):
+        self.size = max(0, size)
+        self._rng = rng or np.random.default_rng()
+        self._keys: List[np.ndarray] = []
+        self._items: List[np.ndarray] = []
+        self._buffered = 0
+
+    def offer(self, weights: np.ndarray, items: np.ndarray):
+        """Add a batch of items (first axis) with their positive weights."""
+        if not len(weights):
+            return
+        self._keys.append(np.log(1.0 - self._rng.random(len(weights))) / weights)
+        self._items.append(items)
+        self._buffered += len(weights)
+        if self._buffered > 2 * max(self.size, RESERVOIR_MIN_BUFFER):
+            self._compact()
+
+    def sample(self) -> np.ndarray | None:
+        """The sampled items in no particular order, None if nothing was offered."""
+        if not self._items:
+            return None
+        self._compact()
+        return self._items[0]
+
+    def _compact(self):
+        keys, items = np.concatenate(self._keys), np.concatenate(self._items)
+        if len(keys) > self.size:
+            top = np.argpartition(keys, len(keys) - self.size)[len(keys) - self.size:] if self.size else []
+            keys, items = keys[top], items[top]
+        self._keys, self._items, self._buffered = [keys], [items], len(keys)
+
+
+def _absence_columns(absence_qs, progress_callback=None, total: int | None = None):
+    """(ids, zone numbers (-1 for none), hours, months) arrays of the absences in id order, a chunk at a time."""
+    columns = absence_qs.values_list(
+        "id", Coalesce("ZoneNumber", Value(-1)), ExtractHour("time"), ExtractMonth("time")
+    ).order_by("id")
+    processed = 0
+    last_id = 0
+    while True:
+        chunk = np.array(list(columns.filter(id__gt=last_id)[:DOWNSAMPLE_CHUNK_SIZE]), dtype=np.int64).reshape(-1, 4)
+        if not len(chunk):
+            return
+        yield chunk.T
+        last_id = int(chunk[-1, 0])
+        processed += len(chunk)
+        if progress_callback:
+            progress_callback(f"Calculating weights: {processed}/{total}")
+
+
+def _delete_absences_except(kept_ids: np.ndarray, max_id: int, progress_callback=None, total: int | None = None) -> int:
+    """
+    Delete the absences with id <= max_id that aren't in kept_ids, in id order one chunk
+    at a time - rows added after max_id was read stay. Returns the number deleted.
+    """
+    kept_ids = np.sort(kept_ids)
+    deleted_count = 0
+    last_id = 0
+    ids_qs = Absence.objects.filter(id__lte=max_id).order_by("id").values_list("id", flat=True)
+    while True:
+        ids = np.array(list(ids_qs.filter(id__gt=last_id)[:DOWNSAMPLE_CHUNK_SIZE]), dtype=np.int64)
+        if not len(ids):
+            return deleted_count
+        doomed = ids[~np.isin(ids, kept_ids, assume_unique=True)]
+        for i in range(0, len(doomed), DELETE_BATCH_SIZE):
+            batch = doomed[i:i + DELETE_BATCH_SIZE].tolist()
+            deleted_count += Absence.objects.filter(id__in=batch).delete()[1].get(Absence._meta.label, 0)
+        last_id = int(ids[-1])
+
+        if progress_callback:
+            progress_callback(f"Deleting absences: {deleted_count}/{total}")
+
+
+def _weighted_downsample_absences(target_count: int, weights: WeightStore,
+                                 progress_callback=None, rng: np.random.Generator | None = None) -> int:
     """
     Downsample existing absence records to target_count using weighted sampling.
     Higher effort×seasonality zones have higher probability of retention.
+
+    Absences are read in id order, DOWNSAMPLE_CHUNK_SIZE rows at a time, as plain columns
+    into a WeightedReservoir; a second id-ordered pass deletes everything it didn't keep,
+    so memory is O(target_count + chunk).
     Returns: number of absences deleted
     """
     if target_count <= 0:
         # Delete all absences
-        deleted_count = OrcaSighting.objects.filter(present=False).count()
-        OrcaSighting.objects.filter(present=False).delete()
+        deleted_count = Absence.objects.count()
+        Absence.objects.all().delete()
         return deleted_count
-    
-    # Get all absence records with their weights
-    absence_qs = OrcaSighting.objects.filter(present=False).select_related('ZoneNumber')
+
+    absence_qs = Absence.objects.all()
     total_absences = absence_qs.count()
-    
+
     if total_absences <= target_count:
         return 0  # No downsampling needed
-    
+
     logger.info(f"Downsampling {total_absences} absences to {target_count} (removing {total_absences - target_count})")
-    
-    # Calculate weights for all absence records
-    weighted_absences = []
-    batch_size = 10000
-    processed = 0
-    
-    for batch_start in range(0, total_absences, batch_size):
-        batch = absence_qs[batch_start:batch_start + batch_size]
-        
-        for absence in batch:
-            if absence.ZoneNumber:
-                zone_instance = absence.ZoneNumber
-                e = effort.get((zone_instance, absence.hour), 1.0)
-                s = season.get((zone_instance, absence.month), 1.0)
-                weight = max(e * s, 1e-6)
-            else:
-                weight = 1e-6  # Very low weight for invalid zones
-            
-            # Use Efraimidis–Spirakis algorithm key
-            u = random.random()
-            key = u ** (1.0 / weight)
-            weighted_absences.append((key, absence.id))
-        
-        processed += len(batch)
-        if progress_callback:
-            progress_callback(f"Calculating weights: {processed}/{total_absences}")
-    
-    # Sort by key descending and keep top target_count
-    weighted_absences.sort(reverse=True, key=lambda x: x[0])
-    ids_to_keep = {absence_id for _, absence_id in weighted_absences[:target_count]}
-    
-    # Delete records not in keep set
-    deleted_count = 0
-    batch_size = 5000
-    
-    # Process deletions in batches to avoid memory issues
-    all_absence_ids = set(OrcaSighting.objects.filter(present=False).values_list('id', flat=True))
-    ids_to_delete = all_absence_ids - ids_to_keep
-    
-    for i in range(0, len(ids_to_delete), batch_size):
-        batch_ids = list(ids_to_delete)[i:i + batch_size]
-        batch_deleted = OrcaSighting.objects.filter(id__in=batch_ids).delete()[0]
-        deleted_count += batch_deleted
-        
-        if progress_callback:
-            progress_callback(f"Deleting absences: {i + len(batch_ids)}/{len(ids_to_delete)}")
-    
-    return deleted_count
 
+    reservoir = WeightedReservoir(target_count, rng)
+    max_id = 0
+    for ids, zone_numbers, hours, months in _absence_columns(absence_qs, progress_callback, total_absences):
+        reservoir.offer(weights.weights(zone_numbers, hours, months), ids)
+        max_id = int(ids[-1])
 
-def generate_absence_reports_two_phase(
-    start: datetime | None = None,
-    end: datetime | None = None,
-    step_hours: int = 1,
-    progress_callback=None,
-) -> Tuple[int, int, int, int]:
-    """
-    Two-phase absence generation:
-    Phase 1: Generate ALL eligible absence reports (ignoring ratio)
-    Phase 2: Downsample to 1:3 ratio using effort×seasonality weighting
-    
-    Returns: (total_hour_buckets_processed, total_generated, total_kept_after_downsample, total_deleted)
-    """
-    # Determine historical bounds
-    qs_bounds = OrcaSighting.objects.filter(present=True)
-    bounds = qs_bounds.aggregate(min_t=Min("time"), max_t=Max("time"))
-    min_time = bounds["min_t"]
-    max_time = bounds["max_t"]
+    return _delete_absences_except(reservoir.sample(), max_id, progress_callback, total_absences - target_count)
 
-    if not min_time or not max_time:
-        return (0, 0, 0, 0)  # no data
+
+def _absence_hours(start: datetime | None, end: datetime | None, step_hours: int) -> List[datetime]:
+    """The hour buckets to generate absences for; defaults to the span of the present sightings."""
+    # Determine historical bounds
+    bounds = OrcaSighting.objects.filter(present=True).aggregate(min_t=Min("time"), max_t=Max("time"))
+    if not bounds["min_t"] or not bounds["max_t"]:
+        return []  # no data
 
     # Use provided range or fall back to all-time range
-    start = start or min_time
-    end = end or max_time
+    start = start or bounds["min_t"]
+    end = end or bounds["max_t"]
 
     # Ensure tz-aware
     if timezone.is_naive(start):
@@ -223,71 +409,58 @@ def generate_absence_reports_two_phase(
     if timezone.is_naive(end):
         end = timezone.make_aware(end, timezone.get_current_timezone())
 
-    # Prepare iteration plan
     hours = list(_iter_hourly_range(start, end))
     if step_hours != 1:
         hours = hours[::max(1, int(step_hours))]
+    return hours
+
+
+def _insert_absences(candidates: np.ndarray, hours: List[datetime], centroids) -> int:
+    """
+    Insert (hour index, zone number) absences in order, skipping zone/hours that already have
+    an absence; returns the number attempted.
+    """
+    if not len(candidates):
+        return 0
+    times = [hours[idx] for idx in candidates[:, 0].tolist()]
+    zones = [str(zn) for zn in candidates[:, 1].tolist()]
+    ensure_absence_partitions(times)
+    copy_rows(Absence, ABSENCE_COLUMNS, [
+        (ts, zone, int(zone), up) for ts, zone, up in zip(times, zones, zone_sun_up(times, zones, centroids).tolist())
+    ], ignore_conflicts=True)
+    return len(times)
+
+
+def generate_absence_reports_two_phase(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    step_hours: int = 1,
+    progress_callback=None,
+    workers: int = 1,
+) -> Tuple[int, int, int, int]:
+    """
+    Two-phase absence generation:
+    Phase 1: Generate ALL eligible absence reports (ignoring ratio)
+    Phase 2: Downsample to 1:3 ratio using effort×seasonality weighting
+    Eligibility is computed in `workers` processes, one calendar month at a time, when above 1.
+    
+    Returns: (total_hour_buckets_processed, total_generated, total_kept_after_downsample, total_deleted)
+    """
+    hours = _absence_hours(start, end, step_hours)
     total_buckets = len(hours)
     if total_buckets == 0:
         return (0, 0, 0, 0)
 
-    zones_by_number, EFFORT, SEASON = _build_weight_caches()
-    adj_map = _zone_adjacency_map()
+    zones_by_number, weights = _build_weight_caches()
+    centroids = zone_centroids()
     
     logger.info(f"Phase 1: Generating all eligible absences for {total_buckets} hour buckets")
     
-    # PHASE 1: Generate ALL eligible absences (no ratio constraint)
+    # PHASE 1: Generate ALL eligible absences (no ratio constraint), skipping unknown zones
+    candidates = _eligible_candidates(hours, zones_by_number, workers, progress_callback)
     created_total = 0
-    
-    for idx, ts in enumerate(hours):
-        if progress_callback and idx % 100 == 0:
-            progress_callback(f"Phase 1: Processing hour {idx + 1}/{total_buckets} ({ts.strftime('%Y-%m-%d %H:%M')})")
-        
-        candidates = _eligible_zones_at(ts, adj_map)
-        if not candidates:
-            continue
-
-        # Generate absences for ALL eligible zones (no sampling)
-        is_weekend = ts.weekday() >= 5
-        objs: List[OrcaSighting] = []
-        
-        for zn in candidates:
-            zone_instance = zones_by_number.get(zn)
-            if not zone_instance:
-                continue  # Skip if zone not found
-                
-            objs.append(
-                OrcaSighting(
-                    raw_report=None,
-                    time=ts,
-                    zone=str(zn),
-                    ZoneNumber=zone_instance,
-                    direction="none",
-                    count=0,
-                    month=ts.month,
-                    dayOfWeek=ts.isoweekday(),
-                    hour=ts.hour,
-                    reportsIn5h=None,
-                    reportsIn24h=None,
-                    reportsInAdjacentZonesIn5h=None,
-                    reportsInAdjacentPlusZonesIn5h=None,
-                    present=False,
-                    timeSinceLastSighting=None,
-                    isWeekend=is_weekend,
-                    sunUp=None,
-                )
-            )
-
-        # Insert in batches
-        if objs:
-            batch_size = 1000
-            created_here = 0
-            for i in range(0, len(objs), batch_size):
-                chunk = objs[i : i + batch_size]
-                res = OrcaSighting.objects.bulk_create(chunk, ignore_conflicts=True)
-                created_here += len(res)
-            
-            created_total += created_here
+    for i in range(0, len(candidates), DOWNSAMPLE_CHUNK_SIZE):
+        created_total += _insert_absences(candidates[i:i + DOWNSAMPLE_CHUNK_SIZE], hours, centroids)
 
     if progress_callback:
         progress_callback(f"Phase 1 complete: Generated {created_total} absence records")
@@ -295,7 +468,7 @@ def generate_absence_reports_two_phase(
     # PHASE 2: Downsample to achieve 1:3 ratio
     total_present = OrcaSighting.objects.filter(present=True).count()
     target_absent = 3 * total_present
-    current_absent = OrcaSighting.objects.filter(present=False).count()
+    current_absent = Absence.objects.count()
     
     logger.info(f"Phase 2: Downsampling {current_absent} absences to {target_absent} (1:3 ratio)")
     
@@ -303,17 +476,152 @@ def generate_absence_reports_two_phase(
         progress_callback(f"Phase 2: Downsampling {current_absent} to {target_absent}")
     
     deleted_count = _weighted_downsample_absences(
-        target_absent, zones_by_number, EFFORT, SEASON, progress_callback
+        target_absent, weights, progress_callback
     )
     
     final_absent_count = current_absent - deleted_count
     
+    if start is None and end is None and step_hours == 1:
+        _record_watermark(hours[-1])
+    
     if progress_callback:
         progress_callback(f"Complete: {final_absent_count} absences kept, {deleted_count} deleted")
     
     return (total_buckets, created_total, final_absent_count, deleted_count)
 
 
+def _offer_eligible(hours: List[datetime], zones_by_number: Dict[int, Zone], weights: WeightStore,
+                    reservoir: WeightedReservoir, progress_callback=None, workers: int = 1) -> int:
+    """
+    Offer every eligible (hour, zone) to the reservoir as (-1, hour index, zone number) items,
+    eligibility counting all earlier candidates the way phase 1's inserts do. Candidates
+    colliding with an existing absence in the same zone and hour are left out - phase 1's
+    ignore_conflicts never inserts them. Returns the number of eligible (hour, zone) pairs.
+    """
+    taken = set(
+        (zone, when.replace(minute=0, second=0, microsecond=0))
+        for zone, when in Absence.objects.filter(
+            time__gte=hours[0], time__lt=hours[-1] + timedelta(hours=1)
+        ).values_list("zone", "time").iterator()
+    )
+    candidates = _eligible_candidates(hours, zones_by_number, workers, progress_callback)
+    for i in range(0, len(candidates), DOWNSAMPLE_CHUNK_SIZE):
+        chunk = candidates[i:i + DOWNSAMPLE_CHUNK_SIZE]
+        chunk = chunk[[(str(zn), hours[idx]) not in taken for idx, zn in chunk.tolist()]]
+        hour_values = np.array([hours[idx].hour for idx in chunk[:, 0].tolist()], dtype=np.int64)
+        months = np.array([hours[idx].month for idx in chunk[:, 0].tolist()], dtype=np.int64)
+        items = np.column_stack([np.full(len(chunk), -1), chunk])
+        reservoir.offer(weights.weights(chunk[:, 1], hour_values, months), items)
+    return len(candidates)
+
+
+def _insert_sampled(items: np.ndarray, hours: List[datetime]) -> int:
+    """Insert the sampled (-1, hour index, zone number) items in time order, as phase 1 does."""
+    items = items[np.lexsort((items[:, 2], items[:, 1]))]
+    return _insert_absences(items[:, 1:], hours, zone_centroids())
+
+
+def _record_watermark(last_hour: datetime):
+    """Store the last hour absences were generated for; only full, hourly runs cover every hour up to it."""
+    AbsenceWatermark.objects.update_or_create(pk=1, defaults={"generated_through": last_hour})
+
+
+def generate_absence_reports_single_phase(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    step_hours: int = 1,
+    progress_callback=None,
+    rng: np.random.Generator | None = None,
+    workers: int = 1,
+) -> Tuple[int, int, int, int]:
+    """
+    Same result distribution as the two-phase path without writing absences only to delete
+    them again. The existing absences and every eligible (hour, zone) are streamed through
+    one WeightedReservoir of the 1:3 target size. Only the kept candidates are inserted, and
+    only existing absences that lost their place are deleted.
+
+    Returns: (total_hour_buckets_processed, total_eligible, total_kept, total_deleted)
+    """
+    hours = _absence_hours(start, end, step_hours)
+    total_buckets = len(hours)
+    if total_buckets == 0:
+        return (0, 0, 0, 0)
+
+    zones_by_number, weights = _build_weight_caches()
+    target_absent = 3 * OrcaSighting.objects.filter(present=True).count()
+    reservoir = WeightedReservoir(target_absent, rng)
+
+    # Existing absences compete for the same places, as they do in phase 2. Items are
+    # (existing id or -1, hour index or -1, zone number) rows.
+    max_id = 0
+    for ids, zone_numbers, hour_values, months in _absence_columns(Absence.objects.all()):
+        items = np.column_stack([ids, np.full(len(ids), -1), zone_numbers])
+        reservoir.offer(weights.weights(zone_numbers, hour_values, months), items)
+        max_id = int(ids[-1])
+
+    logger.info(f"Sampling {target_absent} absences over {total_buckets} hour buckets")
+    eligible_total = _offer_eligible(hours, zones_by_number, weights, reservoir, progress_callback, workers)
+
+    sample = reservoir.sample()
+    if sample is None:
+        sample = np.empty((0, 3), dtype=np.int64)
+    existing = sample[:, 0] >= 0
+    deleted_count = _delete_absences_except(sample[existing, 0], max_id, progress_callback)
+    _insert_sampled(sample[~existing], hours)
+    if start is None and end is None and step_hours == 1:
+        _record_watermark(hours[-1])
+
+    final_absent_count = Absence.objects.count()
+    if progress_callback:
+        progress_callback(f"Complete: {final_absent_count} absences kept, {deleted_count} deleted")
+    return (total_buckets, eligible_total, final_absent_count, deleted_count)
+
+
+def generate_absence_reports_incremental(progress_callback=None,
+                                         rng: np.random.Generator | None = None) -> Tuple[int, int, int, int]:
+    """
+    Absences for the hours after the stored watermark only, up to the latest sighting. The
+    new hours' eligible absences are sampled (effort×seasonality weighted) down to what
+    tops the table up to the 1:3 target; earlier hours are never re-evaluated. If the table
+    is over target, e.g. after sightings were removed, it is downsampled as in phase 2.
+    Without a watermark this is a full single-phase run, which records one.
+
+    Returns: (total_hour_buckets_processed, total_eligible, total_kept, total_deleted)
+    """
+    with transaction.atomic():
+        watermark = AbsenceWatermark.objects.select_for_update().filter(pk=1).first()
+        if watermark is None:
+            logger.info("No absence watermark yet, generating for the whole history")
+            return generate_absence_reports_single_phase(progress_callback=progress_callback, rng=rng)
+
+        hours = _absence_hours(watermark.generated_through + timedelta(hours=1), None, 1)
+        zones_by_number, weights = _build_weight_caches()
+        target_absent = 3 * OrcaSighting.objects.filter(present=True).count()
+        current_absent = Absence.objects.count()
+        logger.info(f"Incremental absences: {len(hours)} new hour buckets after {watermark.generated_through}, "
+                    f"{current_absent} of {target_absent} absences")
+
+        eligible_total = inserted = 0
+        if hours:
+            reservoir = WeightedReservoir(target_absent - current_absent, rng)
+            eligible_total = _offer_eligible(hours, zones_by_number, weights, reservoir, progress_callback)
+            sample = reservoir.sample()
+            if sample is not None:
+                inserted = _insert_sampled(sample, hours)
+            _record_watermark(hours[-1])
+
+        deleted_count = 0
+        if current_absent + inserted > target_absent:
+            deleted_count = _weighted_downsample_absences(
+                target_absent, weights, progress_callback, rng
+            )
+
+    final_absent_count = current_absent + inserted - deleted_count
+    if progress_callback:
+        progress_callback(f"Complete: {inserted} absences added, {deleted_count} deleted, {final_absent_count} total")
+    return (len(hours), eligible_total, final_absent_count, deleted_count)
+
+
 # Keep original function for backward compatibility
 def generate_absence_reports_historical(
     start: datetime | None = None,
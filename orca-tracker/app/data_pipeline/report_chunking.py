@@ -0,0 +1,201 @@
+"""
+Date-segmented chunking of large report bodies.
+
+Archive files written by txt_fetcher.save_sightings_to_files can run to hundreds of
+entries, which as a single LLM call risks truncated output and a long tail latency.
+split_report_body() cuts a large body at the date headers txt_fetcher itself detects
+(is_date_line, ported here - given the archive file's month and year, as txt_fetcher
+always has them, and skipping lines that read as sighting text), packs the segments into chunks of roughly
+CHUNK_TARGET_CHARS, and falls back to entry/paragraph boundaries for segments that are
+still too big. Every chunk starts with the date header in force at that point so the
+LLM never has to guess the date. merge_sightings() dedupes the per-chunk results.
+"""
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dateutil import parser as dtparser
+
+# Bodies up to CHUNK_MAX_CHARS go in a single call; larger ones are split into ~CHUNK_TARGET_CHARS chunks
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "16000"))
+CHUNK_TARGET_CHARS = int(os.getenv("CHUNK_TARGET_CHARS", "8000"))
+
+_MONTH_PATTERN = re.compile(
+    r"\b(january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\b",
+    re.IGNORECASE,
+)
+_DAY_PATTERN = re.compile(r"\b([1-9]|[12][0-9]|3[01])(?:st|nd|rd|th)?\b", re.IGNORECASE)
+_YEAR_PATTERN = re.compile(r"\b(19\d{2}|20[0-3]\d)\b")
+# Entry separators written by save_sightings_to_files, then blank lines
+_ENTRY_BREAK = re.compile(r"\n(?=Entry \d+:\n)")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Sighting text that quotes a date, not a header: a clock time, an attribution or a photo
+# credit ("8:05 am Dec 6. At", "... Dec 6. -Rick Fria", "photos by Donna George, February 13, 2023")
+_SIGHTING_TEXT = re.compile(
+    r"^\d{1,2}:\d{2}|\b\d{1,2}(?::\d{2})?\s*[ap]\.?m\b|(?:^|\s)-[A-Z][\w.'’]*(?:\s+[\w.'’]+){0,3}\s*$|\bphotos?\s+by\b",
+    re.IGNORECASE,
+)
+# messageId of an archive file: txt_file_<year>_<Month>_<filename>
+_ARCHIVE_MESSAGE_ID = re.compile(r"^txt_file_(\d{4})_([A-Za-z]+)_")
+
+
+def is_date_line(line: str, expected_month: Optional[str] = None, expected_year: Optional[int] = None) -> bool:
+    """Check if a line is a date header (with or without year) - same rules as txt_fetcher.is_date_line."""
+    line = line.strip()
+
+    # Skip very short or very long lines
+    if len(line) < 5 or len(line) > 100:
+        return False
+
+    # Must have month and day - year is optional
+    if not (_MONTH_PATTERN.search(line) and _DAY_PATTERN.search(line)):
+        return False
+
+    if expected_month:
+        expected_month_pattern = rf"\b{expected_month.lower()}\b|\b{expected_month[:3].lower()}\b"
+        if not re.search(expected_month_pattern, line, re.IGNORECASE):
+            return False
+
+    year_match = _YEAR_PATTERN.search(line)
+    if year_match and expected_year and int(year_match.group(1)) != expected_year:
+        return False
+    return True
+
+
+def archive_period(message_id: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """(month, year) of an archive report from its messageId, or (None, None) for anything else."""
+    match = _ARCHIVE_MESSAGE_ID.match(message_id or "")
+    if not match:
+        return None, None
+    return match.group(2), int(match.group(1))
+
+
+def _is_header(line: str, expected_month: Optional[str], expected_year: Optional[int]) -> bool:
+    return is_date_line(line, expected_month, expected_year) and not _SIGHTING_TEXT.search(line.strip())
+
+
+def _date_segments(body: str, expected_month: Optional[str] = None,
+                   expected_year: Optional[int] = None) -> List[List[str]]:
+    """Split body lines into segments that each start at a date header (preamble kept on its own)."""
+    segments: List[List[str]] = [[]]
+    for line in body.splitlines():
+        if _is_header(line, expected_month, expected_year) and segments[-1]:
+            segments.append([])
+        segments[-1].append(line)
+    return [segment for segment in segments if segment]
+
+
+def _split_oversized(text: str, target_chars: int) -> List[str]:
+    """Split text at entry boundaries, then paragraphs, then lines, into pieces of ~target_chars."""
+    for pattern in (_ENTRY_BREAK, _PARAGRAPH_BREAK, re.compile(r"\n")):
+        parts = [p for p in pattern.split(text) if p.strip()]
+        if len(parts) > 1:
+            break
+    else:
+        return _split_long_line(text, target_chars)
+
+    pieces: List[str] = []
+    current = ""
+    for part in parts:
+        if len(part) > target_chars:
+            sub = _split_oversized(part, target_chars)
+            if current and len(current) < target_chars // 4:
+                # Keep short leftovers like an "Entry 12:" label with the text that follows
+                sub[0] = f"{current}\n\n{sub[0]}"
+            elif current:
+                pieces.append(current)
+            # The tail of an oversized part can still share a chunk with what follows
+            *head, current = sub
+            pieces.extend(head)
+        elif current and len(current) + len(part) + 2 > target_chars:
+            pieces.append(current)
+            current = part
+        else:
+            current = f"{current}\n\n{part}" if current else part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_long_line(text: str, target_chars: int) -> List[str]:
+    """Split a single huge line (form submissions often have no line breaks) at sentence or word ends."""
+    pieces: List[str] = []
+    while len(text) > target_chars:
+        cut = text.rfind(". ", target_chars // 2, target_chars) + 1 or text.rfind(" ", target_chars // 2, target_chars)
+        if cut <= 0:
+            cut = target_chars
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def split_report_body(body: str, max_chars: int = CHUNK_MAX_CHARS, target_chars: int = CHUNK_TARGET_CHARS,
+                      expected_month: Optional[str] = None, expected_year: Optional[int] = None) -> List[str]:
+    """
+    Split a large body into chunks at date-header boundaries.
+    Bodies up to max_chars are returned whole; every chunk of a split body starts with
+    the date header that applies to it. Pass the archive file's month and year (see
+    archive_period) so dates quoted in the sightings are not taken for headers.
+    """
+    if len(body) <= max_chars:
+        return [body]
+
+    chunks: List[str] = []
+    current = ""
+    for segment in _date_segments(body, expected_month, expected_year):
+        header = segment[0] if _is_header(segment[0], expected_month, expected_year) else ""
+        text = "\n".join(segment)
+        if len(text) > target_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            rest = "\n".join(segment[1:]) if header else text
+            for piece in _split_oversized(rest, target_chars - len(header)):
+                chunks.append(f"{header}\n{piece}" if header else piece)
+        elif current and len(current) + len(text) + 1 > target_chars:
+            chunks.append(current)
+            current = text
+        else:
+            current = f"{current}\n{text}" if current else text
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _sighting_key(sighting: Dict[str, Any]):
+    try:
+        time_key = dtparser.parse(str(sighting.get("time"))).replace(second=0, microsecond=0).isoformat()
+    except (ValueError, OverflowError):
+        time_key = str(sighting.get("time")).strip()
+    return (
+        time_key,
+        str(sighting.get("zone", "")).strip(),
+        str(sighting.get("direction", "")).strip().upper(),
+    )
+
+
+def merge_sightings(chunk_results: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge per-chunk sightings, dropping duplicates of the same time (to the minute), zone
+    and direction - an entry quoted in two chunks is one sighting. Keeps the larger count.
+    """
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for sightings in chunk_results:
+        for sighting in sightings:
+            key = _sighting_key(sighting)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = sighting
+            elif _count(sighting) > _count(existing):
+                merged[key] = sighting
+    return list(merged.values())
+
+
+def _count(sighting: Dict[str, Any]) -> int:
+    try:
+        return int(sighting.get("count"))
+    except (TypeError, ValueError):
+        return -1
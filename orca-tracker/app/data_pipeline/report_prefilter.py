@@ -0,0 +1,173 @@
+"""
+Cheap local pre-filter in front of the LLM extraction.
+
+Most of what lands in the inbox - newsletters, replies, humpback-only reports - has no
+orca sighting in it, yet every body used to cost a full LLM call. needs_extraction()
+flags a body for the LLM when it names orcas directly (orca, killer whale, Bigg's,
+J/K/L pod, T/J/K/L ID numbers, ...) or when it mentions whales of unspecified species
+together with one of the zone localities from the extraction prompt. Everything else
+is marked processed with no sightings. The rules lean towards recall: a false positive
+costs one LLM call, a false negative loses a sighting.
+
+A fixed hold-out of bodies (chosen by hash, REPORT_PREFILTER_HOLDOUT of them, 2% by
+default) goes to the LLM whatever the pre-filter says. Their cached extractions are the
+labeled sample evaluate_prefilter() is scored on by default: bodies the pre-filter would
+have skipped are in it too, so missed sightings show up in the recall.
+"""
+import hashlib
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Share of bodies sent to the LLM even when the pre-filter would skip them
+HOLDOUT_RATE = float(os.getenv("REPORT_PREFILTER_HOLDOUT", "0.02"))
+
+# Names that contain orca terms but are not orcas
+_NOT_ORCAS = re.compile(
+    r"\b(?:orcas island|west sound orcas|orcas village|orcas landing|orcas ferry|false killer whales?)\b"
+)
+
+_ORCA_TERMS = re.compile(
+    r"\b(?:orcas?|orcinus|killer\s*whales?|biggs?'?s?|transients?|srkws?|southern\s+residents?|"
+    r"[jkl][\s-]?pods?|[jkl]\d{1,3}s?|t\d{2,3}[a-z]?\d?s?|[jkl]s\b|"
+    r"residents?\s+(?:whales?|orcas?|pods?))\b"
+)
+
+_WHALE_TERMS = re.compile(r"\b(?:whales?|pods?|dorsal\s+fins?)\b")
+# Only counted when no other species is named - a humpback report is full of blows and breaches
+_BEHAVIOUR_TERMS = re.compile(r"\b(?:blows?|breach(?:es|ed|ing)?|spy\s*hops?|tail\s+slaps?)\b")
+
+# Other species - removed before looking for whale terms so "humpback whale" alone doesn't count
+_OTHER_SPECIES = re.compile(
+    r"\b(?:humpbacks?|minkes?)(?:\s+whales?)?\b|"
+    r"\b(?:gray|grey|fin|blue|sperm|pilot|right)\s+whales?\b|"
+    r"\b(?:porpoises?|dolphins?|sea\s+lions?|seals?|otters?)\b"
+)
+
+# Trailing qualifiers in the prompt's locality lists ("Cattle Pass rips", "Dabob Bay area waters")
+_LOCALITY_QUALIFIERS = re.compile(
+    r"\s+(?:offshore|outer(?:\s+harbor)?|waters|area\s+waters|approaches|entrance|edge|mouths?|"
+    r"both\s+(?:mouths|bridges)|rips?|shoals|entire|shore|ferry\s+lanes|north/west|us\s+side\s+edge|"
+    r"south\s+mouth|whale\s+trail|north|south|east|west|northeast|northwest|southeast|southwest|central)$"
+)
+_GENERIC_PLACE_WORDS = {"north", "south", "east", "west", "central", "bay", "island", "point"}
+
+
+def _zone_localities(prompt: str) -> List[str]:
+    """Locality names from the "Zone Reference" lines of the extraction prompt."""
+    localities = set()
+    for line in prompt.splitlines():
+        match = re.match(r"^\d{1,2} (.+?) - (.+)$", line.strip())
+        if not match:
+            continue
+        zone_name, places = match.groups()
+        for name in [*re.split(r"\s*&\s*", zone_name), *places.split(",")]:
+            for part in _strip_qualifiers(name.strip().lower()).split("/"):
+                part = _strip_qualifiers(part.strip())
+                if len(part) > 3 and part not in _GENERIC_PLACE_WORDS:
+                    localities.add(part)
+    return sorted(localities, key=len, reverse=True)
+
+
+def _strip_qualifiers(name: str) -> str:
+    while True:
+        stripped = _LOCALITY_QUALIFIERS.sub("", name)
+        if stripped == name:
+            return name
+        name = stripped
+
+
+@lru_cache(maxsize=None)
+def _locality_pattern() -> "re.Pattern":
+    # Imported here - email_processor imports this module
+    from .email_processor import PROMPT_TEMPLATE
+    names = _zone_localities(PROMPT_TEMPLATE)
+    return re.compile(r"\b(?:" + "|".join(re.escape(name) for name in names) + r")\b")
+
+
+def prefilter_features(body: str) -> Dict[str, int]:
+    """Match counts behind the needs_extraction() decision, for logging and evaluation."""
+    text = _NOT_ORCAS.sub(" ", " ".join(body.lower().split()))
+    orca = len(_ORCA_TERMS.findall(text))
+    text, other_species = _OTHER_SPECIES.subn(" ", text)
+    whale = len(_WHALE_TERMS.findall(text))
+    if not other_species:
+        whale += len(_BEHAVIOUR_TERMS.findall(text))
+    return {
+        "orca_terms": orca,
+        "other_species": other_species,
+        "whale_terms": whale,
+        "localities": len(_locality_pattern().findall(text)),
+    }
+
+
+def needs_extraction(body: str) -> bool:
+    """True if the body may contain an orca sighting and should go to the LLM."""
+    if not body or not body.strip():
+        return False
+    features = prefilter_features(body)
+    return features["orca_terms"] > 0 or (features["whale_terms"] > 0 and features["localities"] > 0)
+
+
+def in_holdout(body: str, rate: Optional[float] = None) -> bool:
+    """True if the body is in the hold-out that bypasses the pre-filter; the same body always is."""
+    rate = HOLDOUT_RATE if rate is None else rate
+    digest = hashlib.sha256(" ".join(body.lower().split()).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) / 2**32 < rate
+
+
+def evaluate_prefilter(samples: Iterable[Tuple[str, bool]]) -> Dict[str, Any]:
+    """
+    Score needs_extraction() against (body, has_orca_sighting) labels.
+    Precision/recall are for the "send to LLM" class; `avoided` counts LLM calls saved.
+    """
+    stats = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+    for body, label in samples:
+        predicted = needs_extraction(body)
+        if predicted and label:
+            stats["tp"] += 1
+        elif predicted:
+            stats["fp"] += 1
+        elif label:
+            stats["fn"] += 1
+        else:
+            stats["tn"] += 1
+    total = sum(stats.values())
+    stats["total"] = total
+    stats["avoided"] = stats["fn"] + stats["tn"]
+    stats["precision"] = stats["tp"] / max(stats["tp"] + stats["fp"], 1)
+    stats["recall"] = stats["tp"] / max(stats["tp"] + stats["fn"], 1)
+    return stats
+
+
+def labeled_holdout_sample(limit: int = 2000) -> List[Tuple[str, bool]]:
+    """
+    (body, has_sightings) pairs for processed hold-out reports, labeled by their cached LLM
+    extraction. The hold-out reaches the LLM whatever the pre-filter says, so this is a
+    random sample of all reports rather than of the ones the pre-filter let through.
+    Raising HOLDOUT_RATE only widens the sample for reports processed after the change.
+    """
+    from .email_processor import _extraction_cache_key, _lookup_cached_sightings
+    from .models import RawReport
+
+    sample: List[Tuple[str, bool]] = []
+    bodies = RawReport.objects.filter(processed=True).order_by("-id").values_list("body", flat=True)
+    chunk: List[str] = []
+    for body in bodies.iterator(chunk_size=2000):
+        if not in_holdout(body):
+            continue
+        chunk.append(body)
+        if len(chunk) == 500:
+            sample.extend(_label_chunk(chunk, _extraction_cache_key, _lookup_cached_sightings))
+            chunk = []
+            if len(sample) >= limit:
+                break
+    sample.extend(_label_chunk(chunk, _extraction_cache_key, _lookup_cached_sightings))
+    return sample[:limit]
+
+
+def _label_chunk(bodies, cache_key, lookup) -> List[Tuple[str, bool]]:
+    keys = [cache_key(body) for body in bodies]
+    cached = lookup(keys)
+    return [(body, bool(cached[key])) for body, key in zip(bodies, keys) if key in cached]
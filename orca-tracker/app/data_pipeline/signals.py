@@ -0,0 +1,24 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Zone
+from .solar import invalidate_zone_centroids
+from .zone_adjacency import invalidate_zone_adjacency
+from .zone_geometry import invalidate_zone_geometry
+
+
+@receiver(post_save, sender=Zone)
+@receiver(post_delete, sender=Zone)
+def zone_changed(sender, **kwargs):
+    """Rebuild the zone geometry and centroids after a boundary may have changed, and the adjacency after a zone came or went."""
+    invalidate_zone_geometry()
+    invalidate_zone_centroids()
+    invalidate_zone_adjacency()
+
+
+@receiver(m2m_changed, sender=Zone.adjacentZones.through)
+@receiver(m2m_changed, sender=Zone.nextAdjacentZones.through)
+def adjacency_changed(sender, action, **kwargs):
+    """Rebuild the adjacency matrices after zones were (un)linked."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_zone_adjacency()
@@ -0,0 +1,242 @@
+"""
+Vectorized solar position (NOAA solar calculator equations) for the sunUp feature.
+
+zone_calc.sql used to set sunUp from a per-month table of sunrise/sunset clock times
+compared against the UTC time of day, which is off by 7-8 hours for Puget Sound. Here
+the sun's elevation is computed for every (time, zone centroid) pair in one NumPy call,
+and a sighting counts as "sun up" while the sun is above civil twilight (-6 deg) - the
+table's sunrise/sunset were widened by 30 minutes for the same reason.
+
+Zone centroids come from Zone.boundary (GeoJSON or WKT polygons, see zone_geometry.py),
+parsed once per run.
+
+The prediction models were trained on the table's values, so writers keep producing them
+(table_sun_up, the trigger's table in NumPy) until SOLAR_SUN_UP=1 is set together with
+models retrained on backfill_sun_up()'s values (Pre-Prod/model_trianing/README.md).
+
+Centroids are cached per process like the zone geometry; Zone saves/deletes invalidate
+them (see signals.py).
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .feature_engine import zone_number
+from .models import Absence, OrcaSighting, Zone
+from .zone_geometry import parse_boundary
+
+logger = logging.getLogger(__name__)
+
+# Sun elevation (degrees) above which a sighting counts as sunUp - civil twilight
+SUN_UP_ELEVATION = -6.0
+# (lat, lon) used for zones without a usable boundary - mid Haro Strait
+DEFAULT_CENTROID = (48.5, -123.15)
+BACKFILL_BATCH_SIZE = 50000
+CENTROID_TTL = 600
+# Solar sunUp for new rows; off until the models are retrained on it
+SOLAR_SUN_UP = os.getenv("SOLAR_SUN_UP", "0") == "1"
+
+# zone_calc.sql's sunUp table: month -> (sunrise, sunset) UTC minutes, already widened by 30 minutes
+TRIGGER_SUN_TABLE = np.array([
+    (0, 0), (450, 1020), (420, 1080), (390, 1185), (360, 1230), (300, 1275), (280, 1295),
+    (290, 1285), (320, 1250), (365, 1195), (400, 1130), (440, 1030), (455, 1010),
+])
+
+UPDATE_SQL = """
+UPDATE {table} AS o
+SET "sunUp" = v.sun_up
+FROM unnest(%s::bigint[], %s::boolean[]) AS v(id, sun_up)
+WHERE o.id = v.id AND o."sunUp" IS DISTINCT FROM v.sun_up
+"""
+
+
+def _epoch_seconds(times) -> np.ndarray:
+    """Seconds since the epoch for a datetime64 array or a sequence of datetimes (naive = default time zone)."""
+    if isinstance(times, np.ndarray) and np.issubdtype(times.dtype, np.datetime64):
+        return times.astype("datetime64[us]").astype(np.int64) / 1e6
+    return np.array([
+        (timezone.make_aware(t) if timezone.is_naive(t) else t).timestamp() for t in times
+    ], dtype=np.float64)
+
+
+def solar_elevation(times, lat, lon) -> np.ndarray:
+    """Sun elevation in degrees (no refraction correction) at `times` for arrays or scalars of lat/lon."""
+    seconds = _epoch_seconds(times)
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.asarray(lon, dtype=np.float64)
+
+    jc = (seconds / 86400.0 + 2440587.5 - 2451545.0) / 36525.0  # Julian centuries since J2000
+    mean_long = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    eq_of_ctr = np.radians(
+        np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * mean_anom) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * jc)
+    app_long = mean_long + eq_of_ctr - np.radians(0.00569 + 0.00478 * np.sin(omega))
+    obliq = np.radians(
+        23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+        + 0.00256 * np.cos(omega)
+    )
+    declination = np.arcsin(np.sin(obliq) * np.sin(app_long))
+
+    var_y = np.tan(obliq / 2) ** 2
+    eq_of_time = 4 * np.degrees(  # minutes
+        var_y * np.sin(2 * mean_long)
+        - 2 * eccent * np.sin(mean_anom)
+        + 4 * eccent * var_y * np.sin(mean_anom) * np.cos(2 * mean_long)
+        - 0.5 * var_y ** 2 * np.sin(4 * mean_long)
+        - 1.25 * eccent ** 2 * np.sin(2 * mean_anom)
+    )
+    true_solar_minutes = (np.mod(seconds, 86400.0) / 60.0 + eq_of_time + 4 * lon) % 1440
+    hour_angle = np.radians(true_solar_minutes / 4 - 180)
+
+    cos_zenith = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    return 90 - np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+
+
+def sun_up(times, lat, lon) -> np.ndarray:
+    """Boolean sunUp for every (time, lat, lon), broadcasting scalars."""
+    return solar_elevation(times, lat, lon) > SUN_UP_ELEVATION
+
+
+def table_sun_up(times) -> np.ndarray:
+    """Boolean sunUp from the trigger's month table, comparing the UTC time of day like zone_calc.sql."""
+    stamps = _epoch_seconds(times).astype(np.int64).astype("datetime64[s]")
+    months = stamps.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    minutes = (stamps - stamps.astype("datetime64[D]")).astype(np.int64) // 60
+    return (minutes >= TRIGGER_SUN_TABLE[months, 0]) & (minutes < TRIGGER_SUN_TABLE[months, 1])
+
+
+def zone_sun_up(times, zones: Iterable[str], centroids: Dict[int, Tuple[float, float]]) -> np.ndarray:
+    """sunUp for (time, zone string) pairs: the solar value if SOLAR_SUN_UP, else the trigger table's."""
+    if not SOLAR_SUN_UP:
+        return table_sun_up(times)
+    lat, lon = centroid_arrays(zones, centroids)
+    return sun_up(times, lat, lon)
+
+
+def boundary_centroid(boundary: str) -> Optional[Tuple[float, float]]:
+    """(lat, lon) centroid of a GeoJSON / WKT (multi)polygon or point boundary, None if there isn't one."""
+    try:
+        # Exterior rings only
+        rings = [polygon[0] for polygon in parse_boundary(boundary) if polygon]
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError) as e:
+        logger.warning(f"Could not parse zone boundary {(boundary or '')[:80]!r}: {e}")
+        return None
+    if not rings:
+        return None
+
+    # Area-weighted centroid in lon/lat - zones are small enough for planar geometry
+    area_sum = cx_sum = cy_sum = 0.0
+    for ring in rings:
+        x, y = ring[:, 0], ring[:, 1]
+        x1, y1 = np.roll(x, -1), np.roll(y, -1)
+        cross = x * y1 - x1 * y
+        area = cross.sum() / 2
+        if area:
+            area_sum += area
+            cx_sum += ((x + x1) * cross).sum() / 6
+            cy_sum += ((y + y1) * cross).sum() / 6
+    if area_sum:
+        return float(cy_sum / area_sum), float(cx_sum / area_sum)
+    vertices = np.concatenate(rings)
+    return float(vertices[:, 1].mean()), float(vertices[:, 0].mean())
+
+
+def zone_centroids(zones: Optional[Iterable[Tuple[int, str]]] = None) -> Dict[int, Tuple[float, float]]:
+    """zoneNumber -> (lat, lon) for every zone with a usable boundary, from (zoneNumber, boundary) pairs or the Zone table."""
+    if zones is None:
+        zones = Zone.objects.values_list("zoneNumber", "boundary")
+    centroids = {}
+    for number, boundary in zones:
+        centroid = boundary_centroid(boundary)
+        if centroid is None:
+            logger.debug(f"Zone {number} has no usable boundary, using the default centroid")
+        else:
+            centroids[number] = centroid
+    return centroids
+
+
+def centroid_arrays(zones: Iterable[str], centroids: Dict[int, Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude arrays for sighting zone strings."""
+    points = np.array([centroids.get(zone_number(zone), DEFAULT_CENTROID) for zone in zones], dtype=np.float64)
+    if not len(points):
+        return np.empty(0), np.empty(0)
+    return points[:, 0], points[:, 1]
+
+
+_cache: Dict[str, object] = {"centroids": None, "built": 0.0}
+_cache_lock = threading.Lock()
+
+
+def cached_zone_centroids() -> Dict[int, Tuple[float, float]]:
+    """This process's zone_centroids(), built from the Zone table on first use."""
+    with _cache_lock:
+        if _cache["centroids"] is None or time.monotonic() - _cache["built"] > CENTROID_TTL:
+            _cache["centroids"] = zone_centroids()
+            _cache["built"] = time.monotonic()
+        return _cache["centroids"]
+
+
+def invalidate_zone_centroids(**kwargs):
+    """Drop the cached centroids; connected to Zone saves and deletes."""
+    with _cache_lock:
+        _cache["centroids"] = None
+
+
+def fill_sun_up(sightings: List[OrcaSighting], centroids: Optional[Dict[int, Tuple[float, float]]] = None):
+    """Set sunUp on unsaved sightings in one vectorized call (cached centroids by default)."""
+    if not sightings:
+        return
+    if centroids is None:
+        centroids = cached_zone_centroids()
+    values = zone_sun_up([s.time for s in sightings], (s.zone for s in sightings), centroids)
+    for sighting, value in zip(sightings, values):
+        sighting.sunUp = bool(value)
+
+
+def backfill_sun_up(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    batch_size: int = BACKFILL_BATCH_SIZE, only_missing: bool = False) -> Dict[str, Any]:
+    """
+    Recompute sunUp for stored sightings and absences in [start, end) (all of them by
+    default), `batch_size` rows per transaction in id order. Only rows whose value changes
+    are written. Writes the solar values only when SOLAR_SUN_UP is set.
+    """
+    centroids = zone_centroids()
+    stats = {"checked": 0, "updated": 0, "elapsed": 0.0}
+    started = time.monotonic()
+    for model in (OrcaSighting, Absence):
+        rows = model.objects.all()
+        if start is not None:
+            rows = rows.filter(time__gte=start)
+        if end is not None:
+            rows = rows.filter(time__lt=end)
+        if only_missing:
+            rows = rows.filter(sunUp__isnull=True)
+
+        update_sql = UPDATE_SQL.format(table=connection.ops.quote_name(model._meta.db_table))
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id).order_by("id").values_list("id", "time", "zone")[:batch_size])
+            if not batch:
+                break
+            ids, times, zones = zip(*batch)
+            values = zone_sun_up(times, zones, centroids)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(update_sql, [list(ids), values.tolist()])
+                stats["updated"] += cursor.rowcount
+            stats["checked"] += len(batch)
+            last_id = ids[-1]
+            logger.info(f"sunUp backfill: {stats['checked']} rows checked, {stats['updated']} updated")
+    stats["elapsed"] = time.monotonic() - started
+    return stats
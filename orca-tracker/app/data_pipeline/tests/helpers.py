@@ -0,0 +1,22 @@
+"""Factories shared by the data_pipeline test modules."""
+import json
+from ..models import OrcaSighting, Zone
+
+
+def make_sighting(when, zone, present=True):
+    """Unsaved OrcaSighting at `when`. `zone` is a zone string, a Zone (linked as ZoneNumber) or None ("Unknown")."""
+    zone_number = zone if isinstance(zone, Zone) else None
+    if zone_number is not None:
+        zone = str(zone_number.zoneNumber)
+    return OrcaSighting(
+        time=when, zone=zone if zone is not None else "Unknown", ZoneNumber=zone_number, count=1,
+        month=when.month, dayOfWeek=when.isoweekday(), hour=when.hour, present=present,
+    )
+
+
+def sighting_responder(request_body):
+    """LocalOpenAIServer / fake batch responder: one sighting per request, invalid JSON for "broken" reports."""
+    report_text = request_body["messages"][-1]["content"]
+    if "broken" in report_text:
+        return "not json"
+    return json.dumps({"sightings": [{"time": "2024-07-01T10:00:00Z", "zone": "6", "direction": "N", "count": 4}]})
@@ -0,0 +1,56 @@
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from datetime import datetime, timedelta, timezone
+from ..absence_store import TRAINING_VIEW, ensure_absence_partitions
+from ..models import Absence, OrcaSighting, Zone
+
+
+class AbsenceStoreTests(TestCase):
+
+    def setUp(self):
+        self.zone = Zone.objects.create(zoneNumber=3, name="Zone 3", boundary="", localities="")
+        self.times = [datetime(2023, 12, 31, 23, 30, tzinfo=timezone.utc), datetime(2024, 1, 1, tzinfo=timezone.utc),
+                      datetime(2024, 6, 1, 12, 15, tzinfo=timezone.utc)]
+        Absence.objects.bulk_create([Absence(time=when, zone="3", ZoneNumber=self.zone) for when in self.times])
+
+    def _partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT "time", tableoid::regclass::text FROM "data_pipeline_absence" ORDER BY "time"')
+            return cursor.fetchall()
+
+    def test_partitions_take_over_default_rows(self):
+        self.assertEqual({table for _, table in self._partitions()}, {"data_pipeline_absence_default"})
+
+        # 2023-12-31 23:30 in UTC-8 is still 2023 in UTC
+        self.assertEqual(ensure_absence_partitions([datetime(2024, 3, 1, tzinfo=timezone(timedelta(hours=-8)))]), 1)
+        self.assertEqual(self._partitions(), [
+            (self.times[0], "data_pipeline_absence_default"),
+            (self.times[1], "data_pipeline_absence_2024"),
+            (self.times[2], "data_pipeline_absence_2024"),
+        ])
+        self.assertEqual(ensure_absence_partitions(self.times), 1)
+        self.assertEqual(ensure_absence_partitions(self.times + [self.times[0]]), 0)
+        self.assertEqual(ensure_absence_partitions([]), 0)
+        self.assertEqual(self._partitions()[0][1], "data_pipeline_absence_2023")
+
+        # Each partition keeps one absence per zone and hour
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Absence.objects.create(time=self.times[2] + timedelta(minutes=30), zone="3")
+        Absence.objects.create(time=self.times[2] + timedelta(minutes=30), zone="4")
+        self.assertEqual(Absence.objects.filter(time__year=2024).count(), 3)
+
+    def test_training_view_has_the_old_layout(self):
+        sighting = OrcaSighting.objects.create(time=self.times[1], zone="3", ZoneNumber=self.zone, count=2, month=1,
+                                               dayOfWeek=1, hour=0, present=True, isWeekend=False)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT "id", "direction", "count", "month", "dayOfWeek", "hour", "present", "isWeekend" '
+                           f'FROM "{TRAINING_VIEW}" ORDER BY "time", "present"')
+            rows = cursor.fetchall()
+        absences = list(Absence.objects.order_by("time").values_list("id", flat=True))
+        self.assertEqual(rows, [
+            (absences[0], "none", 0, 12, 7, 23, False, True),
+            (absences[1], "none", 0, 1, 1, 0, False, False),
+            (sighting.id, None, 2, 1, 1, 0, True, False),
+            (absences[2], "none", 0, 6, 6, 12, False, True),
+        ])
+        self.assertNotIn(sighting.id, absences)
@@ -0,0 +1,200 @@
+from django.test import TestCase
+from unittest.mock import patch
+import json
+import os
+import tempfile
+import openai
+from ..batch_extraction import (
+    BatchClient, OpenAIBatchClient, apply_batch_results, ingest_txt_reports,
+    pending_archive_reports, run_batch_backfill, submit_batch_extraction, wait_for_batch_jobs
+)
+from ..email_processor import _extraction_cache_key
+from ..local_openai_server import LocalOpenAIServer
+from ..models import ExtractionBatchJob, ExtractionCache, OrcaSighting, RawReport
+from .helpers import sighting_responder
+
+
+class FakeBatchClient(BatchClient):
+    """In-memory batch provider that completes a job on the first poll."""
+
+    def __init__(self, responder=sighting_responder):
+        self.responder = responder
+        self.submitted = {}
+        self.outputs = {}
+
+    def submit(self, jsonl_path, metadata=None):
+        with open(jsonl_path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        batch_id = f"batch_{len(self.submitted)}"
+        self.submitted[batch_id] = lines
+        return batch_id
+
+    def retrieve(self, batch_id):
+        output_id = f"out_{batch_id}"
+        if output_id not in self.outputs:
+            results = []
+            for line in self.submitted[batch_id]:
+                content = self.responder(line["body"])
+                body = {"choices": [{"message": {"content": content}}]}
+                results.append({"custom_id": line["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+            self.outputs[output_id] = "\n".join(json.dumps(r) for r in results)
+        return {"status": "completed", "output_file_id": output_id}
+
+    def download(self, file_id):
+        return self.outputs[file_id]
+
+
+class ErrorOnlyBatchClient(FakeBatchClient):
+    """Batch provider whose jobs complete with every request failed - an error file and no output."""
+
+    def retrieve(self, batch_id):
+        error_id = f"err_{batch_id}"
+        self.outputs[error_id] = "\n".join(json.dumps({
+            "custom_id": line["custom_id"],
+            "response": {"status_code": 500, "body": {"error": {"message": "server error"}}},
+            "error": None,
+        }) for line in self.submitted[batch_id])
+        return {"status": "completed", "output_file_id": None, "error_file_id": error_id}
+
+
+class BatchExtractionTests(TestCase):
+
+    def setUp(self):
+        self.reports = [
+            RawReport.objects.create(
+                messageId=f"txt_file_2024_07_{i}.txt",
+                subject="Orca Network Report",
+                sender="orca_network_archive",
+                body=f"Orcas passing Lime Kiln report {i}",
+            )
+            for i in range(3)
+        ]
+
+    def test_submit_wait_and_apply(self):
+        """Every pending report goes into one job and its results are applied by messageId"""
+        client = FakeBatchClient()
+        jobs = submit_batch_extraction(client)
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(sorted(jobs[0].message_ids), sorted(r.messageId for r in self.reports))
+        # Reports already in an active job are not submitted twice
+        self.assertEqual(pending_archive_reports().count(), 0)
+
+        wait_for_batch_jobs(client, jobs, poll_interval=0)
+        stats = apply_batch_results(jobs[0], client)
+
+        self.assertEqual(stats["applied"], 3)
+        self.assertEqual(OrcaSighting.objects.count(), 3)
+        self.assertFalse(RawReport.objects.filter(processed=False).exists())
+        self.assertEqual(ExtractionCache.objects.count(), 3)
+
+    def test_apply_is_idempotent(self):
+        """Applying the same job twice does not duplicate sightings"""
+        client = FakeBatchClient()
+        job = submit_batch_extraction(client)[0]
+        wait_for_batch_jobs(client, [job], poll_interval=0)
+        apply_batch_results(job, client)
+        stats = apply_batch_results(job, client)
+
+        self.assertEqual(stats["applied"], 0)
+        self.assertEqual(stats["skipped"], 3)
+        self.assertEqual(OrcaSighting.objects.count(), 3)
+
+    def test_failed_results_stay_unprocessed(self):
+        """A malformed result leaves its report pending for the next submission"""
+        broken = self.reports[0]
+        broken.body = "broken orca report"
+        broken.save()
+        client = FakeBatchClient()
+        job = submit_batch_extraction(client)[0]
+        wait_for_batch_jobs(client, [job], poll_interval=0)
+        stats = apply_batch_results(job, client)
+
+        self.assertEqual(stats["failed"], 1)
+        broken.refresh_from_db()
+        self.assertFalse(broken.processed)
+        self.assertEqual(list(pending_archive_reports()), [broken])
+
+    def test_error_only_job_returns_reports_to_the_pool(self):
+        """A job whose requests all failed is marked applied and its reports are resubmitted"""
+        client = ErrorOnlyBatchClient()
+        job = submit_batch_extraction(client)[0]
+        self.assertEqual(pending_archive_reports().count(), 0)
+        wait_for_batch_jobs(client, [job], poll_interval=0)
+        stats = apply_batch_results(job, client)
+
+        self.assertEqual(stats["failed"], 3)
+        self.assertIsNotNone(job.applied_at)
+        self.assertEqual(job.error_file_id, f"err_{job.batch_id}")
+        self.assertEqual(pending_archive_reports().count(), 3)
+        self.assertEqual(sorted(submit_batch_extraction(client)[0].message_ids), sorted(r.messageId for r in self.reports))
+
+    def test_cached_reports_skip_submission(self):
+        """Reports with a cached extraction are applied without a batch job"""
+        ExtractionCache.objects.create(key=_extraction_cache_key(self.reports[0].body), sightings=[])
+        client = FakeBatchClient()
+        jobs = submit_batch_extraction(client)
+
+        self.assertEqual(len(jobs), 1)
+        self.assertNotIn(self.reports[0].messageId, jobs[0].message_ids)
+        self.reports[0].refresh_from_db()
+        self.assertTrue(self.reports[0].processed)
+
+    @patch("data_pipeline.batch_extraction.BATCH_MAX_REQUESTS", 2)
+    def test_jobs_split_at_request_limit(self):
+        """Job files are split once they reach the provider request limit"""
+        jobs = submit_batch_extraction(FakeBatchClient())
+        self.assertEqual([len(job.message_ids) for job in jobs], [2, 1])
+
+    @patch("data_pipeline.batch_extraction.split_report_body")
+    def test_large_reports_are_chunked(self, mock_split):
+        """Large bodies go in as one line per chunk and are merged back once every chunk is in"""
+        mock_split.side_effect = lambda body, **kwargs: [f"{body} part {i}" for i in range(3)] if body.endswith("0") else [body]
+        client = FakeBatchClient()
+        job = submit_batch_extraction(client)[0]
+        self.assertEqual(len(client.submitted[job.batch_id]), 5)
+
+        wait_for_batch_jobs(client, [job], poll_interval=0)
+        stats = apply_batch_results(job, client)
+
+        self.assertEqual(stats["applied"], 3)
+        # The responder returns the same sighting for every chunk - merged into one
+        self.assertEqual(OrcaSighting.objects.filter(raw_report=self.reports[0]).count(), 1)
+
+    def test_backfill_against_local_server(self):
+        """Full backfill through the openai client and the local stand-in server"""
+        with LocalOpenAIServer(sighting_responder) as server:
+            client = openai.OpenAI(base_url=server.url, api_key="local", max_retries=0)
+            summary = run_batch_backfill(client=OpenAIBatchClient(client), poll_interval=0.05, timeout=30)
+
+        self.assertEqual(summary["applied"], 3)
+        self.assertEqual(summary["sightings"], 3)
+        self.assertEqual(ExtractionBatchJob.objects.get().status, "completed")
+        self.assertFalse(RawReport.objects.filter(processed=False).exists())
+
+    def test_ingest_txt_reports(self):
+        """Archive files become unprocessed RawReports once, however often ingest runs"""
+        with tempfile.TemporaryDirectory() as base:
+            month_path = os.path.join(base, "2023", "July")
+            os.makedirs(month_path)
+            for name in ("a.txt", "b.txt"):
+                with open(os.path.join(month_path, name), "w", encoding="utf-8") as f:
+                    f.write(f"Orca report {name}")
+
+            self.assertEqual(ingest_txt_reports(base), (2, 0))
+            self.assertEqual(ingest_txt_reports(base), (0, 0))
+
+        self.assertEqual(RawReport.objects.filter(sender="orca_network_archive", processed=False).count(), 5)
+
+    def test_backfill_moves_applied_files(self):
+        """With move_processed, applied files go to processed/ and failed ones stay for the rerun"""
+        with tempfile.TemporaryDirectory() as base:
+            month_path = os.path.join(base, "2023", "July")
+            os.makedirs(month_path)
+            for name, body in (("a.txt", "Orca report a"), ("b.txt", "Orca report broken")):
+                with open(os.path.join(month_path, name), "w", encoding="utf-8") as f:
+                    f.write(body)
+
+            summary = run_batch_backfill(base, client=FakeBatchClient(), poll_interval=0, move_processed=True)
+            self.assertEqual(summary["moved"], 1)
+            self.assertEqual(sorted(os.listdir(month_path)), ["b.txt", "processed"])
+            self.assertEqual(os.listdir(os.path.join(month_path, "processed")), ["a.txt"])
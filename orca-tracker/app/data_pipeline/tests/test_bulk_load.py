@@ -0,0 +1,67 @@
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from ..bulk_load import copy_rows, copy_sightings, load_sightings
+from ..models import Absence, OrcaSighting, RawReport, Zone
+from ..report_absence_gen import ABSENCE_COLUMNS
+
+COLUMNS = ("raw_report_id", "time", "zone", "ZoneNumber_id", "direction", "count", "month", "dayOfWeek", "hour",
+           "present", "timeSinceLastSighting", "isWeekend", "sunUp")
+FIELDS = ("raw_report_id", "time", "zone", "ZoneNumber_id", "direction", "count", "present",
+          "timeSinceLastSighting", "sunUp")
+
+
+class BulkLoadTests(TestCase):
+
+    def setUp(self):
+        Zone.objects.create(zoneNumber=3, name="Zone 3", boundary="", localities="")
+        self.raw = RawReport.objects.create(messageId="bulk-1", body="report", subject="s", sender="x")
+        self.start = datetime(2024, 8, 1, tzinfo=timezone.utc)
+
+    def _rows(self, present=True):
+        return [
+            (self.raw.id if present else None, self.start + timedelta(minutes=20 * i), "3" if i % 2 else "Tab\there \\ now\n",
+             3 if i % 2 else None, None if i % 3 else "N", i, 8, 4, i // 3, present,
+             timedelta(days=i, microseconds=i) if present else None, False, i % 4 == 0)
+            for i in range(12)
+        ]
+
+    def _stored(self):
+        return list(OrcaSighting.objects.order_by("id").values_list(*FIELDS))
+
+    def test_copy_matches_bulk_create(self):
+        with patch("data_pipeline.bulk_load.COPY_MIN_ROWS", 1), patch("data_pipeline.bulk_load.COPY_CHUNK_ROWS", 5):
+            with transaction.atomic():
+                self.assertEqual(copy_sightings(COLUMNS, self._rows()), 12)
+                copied = self._stored()
+                transaction.set_rollback(True)
+            with patch("data_pipeline.bulk_load._can_copy", return_value=False):
+                self.assertEqual(copy_sightings(COLUMNS, self._rows()), 12)
+        self.assertEqual(self._stored(), copied)
+        self.assertEqual(copied[1][2], "3")
+        self.assertEqual(copied[0][2], "Tab\there \\ now\n")
+        self.assertEqual(copied[5][7], timedelta(days=5, microseconds=5))
+
+        with self.assertRaises(ValueError):
+            copy_sightings(("time", "nope"), [(self.start, 1)])
+
+    def test_conflicting_absences_are_skipped(self):
+        absences = [(when, zone, number, up) for _, when, zone, number, *_, up in self._rows(present=False)]
+        with patch("data_pipeline.bulk_load.COPY_MIN_ROWS", 1):
+            self.assertEqual(copy_rows(Absence, ABSENCE_COLUMNS, absences, ignore_conflicts=True), 8)
+            # Two rows per zone and hour - only the first of each goes in
+            self.assertEqual(Absence.objects.count(), 8)
+            self.assertEqual(copy_rows(Absence, ABSENCE_COLUMNS, absences, ignore_conflicts=True), 0)
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                copy_rows(Absence, ABSENCE_COLUMNS, absences)
+            with self.assertRaises(ValueError):
+                copy_rows(Absence, ("time", "direction"), [(self.start, "N")])
+
+    def test_load_sets_pks(self):
+        objs = [OrcaSighting(**dict(zip(COLUMNS, row))) for row in self._rows()]
+        with patch("data_pipeline.bulk_load.COPY_MIN_ROWS", 1):
+            self.assertEqual(load_sightings(objs), 12)
+        self.assertEqual([obj.pk for obj in objs], sorted(obj.pk for obj in objs))
+        self.assertEqual(OrcaSighting.objects.get(pk=objs[5].pk).time, self.start + timedelta(minutes=100))
+        self.assertFalse(objs[-1]._state.adding)
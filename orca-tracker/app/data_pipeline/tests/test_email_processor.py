@@ -1,15 +1,23 @@
 from django.test import TestCase
 from unittest.mock import patch, MagicMock, mock_open
+import codecs
 import json
 import os
 import tempfile
 import base64
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from django.db import DatabaseError
+from django.utils import timezone
 from ..email_processor import (
     _extract_sightings, _create_sighting, _coerce_int, _calc_derived_fields,
-    process_unprocessed_reports, process_txt_files_from_nested_folders
+    process_unprocessed_reports, process_txt_files_from_nested_folders,
+    process_unprocessed_reports_concurrent, _extract_report_sightings, _extraction_cache_key,
+    _pack_bodies, _write_report_sightings, ZoneRegistry, read_file_with_encoding_detection,
+    decode_report_bytes, ENCODING_SAMPLE_BYTES
 )
-from ..models import RawReport, OrcaSighting
+from ..feature_engine import register_ingest_writer
+from ..models import ExtractionCache, RawReport, OrcaSighting, Zone
 
 class EmailProcessorTests(TestCase):
     
@@ -19,7 +27,7 @@ class EmailProcessorTests(TestCase):
             messageId="test_123",
             subject="Test Orca Sighting",
             sender="test@example.com",
-            body="Test sighting report",
+            body="Test orca sighting report",
             processed=False
         )
     
@@ -141,6 +149,52 @@ class EmailProcessorTests(TestCase):
         
         # Should not create sighting with invalid count
         self.assertEqual(OrcaSighting.objects.count(), initial_count)
+
+    @patch('data_pipeline.email_processor.logger')
+    def test_write_report_sightings_bulk(self, mock_logger):
+        """A report's valid sightings go in with one zone query and one insert; invalid ones are logged and skipped"""
+        Zone.objects.create(zoneNumber=6, name="Haro Strait", boundary="", localities="")
+        sightings = [
+            {"time": "2024-08-13T10:30:00Z", "zone": "6", "direction": "N", "count": 8},
+            {"time": "invalid-time", "zone": "6", "direction": "N", "count": 8},
+            {"time": "2024-08-13T11:30:00Z", "zone": "6", "direction": "S", "count": "invalid"},
+            {"time": "2024-08-13T12:30:00Z", "zone": "6", "direction": "S", "count": 3},
+            {"time": "2024-08-13T13:30:00Z", "zone": "99", "direction": "", "count": 1},
+        ]
+
+        # savepoint + zone lookup + bulk insert + release (the writer lock is taken once per connection)
+        register_ingest_writer()
+        with self.assertNumQueries(4):
+            created = _write_report_sightings(self.test_raw_report, sightings, ZoneRegistry())
+
+        self.assertEqual(created, 3)
+        rows = list(OrcaSighting.objects.filter(raw_report=self.test_raw_report).order_by("id"))
+        self.assertEqual([r.count for r in rows], [8, 3, 1])
+        self.assertEqual(rows[0].ZoneNumber_id, 6)
+        self.assertIsNone(rows[2].ZoneNumber)
+        self.assertEqual(mock_logger.warning.call_count, 3)
+
+    @patch('data_pipeline.email_processor.logger')
+    def test_write_report_sightings_falls_back_per_row(self, mock_logger):
+        """If the bulk insert fails, rows are retried one by one and only the bad one is lost"""
+        sightings = [
+            {"time": "2024-08-13T10:30:00Z", "zone": "6", "direction": "N", "count": 8},
+            {"time": "2024-08-13T12:30:00Z", "zone": "6", "direction": "S", "count": 3},
+        ]
+        original_save = OrcaSighting.save
+
+        def save(sighting, *args, **kwargs):
+            if sighting.count == 3:
+                raise DatabaseError("bad row")
+            return original_save(sighting, *args, **kwargs)
+
+        with patch.object(OrcaSighting.objects, "bulk_create", side_effect=DatabaseError("bulk failed")), \
+                patch.object(OrcaSighting, "save", save):
+            created = _write_report_sightings(self.test_raw_report, sightings)
+
+        self.assertEqual(created, 1)
+        self.assertEqual(OrcaSighting.objects.filter(raw_report=self.test_raw_report).count(), 1)
+        mock_logger.error.assert_called_once()
     
     @patch('data_pipeline.email_processor._extract_sightings')
     @patch('data_pipeline.email_processor._create_sighting')
@@ -151,7 +205,7 @@ class EmailProcessorTests(TestCase):
             messageId="test_456",
             subject="Another Test",
             sender="test2@example.com",
-            body="Another test body",
+            body="Another orca report",
             processed=False
         )
         
@@ -175,6 +229,246 @@ class EmailProcessorTests(TestCase):
         # Check that _create_sighting was called for each report
         self.assertEqual(mock_create_sighting.call_count, 2)
 
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_process_unprocessed_reports_concurrent(self, mock_extract):
+        """Test concurrent processing commits every report and clears its lease"""
+        report2 = RawReport.objects.create(
+            messageId="test_456", subject="Another Test", sender="test2@example.com",
+            body="Another orca report", processed=False
+        )
+        mock_extract.return_value = [
+            {"time": "2024-08-13T10:30:00Z", "zone": "6", "direction": "N", "count": 5}
+        ]
+
+        process_unprocessed_reports_concurrent(limit=10, concurrency=2)
+
+        for report in (self.test_raw_report, report2):
+            report.refresh_from_db()
+            self.assertTrue(report.processed)
+            self.assertIsNone(report.claimedAt)
+        self.assertEqual(OrcaSighting.objects.filter(raw_report__in=[self.test_raw_report, report2]).count(), 2)
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_process_concurrent_releases_claim_on_error(self, mock_extract):
+        """Test a failed report is released for the next run instead of marked processed"""
+        mock_extract.side_effect = RuntimeError("LLM exploded")
+
+        process_unprocessed_reports_concurrent(limit=10, concurrency=2)
+
+        self.test_raw_report.refresh_from_db()
+        self.assertFalse(self.test_raw_report.processed)
+        self.assertIsNone(self.test_raw_report.claimedAt)
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_process_concurrent_respects_leases(self, mock_extract):
+        """Test reports leased by another run are skipped until the lease goes stale"""
+        mock_extract.return_value = []
+        self.test_raw_report.claimedAt = timezone.now()
+        self.test_raw_report.save()
+        stale = RawReport.objects.create(
+            messageId="test_stale", subject="Stale", sender="test@example.com",
+            body="Stale orca report", processed=False, claimedAt=timezone.now() - timedelta(days=1)
+        )
+
+        process_unprocessed_reports_concurrent(limit=10, concurrency=2)
+
+        self.test_raw_report.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertFalse(self.test_raw_report.processed)
+        self.assertTrue(stale.processed)
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_process_concurrent_overlaps_llm_calls(self, mock_extract):
+        """Test slow extractions run in parallel up to the configured concurrency"""
+        for i in range(3):
+            RawReport.objects.create(
+                messageId=f"test_slow_{i}", subject="Slow", sender="test@example.com",
+                body=f"Slow orca report {i}", processed=False
+            )
+
+        def slow_extract(body, **kwargs):
+            time.sleep(0.3)
+            return []
+        mock_extract.side_effect = slow_extract
+
+        started = time.monotonic()
+        process_unprocessed_reports_concurrent(limit=10, concurrency=4)
+        elapsed = time.monotonic() - started
+
+        # 4 reports x 0.3s would take 1.2s serially
+        self.assertLess(elapsed, 0.9)
+        self.assertFalse(RawReport.objects.filter(processed=False).exists())
+
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_extraction_cache_reuses_duplicate_bodies(self, mock_extract):
+        """Test a re-forwarded copy of a report is served from the cache"""
+        RawReport.objects.create(
+            messageId="test_dup", subject="Fwd: Test", sender="test@example.com",
+            body="  Test   orca sighting\nreport ", processed=False
+        )
+        mock_extract.return_value = [
+            {"time": "2024-08-13T10:30:00Z", "zone": "6", "direction": "N", "count": 5}
+        ]
+
+        with patch('data_pipeline.email_processor.logger') as mock_logger:
+            process_unprocessed_reports(limit=10)
+
+        self.assertEqual(mock_extract.call_count, 1)
+        self.assertEqual(ExtractionCache.objects.count(), 1)
+        self.assertEqual(OrcaSighting.objects.count(), 2)
+        mock_logger.info.assert_any_call("Extraction cache: 1/2 hits (50%)")
+
+    @patch('data_pipeline.email_processor.get_openai_client')
+    def test_extraction_cache_skips_failed_calls(self, mock_get_client):
+        """Test failed LLM calls are not cached as empty results"""
+        mock_get_client.return_value.chat.completions.create.side_effect = Exception("API Error")
+        stats = {"hits": 0, "misses": 0}
+
+        self.assertEqual(_extract_report_sightings("Orcas off Lime Kiln at 10am", stats), [])
+        self.assertEqual(ExtractionCache.objects.count(), 0)
+        self.assertEqual(stats, {"hits": 0, "misses": 1})
+
+    def test_extraction_cache_key_tracks_model_and_body(self):
+        """Test cache keys ignore whitespace but change with the model"""
+        key = _extraction_cache_key("Orcas  off\nLime Kiln")
+        self.assertEqual(key, _extraction_cache_key(" Orcas off Lime Kiln "))
+        self.assertNotEqual(key, _extraction_cache_key("Orcas off Cattle Pass"))
+        with patch('data_pipeline.email_processor.MODEL_NAME', 'another-model'):
+            self.assertNotEqual(key, _extraction_cache_key("Orcas off Lime Kiln"))
+
+    def test_pack_bodies_respects_budget(self):
+        """Test packing stays under the token budget and report cap, long bodies go alone"""
+        bodies = {"a": "x" * 400, "b": "x" * 400, "c": "x" * 400, "long": "x" * 4000, "d": "x" * 40}
+        self.assertEqual(
+            _pack_bodies(bodies, token_budget=250, max_reports=3),
+            [["a", "b"], ["long"], ["c", "d"]]
+        )
+        self.assertEqual(_pack_bodies(bodies, token_budget=2000, max_reports=2), [["a", "b"], ["long"], ["c", "d"]])
+
+    @patch('data_pipeline.email_processor.get_openai_client')
+    def test_packed_extraction_splits_results_by_report(self, mock_get_client):
+        """Test packed mode sends one request and maps tagged sightings back to their reports"""
+        report2 = RawReport.objects.create(
+            messageId="test_456", subject="Another Test", sender="test2@example.com",
+            body="Orcas off Point Defiance at noon", processed=False
+        )
+        mock_response = MagicMock()
+        mock_response.choices[0].message.content = json.dumps({"sightings": [
+            {"report_id": "R2", "time": "2024-08-13T12:00:00Z", "zone": "14", "direction": "S", "count": 4},
+            {"report_id": "R2", "time": "2024-08-13T12:30:00Z", "zone": "14", "direction": "S", "count": 4},
+            {"report_id": "R1", "time": "2024-08-13T10:30:00Z", "zone": "6", "direction": "N", "count": 5},
+        ]})
+        mock_get_client.return_value.chat.completions.create.return_value = mock_response
+
+        process_unprocessed_reports_concurrent(limit=10, concurrency=2, pack=True)
+
+        self.assertEqual(mock_get_client.return_value.chat.completions.create.call_count, 1)
+        self.assertEqual(OrcaSighting.objects.filter(raw_report=self.test_raw_report).count(), 1)
+        self.assertEqual(list(OrcaSighting.objects.filter(raw_report=report2).values_list("zone", flat=True)), ["14", "14"])
+        self.assertEqual(ExtractionCache.objects.count(), 2)
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    @patch('data_pipeline.email_processor.get_openai_client')
+    def test_packed_extraction_falls_back_on_invalid_tags(self, mock_get_client, mock_extract):
+        """Test a packed response with an unknown report_id is redone one report at a time"""
+        RawReport.objects.create(
+            messageId="test_456", subject="Another Test", sender="test2@example.com",
+            body="Orcas off Point Defiance at noon", processed=False
+        )
+        mock_response = MagicMock()
+        mock_response.choices[0].message.content = json.dumps({"sightings": [
+            {"report_id": "R7", "time": "2024-08-13T12:00:00Z", "zone": "14", "direction": "S", "count": 4},
+        ]})
+        mock_get_client.return_value.chat.completions.create.return_value = mock_response
+        mock_extract.return_value = []
+
+        process_unprocessed_reports_concurrent(limit=10, concurrency=2, pack=True)
+
+        self.assertEqual(mock_extract.call_count, 2)
+        self.assertFalse(RawReport.objects.filter(processed=False).exists())
+        self.assertEqual(OrcaSighting.objects.count(), 0)
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    @patch('data_pipeline.email_processor.get_openai_client')
+    def test_packed_extraction_falls_back_on_dropped_items(self, mock_get_client, mock_extract):
+        """Test a packed response with an item validation drops is redone one report at a time"""
+        RawReport.objects.create(
+            messageId="test_456", subject="Another Test", sender="test2@example.com",
+            body="Orcas off Point Defiance at noon", processed=False
+        )
+        mock_response = MagicMock()
+        mock_response.choices[0].message.content = json.dumps({"sightings": [
+            {"report_id": "R1", "time": "2024-08-13T10:30:00Z", "zone": "6", "direction": "N", "count": 5},
+            {"report_id": "R2", "time": "2024-08-13T12:00:00Z", "direction": "S", "count": 4},
+        ]})
+        mock_get_client.return_value.chat.completions.create.return_value = mock_response
+        mock_extract.return_value = []
+
+        process_unprocessed_reports_concurrent(limit=10, concurrency=2, pack=True)
+
+        self.assertEqual(mock_extract.call_count, 2)
+        self.assertEqual(OrcaSighting.objects.count(), 0)
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    @patch('data_pipeline.email_processor.get_openai_client')
+    def test_packed_extraction_re_extracts_empty_orca_reports(self, mock_get_client, mock_extract):
+        """Test a report naming orcas that the packed response skipped is extracted on its own"""
+        report2 = RawReport.objects.create(
+            messageId="test_456", subject="Another Test", sender="test2@example.com",
+            body="Orcas off Point Defiance at noon", processed=False
+        )
+        RawReport.objects.create(
+            messageId="test_789", subject="Whale trail", sender="test3@example.com",
+            body="Whale trail meeting moved to Thursday", processed=False
+        )
+        mock_response = MagicMock()
+        mock_response.choices[0].message.content = json.dumps({"sightings": [
+            {"report_id": "R1", "time": "2024-08-13T10:30:00Z", "zone": "6", "direction": "N", "count": 5},
+        ]})
+        mock_get_client.return_value.chat.completions.create.return_value = mock_response
+        mock_extract.return_value = [{"time": "2024-08-13T12:00:00Z", "zone": "14", "direction": "S", "count": 4}]
+
+        with patch('data_pipeline.email_processor.PREFILTER_ENABLED', False):
+            process_unprocessed_reports_concurrent(limit=10, concurrency=2, pack=True)
+
+        mock_extract.assert_called_once_with(report2.body, raise_errors=True)
+        self.assertEqual(OrcaSighting.objects.filter(raw_report=report2).count(), 1)
+        self.assertFalse(RawReport.objects.filter(processed=False).exists())
+        self.assertEqual(ExtractionCache.objects.get(key=_extraction_cache_key(report2.body)).sightings,
+                         mock_extract.return_value)
+
+    def test_read_file_with_encoding_detection(self):
+        """UTF-8 (with or without BOM), UTF-16 and Windows-1252 files all decode from a single read"""
+        text = "Orcas off Lime Kiln for about ½ hour – J pod\n"
+        cases = [
+            (text.encode("utf-8"), text),
+            (codecs.BOM_UTF8 + text.encode("utf-8"), text),
+            (text.encode("utf-16"), text),
+            ("Orcas at Lime Kiln café\n".encode("windows-1252"), "Orcas at Lime Kiln café\n"),
+        ]
+        for raw, expected in cases:
+            with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+                f.write(raw)
+            self.addCleanup(os.remove, f.name)
+            self.assertEqual(read_file_with_encoding_detection(f.name), expected)
+
+    @patch('data_pipeline.email_processor.chardet.detect')
+    def test_decode_skips_chardet_for_utf8(self, mock_detect):
+        """Valid UTF-8 never runs detection and other encodings only detect on a bounded sample"""
+        self.assertEqual(decode_report_bytes("½ hour".encode("utf-8")), "½ hour")
+        mock_detect.assert_not_called()
+
+        mock_detect.return_value = {"encoding": "windows-1252", "confidence": 0.9}
+        raw = "café ".encode("windows-1252") * 100000
+        self.assertEqual(decode_report_bytes(raw), "café " * 100000)
+        self.assertEqual(len(mock_detect.call_args[0][0]), ENCODING_SAMPLE_BYTES)
+
+    def test_decode_redetects_past_an_ascii_sample(self):
+        """Non-ASCII text after the detection sample still decodes as what it is"""
+        text = "x" * (96 * 1024) + "Café “quote”"
+        self.assertEqual(decode_report_bytes(text.encode("cp1252")), text)
+        self.assertEqual(decode_report_bytes("Café “quote”".encode("cp1252")), "Café “quote”")
 
     @patch('data_pipeline.email_processor.read_file_with_encoding_detection')
     @patch('os.listdir')
@@ -0,0 +1,152 @@
+from django.db import connection, transaction
+from django.test import TestCase
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+import os
+import psycopg2
+import random
+from .. import prediction_generator
+from ..email_processor import _write_report_sightings
+from ..feature_engine import FEATURE_FIELDS, INGEST_WRITER_LOCK, FeatureEngine
+from ..feature_recompute import recompute_features
+from ..models import OrcaSighting, RawReport, Zone
+from .helpers import make_sighting
+from .test_feature_recompute import ZONE_CALC_SQL
+
+
+def _values(sighting):
+    return tuple(getattr(sighting, f) for f in FEATURE_FIELDS)
+
+
+class FeatureEngineTests(TestCase):
+
+    def setUp(self):
+        zones = {n: Zone.objects.create(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 7)}
+        for n, zone in zones.items():
+            zone.adjacentZones.set([zones[m] for m in (n - 1, n + 1) if m in zones])
+            zone.nextAdjacentZones.set([zones[m] for m in (n - 2, n + 2) if m in zones])
+        zones[4].adjacentZones.add(zones[4])
+
+        rng = random.Random(11)
+        self.base = datetime(2024, 3, 1, tzinfo=timezone.utc)
+        # Mostly moving forward, with late and far-back reports mixed in
+        self.rows = []
+        absences = set()
+        for i in range(400):
+            offset = i * 150 + rng.randrange(-600, 600)
+            if i % 25 == 0:
+                offset = rng.randrange(0, 400 * 150)
+            when = self.base + timedelta(minutes=offset)
+            zone = str(rng.randint(1, 6))
+            # At most one absence per zone and hour, as the generator writes them
+            present = rng.random() > 0.1 or (zone, when.replace(minute=0)) in absences
+            if not present:
+                absences.add((zone, when.replace(minute=0)))
+            self.rows.append(make_sighting(when, zone, present))
+        self.rows[50].zone = "Unknown"
+
+    def _install_trigger(self):
+        if not os.path.exists(ZONE_CALC_SQL):
+            self.skipTest("zone_calc.sql not available")
+        with open(ZONE_CALC_SQL, encoding="utf-8") as f:
+            script = "\n".join(line for line in f if not line.strip().upper().startswith(("BEGIN;", "COMMIT;")))
+        # The expression indexes cast every zone to int
+        self.rows[50].zone = "6"
+        with connection.cursor() as cursor:
+            cursor.execute(script)
+
+    def test_matches_trigger_as_of_insert(self):
+        """Rows filled by the engine get exactly what the trigger computes when they are inserted"""
+        self._install_trigger()
+        for row in self.rows:
+            OrcaSighting.objects.bulk_create([row])
+        from_trigger = [_values(OrcaSighting.objects.get(pk=row.pk)) for row in self.rows]
+
+        # Replay the second half through the engine, a few rows per insert
+        half = len(self.rows) // 2
+        OrcaSighting.objects.filter(pk__in=[row.pk for row in self.rows[half:]]).delete()
+        engine = FeatureEngine()
+        for i in range(half, len(self.rows), 3):
+            group = self.rows[i:i + 3]
+            for row in group:
+                row.pk = None
+                for field in FEATURE_FIELDS:
+                    setattr(row, field, None)
+            with self.captureOnCommitCallbacks(execute=True):
+                engine.fill_new(group)
+                OrcaSighting.objects.bulk_create(group)
+
+        self.assertEqual([_values(row) for row in self.rows[half:]], from_trigger[half:])
+        # The trigger kept the supplied values
+        stored = OrcaSighting.objects.in_bulk([row.pk for row in self.rows[half:]])
+        self.assertEqual([_values(stored[row.pk]) for row in self.rows[half:]], from_trigger[half:])
+
+    def test_stored_rows_match_recompute(self):
+        """Filling an already stored row excludes itself, like recompute_features"""
+        OrcaSighting.objects.bulk_create([row for row in self.rows if row.present])
+        recompute_features()
+
+        engine = FeatureEngine()
+        for stored in OrcaSighting.objects.order_by("time"):
+            expected = _values(stored)
+            for field in FEATURE_FIELDS:
+                setattr(stored, field, None)
+            self.assertEqual(_values(engine.fill(stored)), expected, stored.pk)
+
+    def test_rolled_back_rows_are_not_counted(self):
+        raw = RawReport.objects.create(messageId="engine-1", body="report", subject="s", sender="x")
+        when = self.base + timedelta(hours=2)
+        engine = FeatureEngine.warm_start(when)
+        data = [{"time": when.isoformat(), "zone": "3", "direction": "N", "count": 2}]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    _write_report_sightings(raw, data * 2, features=engine)
+                    raise RuntimeError("persist failed")
+            except RuntimeError:
+                pass
+        self.assertEqual(engine.features("3", when)["reportsIn5h"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(_write_report_sightings(raw, data * 2, features=engine), 2)
+        # The second row saw the first one
+        self.assertEqual(
+            sorted(OrcaSighting.objects.values_list("reportsIn5h", "reportsInAdjacentZonesIn5h")), [(0, 0), (1, 0)]
+        )
+        self.assertEqual(engine.features("4", when)["reportsInAdjacentZonesIn5h"], 2)
+
+    def test_other_writers_leave_features_to_the_trigger(self):
+        """While another connection is writing sightings, fill_new leaves the counts NULL"""
+        other = psycopg2.connect(**connection.get_connection_params())
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock_shared(%s)", [INGEST_WRITER_LOCK])
+
+        engine = FeatureEngine()
+        rows = [row for row in self.rows if row.present]
+        with self.captureOnCommitCallbacks(execute=True):
+            engine.fill_new(rows[:3])
+        self.assertEqual({_values(row) for row in rows[:3]}, {(None,) * len(FEATURE_FIELDS)})
+
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock_shared(%s)", [INGEST_WRITER_LOCK])
+        with self.captureOnCommitCallbacks(execute=True):
+            engine.fill_new(rows[3:6])
+        self.assertTrue(all(row.reportsIn5h is not None for row in rows[3:6]))
+
+    def test_prep_sightings_computes_missing_features(self):
+        zone = Zone.objects.get(zoneNumber=2)
+        earlier = make_sighting(self.base, "2")
+        latest = make_sighting(self.base + timedelta(hours=3), "2")
+        latest.ZoneNumber = zone
+        OrcaSighting.objects.bulk_create([earlier, make_sighting(self.base + timedelta(hours=1), "1"), latest])
+
+        encoder = MagicMock()
+        encoder.transform.return_value = [2]
+        columns = ["reportsIn5h", "reportsInAdjacentZonesIn5h", "hours_since_last"]
+        with patch.object(prediction_generator, "ZONE_ENCODING", encoder), \
+                patch.object(prediction_generator, "FEATURE_COLUMNS", columns):
+            df = prediction_generator.prep_sightings(latest)
+
+        self.assertEqual(df.iloc[0].tolist(), [1, 1, 3.0])
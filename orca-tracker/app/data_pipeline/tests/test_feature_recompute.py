@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from datetime import datetime, timedelta, timezone
+import os
+import random
+from ..feature_recompute import recompute_features, verify_features
+from ..models import Absence, OrcaSighting, Zone
+from .helpers import make_sighting
+
+ZONE_CALC_SQL = os.path.join(settings.BASE_DIR.parent.parent, "Pre-Prod", "SQL functions-data", "zone_calc.sql")
+FEATURES = ["reportsIn5h", "reportsIn24h", "reportsInAdjacentZonesIn5h", "reportsInAdjacentPlusZonesIn5h", "timeSinceLastSighting"]
+
+
+class FeatureRecomputeTests(TestCase):
+
+    def setUp(self):
+        zones = {n: Zone.objects.create(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 7)}
+        for n, zone in zones.items():
+            zone.adjacentZones.set([zones[m] for m in (n - 1, n + 1) if m in zones])
+            zone.nextAdjacentZones.set([zones[m] for m in (n - 2, n + 2) if m in zones])
+        # A zone listed as adjacent to itself must not count the row itself
+        zones[4].adjacentZones.add(zones[4])
+
+        rng = random.Random(7)
+        base = datetime(2024, 1, 28, tzinfo=timezone.utc)
+        self.rows = []
+        for _ in range(300):
+            when = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 40))
+            self.rows.append(make_sighting(when, str(rng.randint(1, 6))))
+        # Window edges: exactly 6h before, exactly 1h after, same instant, across the month boundary
+        edge = datetime(2024, 1, 31, 23, 30, tzinfo=timezone.utc)
+        for delta in (timedelta(0), timedelta(0), timedelta(hours=-6), timedelta(hours=1), timedelta(hours=-25)):
+            self.rows.append(make_sighting(edge + delta, "3"))
+        rng.shuffle(self.rows)
+        # Absences get features too but are never counted
+        self.absences = [Absence(time=edge + timedelta(hours=hour), zone="3") for hour in range(0, 48, 7)]
+
+    def _create(self):
+        OrcaSighting.objects.bulk_create(self.rows)
+        Absence.objects.bulk_create(self.absences)
+
+    def _clear(self):
+        OrcaSighting.objects.update(**{f: None for f in FEATURES})
+        Absence.objects.update(**{f: None for f in FEATURES})
+
+    def _features(self):
+        # Ids are unique across both tables
+        return {
+            row["id"]: tuple(row[f] for f in FEATURES)
+            for qs in (OrcaSighting.objects, Absence.objects) for row in qs.values("id", *FEATURES)
+        }
+
+    def test_recompute_matches_trigger_queries(self):
+        """Window-function results equal the trigger's per-row queries, whatever the chunking"""
+        self._create()
+        OrcaSighting.objects.bulk_create([make_sighting(datetime(2024, 2, 2, 10, tzinfo=timezone.utc), "Unknown")])
+
+        stats = recompute_features()
+        self.assertEqual(stats["updated"], len(self.rows) + len(self.absences) + 1)
+        self.assertGreater(stats["chunks"], 1)
+        self.assertEqual(verify_features(limit=10000)["mismatched"], [])
+
+        monthly = self._features()
+        self._clear()
+        recompute_features(chunk_months=12)
+        self.assertEqual(self._features(), monthly)
+        # Nothing changed, nothing written
+        self.assertEqual(recompute_features()["updated"], 0)
+
+    def test_partial_range_only_touches_that_range(self):
+        self._create()
+        start = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 2, 8, tzinfo=timezone.utc)
+        recompute_features(start, end)
+
+        in_range = OrcaSighting.objects.filter(time__gte=start, time__lt=end)
+        self.assertFalse(in_range.filter(reportsIn5h__isnull=True).exists())
+        self.assertFalse(OrcaSighting.objects.exclude(time__gte=start, time__lt=end).filter(reportsIn5h__isnull=False).exists())
+        self.assertFalse(Absence.objects.filter(time__gte=start, time__lt=end, reportsIn5h__isnull=True).exists())
+        self.assertFalse(Absence.objects.exclude(time__gte=start, time__lt=end).filter(reportsIn5h__isnull=False).exists())
+        self.assertEqual(verify_features(start, end, limit=10000)["mismatched"], [])
+
+    def test_parity_with_installed_trigger(self):
+        """Same values as re-running zone_calc.sql's trigger over every row (UPDATE ... SET zone = zone)"""
+        if not os.path.exists(ZONE_CALC_SQL):
+            self.skipTest("zone_calc.sql not available")
+        with open(ZONE_CALC_SQL, encoding="utf-8") as f:
+            # The test already runs in a transaction
+            script = "\n".join(line for line in f if not line.strip().upper().startswith(("BEGIN;", "COMMIT;")))
+        with connection.cursor() as cursor:
+            cursor.execute(script)
+
+        for row in self.rows + self.absences:
+            row.save()
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE "data_pipeline_orcasighting" SET "zone" = "zone"')
+            cursor.execute('UPDATE "data_pipeline_absence" SET "zone" = "zone"')
+        from_trigger = self._features()
+
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER trg_orcasighting_recency_upd ON "data_pipeline_orcasighting"')
+            cursor.execute('DROP TRIGGER trg_absence_recency_upd ON "data_pipeline_absence"')
+        self._clear()
+        recompute_features()
+        self.assertEqual(self._features(), from_trigger)
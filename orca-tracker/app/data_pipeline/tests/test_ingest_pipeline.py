@@ -0,0 +1,170 @@
+from django.test import SimpleTestCase, TestCase
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+import threading
+import time
+from ..ingest_pipeline import Checkpoint, Pipeline, Stage, run_ingest_pipeline
+from ..models import OrcaSighting, RawReport
+
+SIGHTING = {"time": "2023-07-24T10:00:00Z", "zone": "6", "direction": "N", "count": 4}
+
+
+def _items(n):
+    return ({"key": f"item-{i}", "value": i} for i in range(n))
+
+
+class PipelineTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.checkpoint_path = os.path.join(self.tmp, "checkpoint.jsonl")
+
+    def test_items_flow_through_concurrent_stages(self):
+        """Every item reaches the last stage, threaded stages overlap and queues stay bounded"""
+        seen = []
+
+        def slow(item):
+            time.sleep(0.05)
+            item["value"] *= 2
+            return [item]
+
+        stages = [
+            Stage("slow", slow, workers=5, queue_size=4),
+            Stage("sink", lambda item: seen.append(item["value"]), workers=0, queue_size=4),
+        ]
+        started = time.monotonic()
+        summary = Pipeline(_items(20), stages).run()
+
+        self.assertEqual(sorted(seen), [i * 2 for i in range(20)])
+        self.assertEqual(summary["completed"], 20)
+        self.assertLess(time.monotonic() - started, 20 * 0.05 / 2)
+        self.assertLessEqual(summary["stages"]["slow"]["max_queue"], 4)
+
+    def test_backpressure_bounds_discovery(self):
+        """A blocked stage stops discovery from running ahead of it"""
+        pulled = []
+        gate = threading.Event()
+
+        def source():
+            for item in _items(100):
+                pulled.append(item["key"])
+                yield item
+
+        def blocked(item):
+            gate.wait(5)
+            return [item]
+
+        stages = [Stage("blocked", blocked, workers=1, queue_size=2), Stage("sink", lambda item: None, workers=0, queue_size=2)]
+        runner = threading.Thread(target=Pipeline(source(), stages).run)
+        runner.start()
+        time.sleep(0.3)
+        # one item in the worker, two queued, one held by the blocked put
+        self.assertLessEqual(len(pulled), 4)
+        gate.set()
+        runner.join(10)
+        self.assertEqual(len(pulled), 100)
+
+    def test_killed_run_resumes_from_checkpoint(self):
+        """Items finished before a stop are skipped by the next run; everything else runs exactly once more"""
+        first_run = []
+        pipeline = None
+
+        def sink(item):
+            first_run.append(item["key"])
+            if len(first_run) == 5:
+                pipeline.stop()
+
+        pipeline = Pipeline(
+            _items(30),
+            [Stage("pass", lambda item: [item], workers=2, queue_size=3), Stage("sink", sink, workers=0)],
+            checkpoint=Checkpoint(self.checkpoint_path),
+        )
+        pipeline.run()
+        self.assertEqual(len(first_run), 5)
+
+        second_run = []
+        summary = Pipeline(
+            _items(30),
+            [Stage("pass", lambda item: [item], workers=2), Stage("sink", lambda item: second_run.append(item["key"]), workers=0)],
+            checkpoint=Checkpoint(self.checkpoint_path),
+        ).run()
+
+        self.assertEqual(summary["skipped"], 5)
+        self.assertEqual(sorted(first_run + second_run), sorted(f"item-{i}" for i in range(30)))
+
+    def test_fan_out_and_failures(self):
+        """A key is checkpointed once all its children finish, and never if any of them fails"""
+        def split(item):
+            for part in range(3):
+                yield {"part": part, "value": item["value"]}
+
+        def sink(item):
+            if item["value"] == 1 and item["part"] == 2:
+                raise RuntimeError("bad part")
+
+        summary = Pipeline(
+            _items(3),
+            [Stage("split", split, workers=2), Stage("sink", sink, workers=0)],
+            checkpoint=Checkpoint(self.checkpoint_path),
+        ).run()
+
+        self.assertEqual((summary["completed"], summary["failed"]), (2, 1))
+        self.assertEqual(Checkpoint(self.checkpoint_path).done, {"item-0", "item-2"})
+
+    def test_checkpoint_ignores_partial_last_line(self):
+        with open(self.checkpoint_path, "w", encoding="utf-8") as f:
+            f.write('"item-0"\n"item-')
+        checkpoint = Checkpoint(self.checkpoint_path)
+        checkpoint.mark("item-1")
+        checkpoint.close()
+        self.assertEqual(Checkpoint(self.checkpoint_path).done, {"item-0", "item-1"})
+
+
+class TxtPipelineTests(TestCase):
+
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base)
+        month_path = os.path.join(self.base, "2023", "July")
+        os.makedirs(month_path)
+        for day in range(1, 7):
+            with open(os.path.join(month_path, f"2023_July_0{day}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"Orcas heading north past Lime Kiln on July {day}")
+        with open(os.path.join(month_path, "2023_July_09.txt"), "w", encoding="utf-8") as f:
+            f.write("Our summer newsletter is out")
+
+    @patch('data_pipeline.ingest_pipeline._extract_body_sightings')
+    def test_txt_pipeline_ingests_and_resumes(self, mock_extract):
+        mock_extract.return_value = [SIGHTING]
+        summary = run_ingest_pipeline("txt", self.base, workers=3, read_workers=2, queue_size=2)
+
+        self.assertEqual(summary["reports"], 7)
+        self.assertEqual(summary["sightings"], 6)
+        # the newsletter is pre-filtered
+        self.assertEqual(mock_extract.call_count, 6)
+        self.assertEqual(RawReport.objects.filter(messageId__startswith="txt_file_2023_July", processed=True).count(), 7)
+        self.assertEqual(OrcaSighting.objects.count(), 6)
+
+        mock_extract.reset_mock()
+        summary = run_ingest_pipeline("txt", self.base, workers=3)
+        self.assertEqual(summary["skipped"], 7)
+        self.assertEqual(summary["discovered"], 0)
+        mock_extract.assert_not_called()
+
+    @patch('data_pipeline.ingest_pipeline._extract_body_sightings')
+    def test_failed_extraction_keeps_raw_report(self, mock_extract):
+        """A failed extraction leaves an unprocessed report and no checkpoint entry"""
+        mock_extract.side_effect = RuntimeError("LLM exploded")
+        summary = run_ingest_pipeline("txt", self.base, workers=2)
+
+        self.assertEqual(summary["failed"], 6)
+        self.assertEqual(RawReport.objects.filter(messageId__startswith="txt_file_2023_July", processed=False).count(), 6)
+
+        mock_extract.side_effect = None
+        mock_extract.return_value = []
+        summary = run_ingest_pipeline("txt", self.base, workers=2)
+        self.assertEqual(summary["reports"], 6)
+        self.assertFalse(RawReport.objects.filter(processed=False).exists())
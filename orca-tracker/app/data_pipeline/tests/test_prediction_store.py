@@ -0,0 +1,76 @@
+from django.test import TestCase
+from datetime import datetime, timedelta, timezone
+from ..models import OrcaSighting, PredictionBatch, PredictionBucket, Zone, ZonePrediction
+from ..prediction_store import batch_buckets, compact_batches, thin_batches
+
+BUCKET_FIELDS = ("time_bucket", "bucket_start_hour", "bucket_end_hour", "forecast_start_time", "forecast_end_time",
+                 "overall_probability", "batch_id")
+ZONE_FIELDS = ("zone", "zone_number_id", "probability", "rank", "is_top_5")
+
+
+def _read(batch):
+    return [
+        (tuple(getattr(bucket, f) for f in BUCKET_FIELDS), [tuple(getattr(p, f) for f in ZONE_FIELDS) for p in predictions])
+        for bucket, predictions in batch_buckets(batch)
+    ]
+
+
+class PredictionStoreTests(TestCase):
+
+    def setUp(self):
+        self.zones = [Zone.objects.create(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 8)]
+        self.start = datetime(2024, 4, 1, 9, 15, 30, 123456, tzinfo=timezone.utc)
+        self.batches = [self._batch(self.start + timedelta(hours=5 * i), seed=i) for i in range(10)]
+
+    def _batch(self, when, seed):
+        sighting = OrcaSighting.objects.create(time=when, zone="1", count=1, month=when.month,
+                                               dayOfWeek=when.isoweekday(), hour=when.hour, present=True)
+        batch = PredictionBatch.objects.create(source_sighting=sighting, overall_confidence="low")
+        for start in (12, 0, 6):
+            bucket = PredictionBucket.objects.create(
+                batch=batch, time_bucket=f"{start}-{start + 6}h", bucket_start_hour=start, bucket_end_hour=start + 6,
+                forecast_start_time=when + timedelta(hours=start), forecast_end_time=when + timedelta(hours=start + 6),
+                overall_probability=0.1 * seed + start / 100,
+            )
+            # Ties, and zones the database doesn't know
+            probabilities = [((seed + start + n) % 4) / 7 for n in range(len(self.zones))] + [0.0, 1 / 3]
+            ranked = sorted(range(len(probabilities)), key=lambda i: -probabilities[i])
+            ZonePrediction.objects.bulk_create([
+                ZonePrediction(
+                    bucket=bucket, zone=self.zones[i].name if i < len(self.zones) else f"Unlisted {i}",
+                    zone_number=self.zones[i] if i < len(self.zones) else None,
+                    probability=probabilities[i], rank=rank, is_top_5=rank <= 5,
+                )
+                for rank, i in enumerate(ranked, start=1)
+            ])
+        return batch
+
+    def test_compacted_batches_read_the_same(self):
+        detail = [_read(batch) for batch in self.batches]
+        self.assertEqual([start for (_, start, *_), _ in detail[0]], [0, 6, 12])
+
+        cutoff = self.batches[7].source_sighting.time
+        self.assertEqual(compact_batches(cutoff, chunk_size=3), 7)
+        self.assertEqual(compact_batches(cutoff), 0)
+        self.assertEqual(PredictionBucket.objects.count(), 3 * 3)
+        self.assertEqual(ZonePrediction.objects.count(), 3 * 3 * 9)
+
+        batches = PredictionBatch.objects.order_by("id")
+        self.assertEqual([batch.compacted is not None for batch in batches], [True] * 7 + [False] * 3)
+        self.assertEqual([_read(batch) for batch in batches], detail)
+        for bucket, predictions in batch_buckets(batches[0]):
+            self.assertIsNone(bucket.pk)
+            self.assertEqual(bucket.forecast_start_time.tzinfo, timezone.utc)
+
+    def test_thinning_keeps_the_latest_batch_per_window(self):
+        # A second batch for the same sighting, as the admin action writes
+        again = PredictionBatch.objects.create(source_sighting=self.batches[2].source_sighting, overall_confidence="low")
+
+        # Day 0 09:15 | 14:15, 19:15 (twice) | day 1 00:15, 05:15 in 12h windows; day 1 10:15 is too recent
+        self.assertEqual(thin_batches(self.start + timedelta(hours=24), timedelta(hours=12)), 3)
+        self.assertEqual(
+            list(PredictionBatch.objects.order_by("id").values_list("id", flat=True)),
+            [self.batches[0].id, *(batch.id for batch in self.batches[4:]), again.id],
+        )
+        self.assertFalse(PredictionBucket.objects.filter(batch__in=self.batches[1:4]).exists())
+        self.assertEqual(thin_batches(self.start + timedelta(hours=24), timedelta(hours=12)), 0)
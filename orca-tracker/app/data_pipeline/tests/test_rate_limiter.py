@@ -0,0 +1,113 @@
+from django.test import SimpleTestCase
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+import time
+import openai
+from .. import email_processor
+from ..local_openai_server import LocalOpenAIServer
+from ..rate_limiter import RateLimiter, parse_reset_duration
+from .helpers import sighting_responder
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RateLimiterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _limiter(self, rpm, tpm):
+        return RateLimiter(rpm, tpm, period=60.0, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_requests_per_minute(self):
+        """The request bucket allows a burst of rpm, then paces at rpm/60 per second"""
+        limiter = self._limiter(rpm=2, tpm=10000)
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertAlmostEqual(limiter.acquire(), 30.0)
+
+    def test_tokens_per_minute(self):
+        """Calls wait until the token bucket refills enough for their estimate"""
+        limiter = self._limiter(rpm=100, tpm=1000)
+        limiter.acquire(600)
+        self.assertAlmostEqual(limiter.acquire(600), 12.0)
+        # Bigger than the whole bucket only waits for a full bucket
+        self.assertAlmostEqual(limiter.acquire(5000), 60.0)
+
+    def test_record_usage_returns_overestimate(self):
+        """Tokens reserved but not used go back into the bucket"""
+        limiter = self._limiter(rpm=100, tpm=1000)
+        limiter.acquire(900)
+        limiter.record_usage(estimated=900, actual=100)
+        self.assertEqual(limiter.acquire(800), 0.0)
+
+    def test_headers_adapt_limits(self):
+        """Limit headers replace the configured limits and low remaining counts drain the buckets"""
+        limiter = self._limiter(rpm=500, tpm=100000)
+        limiter.update_from_headers({
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-remaining-tokens": "50000",
+        })
+        self.assertEqual(limiter.requests.limit, 60)
+        self.assertEqual(limiter.tokens.level, 50000)
+        self.assertAlmostEqual(limiter.acquire(), 1.0)
+
+    def test_pause_holds_every_caller(self):
+        """A 429 pause blocks all callers until it expires"""
+        limiter = self._limiter(rpm=500, tpm=100000)
+        limiter.pause(5.0)
+        self.assertAlmostEqual(limiter.acquire(), 5.0)
+
+    def test_parse_reset_duration(self):
+        self.assertEqual(parse_reset_duration("1s"), 1.0)
+        self.assertEqual(parse_reset_duration("6m0s"), 360.0)
+        self.assertEqual(parse_reset_duration("20ms"), 0.02)
+        self.assertEqual(parse_reset_duration("0.5"), 0.5)
+        self.assertIsNone(parse_reset_duration(None))
+
+
+class RateLimitedServerTests(SimpleTestCase):
+
+    def _run_extractions(self, server, limiter, count=12):
+        client = openai.OpenAI(
+            base_url=server.url, api_key="local", max_retries=0,
+            http_client=openai.DefaultHttpxClient(event_hooks={"response": [email_processor._update_rate_limits]}),
+        )
+        with patch.object(email_processor, "_client", client), patch.object(email_processor, "_rate_limiter", limiter):
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                return list(pool.map(
+                    lambda i: email_processor._extract_sightings(f"Orcas off Lime Kiln {i}", raise_errors=True),
+                    range(count),
+                ))
+
+    def test_limiter_paces_concurrent_calls(self):
+        """Concurrent calls paced by a correctly sized limiter stay (almost) within the server's limit"""
+        with LocalOpenAIServer(sighting_responder, rpm_limit=5, limit_period=1.0) as server:
+            started = time.monotonic()
+            results = self._run_extractions(server, RateLimiter(5, 10 ** 6, period=1.0))
+            elapsed = time.monotonic() - started
+
+        self.assertTrue(all(len(r) == 1 for r in results))
+        # Pacing is by send time and the server counts arrivals, so network jitter can cost the odd 429
+        self.assertLessEqual(server.rejected_count, 2)
+        # 12 requests at 5/s with a burst of 5
+        self.assertGreater(elapsed, 1.2)
+
+    def test_limiter_learns_limits_from_headers(self):
+        """An over-generous limiter adopts the server's limit and every call still succeeds"""
+        limiter = RateLimiter(1000, 10 ** 6, period=1.0)
+        with LocalOpenAIServer(sighting_responder, rpm_limit=5, limit_period=1.0) as server:
+            results = self._run_extractions(server, limiter)
+
+        self.assertTrue(all(len(r) == 1 for r in results))
+        self.assertEqual(limiter.requests.limit, 5)
@@ -0,0 +1,258 @@
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+import numpy as np
+import random
+from ..models import Absence, AbsenceWatermark, OrcaSighting, Zone, ZoneEffort, ZoneSeasonality
+from ..report_absence_gen import (
+    EligibilitySweep, WeightedReservoir, _absence_hours, _build_weight_caches, _eligible_candidates,
+    _eligible_zones_at, _iter_hourly_range, _month_partitions, _partition_eligibility,
+    _weighted_downsample_absences, _zone_adjacency_map, generate_absence_reports_incremental,
+    generate_absence_reports_single_phase,
+    generate_absence_reports_two_phase,
+)
+from ..zone_adjacency import zone_adjacency
+from .helpers import make_sighting
+
+
+def _absence(when, zone):
+    return Absence(time=when, zone=str(zone.zoneNumber) if zone else "Unknown", ZoneNumber=zone)
+
+
+class EligibilitySweepTests(TestCase):
+
+    def setUp(self):
+        zones = {n: Zone.objects.create(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 9)}
+        for n, zone in zones.items():
+            zone.adjacentZones.set([zones[m] for m in (n - 1, n + 1) if m in zones])
+        Zone.objects.create(zoneNumber=20, name="Isolated", boundary="", localities="")
+
+        rng = random.Random(5)
+        self.start = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        rows, absent, absences = [], [], set()
+        for _ in range(300):
+            # On the hour, on the window edges and in between
+            when = self.start + timedelta(hours=rng.randrange(-4, 120), minutes=rng.choice([0, 0, 30, rng.randrange(60)]))
+            zone = zones.get(rng.randint(1, 9))
+            present = rng.random() > 0.2
+            if not present:
+                if zone is None or (zone.zoneNumber, when.replace(minute=0)) in absences:
+                    continue
+                absences.add((zone.zoneNumber, when.replace(minute=0)))
+                absent.append(_absence(when, zone))
+            else:
+                rows.append(make_sighting(when, zone))
+        OrcaSighting.objects.bulk_create(rows)
+        Absence.objects.bulk_create(absent)
+        self.adj_map = _zone_adjacency_map()
+
+    def test_matches_per_hour_queries(self):
+        hours = list(_iter_hourly_range(self.start, self.start + timedelta(hours=121)))
+        for step in (1, 5):
+            sweep = EligibilitySweep(zone_adjacency(), hours[0], hours[-1])
+            for ts in hours[::step]:
+                self.assertEqual(sweep.eligible_at(ts), _eligible_zones_at(ts, self.adj_map), ts)
+        with self.assertRaises(ValueError):
+            sweep.eligible_at(hours[0])
+
+    def test_generation_sees_its_own_absences(self):
+        """Phase 1 writes the same absences as querying the table every hour"""
+        end = self.start + timedelta(hours=120)
+        existing = set(Absence.objects.values_list("id", flat=True))
+        created = Absence.objects.exclude(id__in=existing).values_list("ZoneNumber_id", "time")
+        attempted = 0
+        with transaction.atomic():
+            for ts in _iter_hourly_range(self.start, end):
+                zones = _eligible_zones_at(ts, self.adj_map)
+                # Some collide with an existing absence in the same hour
+                Absence.objects.bulk_create([
+                    _absence(ts, Zone.objects.get(zoneNumber=n)) for n in zones
+                ], ignore_conflicts=True)
+                attempted += len(zones)
+            expected = sorted(created)
+            transaction.set_rollback(True)
+
+        with patch("data_pipeline.report_absence_gen._weighted_downsample_absences", return_value=0):
+            buckets, generated, _, _ = generate_absence_reports_two_phase(self.start, end)
+        self.assertEqual((buckets, generated), (121, attempted))
+        self.assertEqual(sorted(created), expected)
+        self.assertLess(len(expected), attempted)
+
+    def test_single_phase_without_downsampling_matches_two_phase(self):
+        """When everything eligible fits under the 1:3 target both paths write the same rows"""
+        end = self.start + timedelta(hours=30)
+        absences = Absence.objects.values_list("zone", "ZoneNumber_id", "time", "sunUp")
+        with transaction.atomic():
+            two_phase = generate_absence_reports_two_phase(self.start, end)
+            expected = sorted(absences)
+            transaction.set_rollback(True)
+        self.assertEqual(two_phase[3], 0)
+
+        self.assertEqual(generate_absence_reports_single_phase(self.start, end), two_phase)
+        self.assertEqual(sorted(absences), expected)
+
+    def test_single_phase_keeps_exactly_the_target(self):
+        OrcaSighting.objects.filter(present=True, time__gt=self.start + timedelta(hours=40)).delete()
+        target = 3 * OrcaSighting.objects.filter(present=True).count()
+        existing = Absence.objects.count()
+        _, eligible, kept, deleted = generate_absence_reports_single_phase(
+            self.start, self.start + timedelta(hours=120), rng=np.random.default_rng(2)
+        )
+        self.assertGreater(eligible + existing, target)
+        self.assertEqual(kept, target)
+        self.assertEqual(Absence.objects.count(), target)
+        self.assertLessEqual(deleted, existing)
+
+
+class WeightedReservoirTests(SimpleTestCase):
+
+    def test_streaming_matches_sorting_all_keys(self):
+        """A reservoir fed in small batches keeps what sorting every Efraimidis–Spirakis key would"""
+        weights = np.random.default_rng(0).uniform(0.01, 10, 5000)
+        keys = np.log(1.0 - np.random.default_rng(1).random(len(weights))) / weights
+        reservoir = WeightedReservoir(300, np.random.default_rng(1))
+        with patch("data_pipeline.report_absence_gen.RESERVOIR_MIN_BUFFER", 50):
+            for i in range(0, len(weights), 37):
+                reservoir.offer(weights[i:i + 37], np.arange(i, min(i + 37, len(weights))))
+        self.assertEqual(sorted(reservoir.sample().tolist()), sorted(np.argsort(keys)[-300:].tolist()))
+
+        self.assertIsNone(WeightedReservoir(5).sample())
+        empty = WeightedReservoir(0)
+        empty.offer(weights[:10], np.arange(10))
+        self.assertEqual(len(empty.sample()), 0)
+
+
+class WeightedDownsampleTests(TestCase):
+
+    def setUp(self):
+        self.busy = Zone.objects.create(zoneNumber=1, name="Busy", boundary="", localities="")
+        self.quiet = Zone.objects.create(zoneNumber=2, name="Quiet", boundary="", localities="")
+        ZoneEffort.objects.bulk_create([ZoneEffort(zone=self.busy, hour=h, avg_sightings=20.0) for h in range(24)])
+        ZoneSeasonality.objects.create(zone=self.busy, month=6, avg_sightings=5.0)
+        ZoneSeasonality.objects.create(zone=self.quiet, month=6, avg_sightings=0.5)
+
+        start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        absences = [_absence(start + timedelta(hours=i), zone) for zone in (self.busy, self.quiet) for i in range(60)]
+        absences += [_absence(start + timedelta(hours=i), None) for i in range(10)]
+        Absence.objects.bulk_create(absences)
+        OrcaSighting.objects.bulk_create([make_sighting(start + timedelta(minutes=i), self.quiet) for i in range(5)])
+
+    def test_keeps_target_count_by_weight(self):
+        _, weights = _build_weight_caches()
+        with patch("data_pipeline.report_absence_gen.DOWNSAMPLE_CHUNK_SIZE", 17), \
+                patch("data_pipeline.report_absence_gen.DELETE_BATCH_SIZE", 9):
+            deleted = _weighted_downsample_absences(50, weights, rng=np.random.default_rng(1))
+        self.assertEqual(deleted, 80)
+        kept = list(Absence.objects.values_list("ZoneNumber_id", flat=True))
+        self.assertEqual(len(kept), 50)
+        # Weight 100 against 0.5: the quiet zone and zoneless rows only survive by a fluke
+        self.assertGreaterEqual(kept.count(1), 48)
+        self.assertNotIn(None, kept)
+        self.assertEqual(OrcaSighting.objects.filter(present=True).count(), 5)
+
+        self.assertEqual(_weighted_downsample_absences(50, weights), 0)
+
+
+class IncrementalAbsenceTests(TestCase):
+
+    def setUp(self):
+        zones = [Zone.objects.create(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 5)]
+        for zone in zones:
+            zone.adjacentZones.set([z for z in zones if abs(z.zoneNumber - zone.zoneNumber) == 1])
+        self.zones = zones
+        self.start = datetime(2024, 7, 1, tzinfo=timezone.utc)
+        OrcaSighting.objects.bulk_create([
+            make_sighting(self.start + timedelta(hours=7 * i), zones[i % 4]) for i in range(10)
+        ])
+
+    def _absences(self):
+        return set(Absence.objects.values_list("id", "time"))
+
+    def test_tops_up_new_hours_only(self):
+        rng = np.random.default_rng(4)
+        generate_absence_reports_incremental(rng=rng)
+        watermark = AbsenceWatermark.objects.get().generated_through
+        self.assertEqual(watermark, self.start + timedelta(hours=63))
+        before = self._absences()
+        self.assertEqual(len(before), 30)
+
+        OrcaSighting.objects.bulk_create([
+            make_sighting(self.start + timedelta(hours=70 + i), self.zones[0]) for i in range(3)
+        ])
+        buckets, eligible, kept, deleted = generate_absence_reports_incremental(rng=rng)
+        after = self._absences()
+        self.assertEqual((buckets, kept, deleted), (9, 39, 0))
+        self.assertGreater(eligible, 9)
+        self.assertTrue(before <= after)
+        self.assertTrue(all(when > watermark for _, when in after - before))
+        self.assertEqual(AbsenceWatermark.objects.get().generated_through, self.start + timedelta(hours=72))
+
+        # Nothing new: no hours to process, ratio already met
+        self.assertEqual(generate_absence_reports_incremental(rng=rng), (0, 0, 39, 0))
+
+    def test_sparse_run_records_no_watermark(self):
+        generate_absence_reports_two_phase(step_hours=2)
+        generate_absence_reports_single_phase(step_hours=2, rng=np.random.default_rng(4))
+        self.assertFalse(AbsenceWatermark.objects.exists())
+
+    def test_trims_when_over_target(self):
+        generate_absence_reports_incremental()
+        OrcaSighting.objects.filter(present=True, time__lt=self.start + timedelta(hours=14)).delete()
+        self.assertEqual(generate_absence_reports_incremental(), (0, 0, 24, 6))
+        self.assertEqual(Absence.objects.count(), 24)
+
+
+class ParallelEligibilityTests(TransactionTestCase):
+    """Workers open their own connections, so the sightings have to be committed."""
+
+    def setUp(self):
+        zones = [Zone.objects.create(zoneNumber=n, name=f"Zone {n}", boundary="", localities="") for n in range(1, 7)]
+        for zone in zones:
+            zone.adjacentZones.set([z for z in zones if abs(z.zoneNumber - zone.zoneNumber) == 1])
+        rng = random.Random(11)
+        start = datetime(2024, 1, 20, tzinfo=timezone.utc)
+        rows, absences = [], []
+        for _ in range(250):
+            when, zone = start + timedelta(hours=rng.randrange(24 * 75), minutes=rng.randrange(60)), rng.choice(zones)
+            if rng.random() > 0.1:
+                rows.append(make_sighting(when, zone))
+            else:
+                absences.append(_absence(when, zone))
+        # An absence a run can collide with, right after a month boundary
+        absences.append(_absence(datetime(2024, 3, 1, 1, 30, tzinfo=timezone.utc), zones[5]))
+        OrcaSighting.objects.bulk_create(rows)
+        Absence.objects.bulk_create(absences, ignore_conflicts=True)
+
+    def test_matches_serial_run(self):
+        zones_by_number, _ = _build_weight_caches()
+        for step in (1, 2):
+            hours = _absence_hours(None, None, step)
+            partitions = _month_partitions(hours)
+            self.assertEqual(len(partitions), 4)
+            serial = _eligible_candidates(hours, zones_by_number)
+            parallel = _eligible_candidates(hours, zones_by_number, workers=3)
+            np.testing.assert_array_equal(parallel, serial)
+
+            # Without the merge each month starts its own 3-hour chain of absences
+            unmerged = np.concatenate([
+                _partition_eligibility(zone_adjacency(), list(zones_by_number), hours[first:last], first)
+                for first, last in partitions
+            ])
+            self.assertGreater(len(unmerged), len(serial))
+
+    def test_two_phase_writes_the_same_rows(self):
+        seeded = list(Absence.objects.values_list("id", flat=True))
+        absences = Absence.objects.values_list("zone", "time")
+        with patch("data_pipeline.report_absence_gen._weighted_downsample_absences", return_value=0):
+            serial = generate_absence_reports_two_phase()
+            expected = sorted(absences)
+            Absence.objects.exclude(id__in=seeded).delete()
+            self.assertEqual(generate_absence_reports_two_phase(workers=2), serial)
+        self.assertEqual(sorted(absences), expected)
+
+    def test_refuses_to_run_in_a_transaction(self):
+        zones_by_number, _ = _build_weight_caches()
+        hours = _absence_hours(None, None, 1)
+        with transaction.atomic(), self.assertRaises(RuntimeError):
+            _eligible_candidates(hours, zones_by_number, workers=2)
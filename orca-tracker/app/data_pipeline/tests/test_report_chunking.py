@@ -0,0 +1,118 @@
+from django.test import TestCase
+from unittest.mock import patch
+import threading
+import time
+from ..email_processor import _extract_report_sightings
+from ..report_chunking import archive_period, is_date_line, merge_sightings, split_report_body
+
+
+def _archive_body(day_entries):
+    """Body in the layout written by txt_fetcher.save_sightings_to_files, one block per date."""
+    blocks = []
+    for day, entries in day_entries:
+        lines = [f"Orca Sightings for July {day}, 2022", "=" * 60, ""]
+        for i, entry in enumerate(entries, 1):
+            lines += [f"Entry {i}:", entry, ""]
+        blocks.append("\n".join(lines))
+    return "\n".join(blocks)
+
+
+class ReportChunkingTests(TestCase):
+
+    def test_is_date_line(self):
+        """Same header rules as txt_fetcher.is_date_line"""
+        self.assertTrue(is_date_line("Orca Sightings for July 24, 2022"))
+        self.assertTrue(is_date_line("Sunday, March 3rd"))
+        self.assertFalse(is_date_line("Entry 5:"))
+        self.assertFalse(is_date_line("J pod heading north past Lime Kiln"))
+        self.assertFalse(is_date_line("July 24, 2021", expected_year=2022))
+        self.assertFalse(is_date_line("July 24, 2022", expected_month="August"))
+
+    def test_small_bodies_stay_whole(self):
+        body = _archive_body([(24, ["Orcas off Lime Kiln at 10:00"])])
+        self.assertEqual(split_report_body(body), [body])
+
+    def test_split_at_date_headers(self):
+        """Large bodies are cut at date headers and every chunk starts with one"""
+        body = _archive_body([(day, [f"Orcas off Lime Kiln {'x' * 80}"] * 5) for day in range(1, 7)])
+        chunks = split_report_body(body, max_chars=1000, target_chars=1000)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(is_date_line(chunk.splitlines()[0]), chunk[:60])
+            self.assertLessEqual(len(chunk), 1000)
+        self.assertEqual("".join(body.split()), "".join("".join(chunks).split()))
+
+    def test_oversized_date_segment_keeps_its_header(self):
+        """A single date too large for one chunk is split at entries, repeating the date header"""
+        body = _archive_body([(24, [f"Sighting {i} {'y' * 300}" for i in range(20)])])
+        chunks = split_report_body(body, max_chars=2000, target_chars=2000)
+
+        self.assertGreater(len(chunks), 3)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith("Orca Sightings for July 24, 2022\n"))
+        text = "\n".join(chunks)
+        for i in range(20):
+            self.assertIn(f"Sighting {i} ", text)
+
+    def test_quoted_dates_are_not_headers(self):
+        """Dates inside sighting text don't start a chunk once the archive month and year are known"""
+        self.assertEqual(archive_period("txt_file_2024_February_2024_February_27"), ("February", 2024))
+        self.assertEqual(archive_period("<abc@mail.example.com>"), (None, None))
+
+        quoted = ["heading south at 3 pm, Feb 27. -Rick Fria", "8:05 am Feb 27. At",
+                  "-photos by Donna George, February 13, 2023"]
+        entries = [f"{line}\n{'z' * 300}" if i % 5 == 4 else f"Orcas off Point Defiance {i} {'z' * 300}"
+                   for i, line in enumerate(quoted * 10)]
+        lines = ["Orca Sightings for February 27, 2024", "=" * 60, ""]
+        for i, entry in enumerate(entries, 1):
+            lines += [f"Entry {i}:", entry, ""]
+        body = "\n".join(lines)
+        month, year = archive_period("txt_file_2024_February_2024_February_27")
+
+        chunks = split_report_body(body, max_chars=2000, target_chars=2000, expected_month=month, expected_year=year)
+        self.assertGreater(len(chunks), 3)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith("Orca Sightings for February 27, 2024\n"), chunk[:60])
+        # txt_fetcher's rules alone take the first two for headers
+        self.assertTrue(is_date_line(quoted[0], month, year))
+        self.assertTrue(is_date_line(quoted[1], month, year))
+        self.assertFalse(is_date_line(quoted[2], month, year))
+
+    def test_merge_sightings_dedupes(self):
+        """The same time/zone/direction from two chunks is one sighting with the larger count"""
+        merged = merge_sightings([
+            [{"time": "2022-07-24T10:00:00Z", "zone": "6", "direction": "N", "count": 3}],
+            [
+                {"time": "2022-07-24T10:00:30+00:00", "zone": "6", "direction": "n", "count": 5},
+                {"time": "2022-07-24T11:00:00Z", "zone": "6", "direction": "N", "count": 5},
+            ],
+        ])
+        self.assertEqual(len(merged), 2)
+        self.assertEqual(merged[0]["count"], 5)
+
+    @patch('data_pipeline.email_processor.split_report_body')
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_chunks_extracted_in_parallel(self, mock_extract, mock_split):
+        """Chunks of one body are extracted concurrently and merged"""
+        mock_split.return_value = ["July 24 chunk 1", "July 24 chunk 2", "July 24 chunk 3"]
+        in_flight = []
+        lock = threading.Lock()
+        peak = [0]
+
+        def slow_extract(chunk, **kwargs):
+            with lock:
+                in_flight.append(chunk)
+                peak[0] = max(peak[0], len(in_flight))
+            time.sleep(0.2)
+            with lock:
+                in_flight.remove(chunk)
+            return [{"time": "2022-07-24T10:00:00Z", "zone": "6", "direction": "N", "count": 4}]
+        mock_extract.side_effect = slow_extract
+
+        with patch('data_pipeline.email_processor.CHUNK_CONCURRENCY', 3):
+            sightings = _extract_report_sightings("Orcas all day " * 10, {"hits": 0, "misses": 0})
+
+        self.assertEqual(mock_extract.call_count, 3)
+        self.assertEqual(peak[0], 3)
+        self.assertEqual(len(sightings), 1)
@@ -0,0 +1,107 @@
+from django.test import TestCase
+from unittest.mock import patch
+from ..email_processor import _extraction_cache_key, process_unprocessed_reports, process_unprocessed_reports_concurrent
+from ..models import ExtractionCache, RawReport
+from ..report_prefilter import evaluate_prefilter, labeled_holdout_sample, needs_extraction
+
+ORCA_REPORTS = [
+    "Orcas heading north past Lime Kiln at 3:15pm, about 6 of them",
+    "J pod spread out off Eagle Point this morning around 9",
+    "T65As hunting in Dalco Passage at 14:00",
+    "Killer whales seen from the Edmonds ferry at noon",
+    "Saw a tall dorsal fin near Deception Pass around 4pm",
+    "Whales passing Point Wilson westbound at 11am",
+]
+
+NON_ORCA_REPORTS = [
+    "Humpback whale breaching off Lime Kiln at 3pm",
+    "Gray whale feeding near Langley all afternoon",
+    "Our spring newsletter is here - donate to support the hydrophone network!",
+    "Re: thanks for the photos, see you Saturday",
+    "Took the Orcas Island ferry, saw harbor seals and porpoises",
+    "",
+]
+
+
+class ReportPrefilterTests(TestCase):
+
+    def test_orca_reports_need_extraction(self):
+        """Reports naming orcas, pods or whales at a known locality go to the LLM"""
+        for body in ORCA_REPORTS:
+            self.assertTrue(needs_extraction(body), body)
+
+    def test_non_orca_reports_are_skipped(self):
+        """Other species, newsletters, replies and place names alone skip the LLM"""
+        for body in NON_ORCA_REPORTS:
+            self.assertFalse(needs_extraction(body), body)
+
+    def test_evaluate_prefilter(self):
+        """Precision/recall are reported for the send-to-LLM class"""
+        samples = [(body, True) for body in ORCA_REPORTS] + [(body, False) for body in NON_ORCA_REPORTS]
+        samples.append(("Whales off Langley, turned out to be porpoises", False))
+        stats = evaluate_prefilter(samples)
+
+        self.assertEqual(stats["recall"], 1.0)
+        self.assertEqual(stats["fp"], 1)
+        self.assertAlmostEqual(stats["precision"], 6 / 7)
+        self.assertEqual(stats["avoided"], len(NON_ORCA_REPORTS))
+
+    @patch("data_pipeline.report_prefilter.HOLDOUT_RATE", 0.5)
+    def test_labeled_sample_is_the_holdout(self):
+        """Only hold-out reports with a cached LLM extraction are labeled - including ones the pre-filter would skip"""
+        bodies = ["Orcas off Lime Kiln at 10am", "Big black fins off Lime Kiln at 10am", "Newsletter", "Not cached"]
+        for i, body in enumerate(bodies):
+            RawReport.objects.create(messageId=f"test_{i}", subject="s", sender="s", body=body, processed=True)
+        for body in bodies[:3]:
+            ExtractionCache.objects.create(key=_extraction_cache_key(body), sightings=[] if body == "Newsletter" else [{"zone": "6"}])
+
+        sample = labeled_holdout_sample()
+        # "Newsletter" is outside the hold-out; the pre-filter's miss is in the sample
+        self.assertEqual(sorted(sample), [("Big black fins off Lime Kiln at 10am", True), ("Orcas off Lime Kiln at 10am", True)])
+        self.assertEqual(evaluate_prefilter(sample)["recall"], 0.5)
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_holdout_reports_bypass_the_prefilter(self, mock_extract):
+        """A hold-out report the pre-filter would skip still goes to the LLM and gets cached"""
+        body = "Big black fins off Lime Kiln at 10am"
+        self.assertFalse(needs_extraction(body))
+        RawReport.objects.create(messageId="test_fins", subject="s", sender="s", body=body, processed=False)
+        mock_extract.return_value = []
+        with patch("data_pipeline.report_prefilter.HOLDOUT_RATE", 0.5):
+            process_unprocessed_reports(limit=10)
+        mock_extract.assert_called_once_with(body, raise_errors=True)
+        self.assertTrue(ExtractionCache.objects.filter(key=_extraction_cache_key(body)).exists())
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_prefiltered_reports_skip_llm(self, mock_extract):
+        """Reports without orca content are marked processed without an LLM call"""
+        newsletter = RawReport.objects.create(
+            messageId="test_news", subject="Newsletter", sender="news@example.com",
+            body="Our spring newsletter is here", processed=False
+        )
+        orca = RawReport.objects.create(
+            messageId="test_orca", subject="Sighting", sender="test@example.com",
+            body="Orcas off Lime Kiln at 10am", processed=False
+        )
+        mock_extract.return_value = []
+
+        with patch('data_pipeline.email_processor.logger') as mock_logger:
+            process_unprocessed_reports(limit=10)
+
+        mock_extract.assert_called_once_with(orca.body, raise_errors=True)
+        newsletter.refresh_from_db()
+        self.assertTrue(newsletter.processed)
+        self.assertFalse(ExtractionCache.objects.filter(key=_extraction_cache_key(newsletter.body)).exists())
+        mock_logger.info.assert_any_call("Pre-filter: 1 reports without orca content, LLM calls avoided")
+
+    @patch('data_pipeline.email_processor._extract_sightings')
+    def test_prefilter_in_concurrent_path(self, mock_extract):
+        """The concurrent path applies the pre-filter before submitting LLM calls"""
+        RawReport.objects.create(
+            messageId="test_news", subject="Newsletter", sender="news@example.com",
+            body="Our spring newsletter is here", processed=False
+        )
+        process_unprocessed_reports_concurrent(limit=10, concurrency=2)
+
+        mock_extract.assert_not_called()
+        self.assertFalse(RawReport.objects.filter(processed=False).exists())
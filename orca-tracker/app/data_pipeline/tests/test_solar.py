@@ -0,0 +1,115 @@
+from django.test import SimpleTestCase, TestCase
+from datetime import datetime, timedelta, timezone
+import json
+import numpy as np
+from unittest.mock import patch
+from ..email_processor import ZoneRegistry, _write_report_sightings
+from ..models import Absence, OrcaSighting, RawReport, Zone
+from ..prediction_generator import prep_sightings
+from ..solar import backfill_sun_up, boundary_centroid, solar_elevation, sun_up, table_sun_up
+from .helpers import make_sighting
+
+SEATTLE = (47.6062, -122.3321)
+SQUARE = [[-123.0, 48.0], [-122.0, 48.0], [-122.0, 49.0], [-123.0, 49.0], [-123.0, 48.0]]
+
+
+class SolarPositionTests(SimpleTestCase):
+
+    def test_matches_noaa_times(self):
+        """Seattle civil dawn/dusk and solar noon elevation against the NOAA calculator"""
+        # Summer solstice: civil dawn 04:31 PDT, dusk 21:52 PDT, noon elevation 65.8
+        day = datetime(2024, 6, 20, tzinfo=timezone.utc)
+        minutes = [day + timedelta(minutes=m) for m in range(1440)]
+        self.assertAlmostEqual(solar_elevation(minutes, *SEATTLE).max(), 65.8, delta=0.1)
+        times = [
+            datetime(2024, 6, 20, 11, 25, tzinfo=timezone.utc),
+            datetime(2024, 6, 20, 11, 40, tzinfo=timezone.utc),
+            datetime(2024, 6, 21, 4, 45, tzinfo=timezone.utc),
+            datetime(2024, 6, 21, 5, 0, tzinfo=timezone.utc),
+            # Winter solstice: civil dawn 07:19 PST
+            datetime(2024, 12, 21, 15, 10, tzinfo=timezone.utc),
+            datetime(2024, 12, 21, 15, 30, tzinfo=timezone.utc),
+        ]
+        self.assertEqual(sun_up(times, *SEATTLE).tolist(), [False, True, True, False, False, True])
+
+    def test_vectorizes_over_times_and_places(self):
+        times = np.array(["2024-06-20T12:00", "2024-06-20T12:00"], dtype="datetime64[s]")
+        # Same instant: just after dawn on the coast, still dark 15 degrees west
+        self.assertEqual(sun_up(times, [47.6, 47.6], [-122.3, -137.3]).tolist(), [True, False])
+
+    def test_table_matches_trigger(self):
+        """zone_calc.sql's table: UTC time of day against the month's widened sunrise/sunset"""
+        times = [
+            datetime(2024, 6, 20, 4, 39, tzinfo=timezone.utc),
+            datetime(2024, 6, 20, 4, 40, tzinfo=timezone.utc),
+            datetime(2024, 6, 20, 21, 34, tzinfo=timezone.utc),
+            datetime(2024, 6, 20, 21, 35, tzinfo=timezone.utc),
+            datetime(2024, 1, 5, 7, 30, tzinfo=timezone.utc),
+            datetime(2024, 1, 5, 17, 0, tzinfo=timezone.utc),
+        ]
+        self.assertEqual(table_sun_up(times).tolist(), [False, True, True, False, True, False])
+
+    def test_boundary_centroid(self):
+        polygon = {"type": "Polygon", "coordinates": [SQUARE]}
+        self.assertEqual(boundary_centroid(json.dumps(polygon)), (48.5, -122.5))
+        self.assertEqual(boundary_centroid(json.dumps({"type": "Feature", "geometry": polygon})), (48.5, -122.5))
+        wkt = "POLYGON ((-123 48, -122 48, -122 49, -123 49, -123 48), (-122.6 48.4, -122.4 48.4, -122.4 48.6, -122.6 48.4))"
+        self.assertEqual(boundary_centroid(wkt), (48.5, -122.5))
+        multi = "MULTIPOLYGON (((-123 48, -122 48, -122 49, -123 49, -123 48)), ((-121 48, -120 48, -120 49, -121 49, -121 48)))"
+        self.assertEqual(boundary_centroid(multi), (48.5, -121.5))
+        self.assertEqual(boundary_centroid("POINT (-123.1 48.6)"), (48.6, -123.1))
+        self.assertIsNone(boundary_centroid(""))
+        self.assertIsNone(boundary_centroid("north of Lime Kiln"))
+
+
+@patch("data_pipeline.solar.SOLAR_SUN_UP", True)
+class SunUpWriteTests(TestCase):
+
+    def setUp(self):
+        # Zone 7 is far enough west that the sun rises about an hour later
+        Zone.objects.create(zoneNumber=6, name="Haro Strait", localities="",
+                            boundary=json.dumps({"type": "Polygon", "coordinates": [SQUARE]}))
+        Zone.objects.create(zoneNumber=7, name="Far West", localities="", boundary="POINT (-137.5 48.5)")
+        self.raw = RawReport.objects.create(messageId="solar-1", body="report", subject="s", sender="x")
+
+    def test_ingest_sets_sun_up(self):
+        sightings = [
+            {"time": "2024-06-20T11:45:00Z", "zone": "6", "direction": "N", "count": 2},
+            {"time": "2024-06-20T11:45:00Z", "zone": "7", "direction": "N", "count": 2},
+            {"time": "2024-06-20T20:00:00Z", "zone": "Unknown", "direction": "N", "count": 2},
+        ]
+        _write_report_sightings(self.raw, sightings, ZoneRegistry())
+        self.assertEqual(list(OrcaSighting.objects.order_by("id").values_list("sunUp", flat=True)), [True, False, True])
+
+    def test_backfill_updates_changed_rows_only(self):
+        when = datetime(2024, 6, 20, 11, 45, tzinfo=timezone.utc)
+        OrcaSighting.objects.bulk_create([
+            OrcaSighting(time=when, zone=zone, count=1, month=6, dayOfWeek=4, hour=11, sunUp=stored)
+            for zone, stored in (("6", None), ("7", True), ("6", True), ("7", False))
+        ])
+        Absence.objects.bulk_create([Absence(time=when, zone=zone, sunUp=stored) for zone, stored in (("6", False), ("7", False))])
+        stats = backfill_sun_up(batch_size=3)
+        self.assertEqual((stats["checked"], stats["updated"]), (6, 3))
+        self.assertEqual(list(OrcaSighting.objects.order_by("id").values_list("sunUp", flat=True)), [True, False, True, False])
+        self.assertEqual(list(Absence.objects.order_by("zone").values_list("sunUp", flat=True)), [True, False])
+
+        self.assertEqual(backfill_sun_up(only_missing=True)["checked"], 0)
+
+    def test_prediction_sighting_without_zone(self):
+        sighting = make_sighting(datetime(2024, 6, 20, 11, 45, tzinfo=timezone.utc), None)
+        sighting.reportsIn5h = sighting.reportsIn24h = 0
+        with patch("data_pipeline.prediction_generator.ZONE_ENCODING") as encoding, \
+                patch("data_pipeline.prediction_generator.FEATURE_COLUMNS", ["sunUp", "ZoneNumber_id"]):
+            encoding.transform.return_value = [0]
+            features = prep_sightings(sighting)
+        self.assertTrue(sighting.sunUp)
+        self.assertEqual(features.iloc[0].tolist(), [True, 0])
+
+    def test_ingest_keeps_trigger_values_by_default(self):
+        sightings = [
+            {"time": "2024-06-20T11:45:00Z", "zone": "6", "direction": "N", "count": 2},
+            {"time": "2024-06-20T04:00:00Z", "zone": "7", "direction": "N", "count": 2},
+        ]
+        with patch("data_pipeline.solar.SOLAR_SUN_UP", False):
+            _write_report_sightings(self.raw, sightings, ZoneRegistry())
+        self.assertEqual(list(OrcaSighting.objects.order_by("id").values_list("sunUp", flat=True)), [True, False])
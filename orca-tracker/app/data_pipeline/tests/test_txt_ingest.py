@@ -0,0 +1,91 @@
+from django.test import TestCase
+from unittest.mock import patch
+import os
+import tempfile
+from ..models import OrcaSighting, RawReport
+from ..txt_ingest import MANIFEST_NAME, FileManifest, ingest_txt_folder_parallel
+
+SIGHTING = {"time": "2023-07-24T10:00:00Z", "zone": "6", "direction": "N", "count": 4}
+
+
+class TxtIngestTests(TestCase):
+
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.month_path = os.path.join(self.base, "2023", "July")
+        os.makedirs(self.month_path)
+        for day in (1, 2, 3):
+            self._write(f"2023_July_0{day}.txt", f"Orcas heading north past Lime Kiln on July {day}")
+
+    def tearDown(self):
+        for root, dirs, files in os.walk(self.base, topdown=False):
+            for name in files:
+                os.remove(os.path.join(root, name))
+            for name in dirs:
+                os.rmdir(os.path.join(root, name))
+        os.rmdir(self.base)
+
+    def _write(self, filename, text):
+        with open(os.path.join(self.month_path, filename), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    @patch('data_pipeline.txt_ingest._extract_body_sightings')
+    def test_parallel_ingest_creates_reports_and_manifest(self, mock_extract):
+        """Every file becomes a processed report with its sightings and a manifest entry"""
+        mock_extract.return_value = [SIGHTING]
+        stats = ingest_txt_folder_parallel(self.base, workers=3)
+
+        self.assertEqual(stats["ingested"], 3)
+        self.assertEqual(stats["sightings"], 3)
+        self.assertEqual(mock_extract.call_count, 3)
+        self.assertEqual(RawReport.objects.filter(messageId__startswith="txt_file_2023_July", processed=True).count(), 3)
+        self.assertEqual(OrcaSighting.objects.count(), 3)
+        # Files stay in place; the manifest records them
+        self.assertEqual(len(os.listdir(self.month_path)), 3)
+        manifest = FileManifest(os.path.join(self.base, MANIFEST_NAME))
+        self.assertEqual(
+            manifest.entries[os.path.join("2023", "July", "2023_July_01.txt")]["message_id"],
+            "txt_file_2023_July_2023_July_01",
+        )
+        self.assertEqual(stats["stages"]["read"]["files"], 3)
+
+    @patch('data_pipeline.txt_ingest._extract_body_sightings')
+    def test_rerun_skips_unchanged_files_without_db(self, mock_extract):
+        """A rerun over an unchanged tree reads no files and runs no queries"""
+        mock_extract.return_value = [SIGHTING]
+        ingest_txt_folder_parallel(self.base, workers=2)
+
+        with patch('data_pipeline.txt_ingest._read_archive_file') as mock_read, self.assertNumQueries(0):
+            stats = ingest_txt_folder_parallel(self.base, workers=2)
+        mock_read.assert_not_called()
+        self.assertEqual(stats["unchanged"], 3)
+        self.assertEqual(stats["ingested"], 0)
+
+    @patch('data_pipeline.txt_ingest._extract_body_sightings')
+    def test_new_and_touched_files(self, mock_extract):
+        """New files are ingested; files touched without a content change are not re-extracted"""
+        mock_extract.return_value = [SIGHTING]
+        ingest_txt_folder_parallel(self.base, workers=2)
+        mock_extract.reset_mock()
+
+        touched = os.path.join(self.month_path, "2023_July_01.txt")
+        st = os.stat(touched)
+        os.utime(touched, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self._write("2023_July_04.txt", "Orcas heading south past Lime Kiln on July 4")
+
+        stats = ingest_txt_folder_parallel(self.base, workers=2)
+        self.assertEqual(stats["ingested"], 1)
+        self.assertEqual(stats["unchanged"], 3)
+        mock_extract.assert_called_once()
+
+    @patch('data_pipeline.txt_ingest._extract_body_sightings')
+    def test_failed_extraction_is_retried_next_run(self, mock_extract):
+        """Files whose extraction fails get no report and no manifest entry"""
+        mock_extract.side_effect = RuntimeError("LLM exploded")
+        stats = ingest_txt_folder_parallel(self.base, workers=2)
+        self.assertEqual(stats["failed"], 3)
+        self.assertFalse(RawReport.objects.filter(messageId__startswith="txt_file_2023_July").exists())
+
+        mock_extract.side_effect = None
+        mock_extract.return_value = []
+        self.assertEqual(ingest_txt_folder_parallel(self.base, workers=2)["ingested"], 3)
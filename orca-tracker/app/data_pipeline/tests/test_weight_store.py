@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+import numpy as np
+from ..weight_store import MIN_WEIGHT, WeightStore
+
+
+class WeightStoreTests(SimpleTestCase):
+
+    def test_matches_per_row_dict_lookups(self):
+        rng = np.random.default_rng(7)
+        effort = {(z, h): float(rng.uniform(0, 20)) for z in (2, 5, 9) for h in range(24) if rng.random() > 0.3}
+        season = {(z, m): float(rng.uniform(0, 5)) for z in (5, 9, 11) for m in range(1, 13) if rng.random() > 0.3}
+        effort[(5, 3)] = 0.0
+        store = WeightStore.from_rows(
+            [(z, h, avg) for (z, h), avg in effort.items()] + [(2, 24, 99.0)],
+            [(z, m, avg) for (z, m), avg in season.items()] + [(9, 0, 99.0)],
+        )
+        self.assertEqual(store.zone_numbers.tolist(), [2, 5, 9, 11])
+        self.assertEqual(store.index[9], 2)
+
+        zones = rng.choice([-1, 1, 2, 5, 9, 11], 500)
+        hours = rng.integers(0, 24, 500)
+        months = rng.integers(1, 13, 500)
+        expected = [
+            MIN_WEIGHT if z < 0 else max(effort.get((z, h), 1.0) * season.get((z, m), 1.0), MIN_WEIGHT)
+            for z, h, m in zip(zones.tolist(), hours.tolist(), months.tolist())
+        ]
+        np.testing.assert_allclose(store.weights(zones, hours, months), expected)
+        self.assertEqual(store.weights([5], [3], [1]).tolist(), [MIN_WEIGHT])
+
+    def test_empty(self):
+        store = WeightStore.from_rows([], [])
+        self.assertEqual(store.weights([3, -1], [0, 5], [1, 12]).tolist(), [1.0, MIN_WEIGHT])
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase, TestCase
+import numpy as np
+from ..models import Zone
+from ..zone_adjacency import ZoneAdjacency, invalidate_zone_adjacency, zone_adjacency
+
+
+class ZoneAdjacencyTests(SimpleTestCase):
+
+    def setUp(self):
+        self.adjacency = ZoneAdjacency([7, 2, 5, 9], [(2, 5), (5, 2), (5, 9), (9, 9), (3, 5)], [(2, 9)])
+
+    def test_matrices(self):
+        self.assertEqual(self.adjacency.numbers.tolist(), [2, 5, 7, 9])
+        self.assertEqual(self.adjacency.neighbours(5).tolist(), [2, 9])
+        self.assertEqual(self.adjacency.neighbours(9).tolist(), [9])
+        self.assertEqual(self.adjacency.neighbours(2, next_adjacent=True).tolist(), [9])
+        self.assertEqual(self.adjacency.neighbours(3).tolist(), [])
+        self.assertEqual(self.adjacency.degree(7), 0)
+        self.assertEqual(self.adjacency.degree(5), 2)
+        self.assertEqual(self.adjacency.adjacency_map(), {2: [5], 5: [2, 9], 7: [], 9: [9]})
+
+    def test_neighbour_counts(self):
+        counts = np.array([1, 10, 100, 1000])
+        self.assertEqual(self.adjacency.neighbour_counts(counts).tolist(), [10, 1001, 0, 1000])
+        self.assertEqual(self.adjacency.neighbour_counts(counts, next_adjacent=True).tolist(), [1000, 0, 0, 0])
+
+
+class ZoneAdjacencyCacheTests(TestCase):
+
+    def setUp(self):
+        invalidate_zone_adjacency()
+        self.zones = [Zone.objects.create(zoneNumber=n, name=f"Zone {n}", boundary="", localities="")
+                      for n in (1, 2, 3)]
+        self.addCleanup(invalidate_zone_adjacency)
+
+    def test_edits_invalidate_the_cache(self):
+        one, two, three = self.zones
+        one.adjacentZones.set([two])
+        adjacency = zone_adjacency()
+        self.assertIs(zone_adjacency(), adjacency)
+        self.assertEqual(adjacency.neighbours(1).tolist(), [2])
+
+        one.adjacentZones.add(three)
+        self.assertEqual(zone_adjacency().neighbours(1).tolist(), [2, 3])
+        three.nextAdjacentZones.set([one])
+        self.assertEqual(zone_adjacency().neighbours(3, next_adjacent=True).tolist(), [1])
+        one.adjacentZones.remove(two)
+        self.assertEqual(zone_adjacency().neighbours(1).tolist(), [3])
+        three.delete()
+        self.assertEqual(zone_adjacency().numbers.tolist(), [1, 2])
+        self.assertEqual(zone_adjacency().neighbours(1).tolist(), [])
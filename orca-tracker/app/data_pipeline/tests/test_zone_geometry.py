@@ -0,0 +1,104 @@
+from django.test import SimpleTestCase, TestCase
+import json
+import numpy as np
+from ..email_processor import ZoneRegistry, _write_report_sightings
+from ..models import OrcaSighting, RawReport, Zone
+from ..zone_geometry import NO_ZONE, ZoneGeometry, _points_in_edges, parse_boundary, polygon_edges, zone_geometry
+
+SQUARE = [[-123.0, 48.0], [-122.0, 48.0], [-122.0, 49.0], [-123.0, 49.0], [-123.0, 48.0]]
+SQUARE_WITH_HOLE = (
+    "POLYGON ((-123 48, -122 48, -122 49, -123 49, -123 48), "
+    "(-122.6 48.4, -122.4 48.4, -122.4 48.6, -122.6 48.6, -122.6 48.4))"
+)
+
+
+def _jagged(rng, lat, lon, radius, vertices=60):
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    r = radius * rng.uniform(0.5, 1.0, vertices)
+    return [[lon + x, lat + y] for x, y in zip(r * np.cos(angles), r * np.sin(angles))]
+
+
+class ZoneGeometryTests(SimpleTestCase):
+
+    def test_parse_boundary(self):
+        polygons = parse_boundary(SQUARE_WITH_HOLE)
+        self.assertEqual([len(ring) for ring in polygons[0]], [5, 5])
+        multi = parse_boundary("MULTIPOLYGON (((-123 48, -122 48, -122 49, -123 48)), ((-121 48, -120 48, -120 49, -121 48)))")
+        self.assertEqual(len(multi), 2)
+        self.assertEqual(multi[1][0][1].tolist(), [-120.0, 48.0])
+        feature = json.dumps({"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [SQUARE]}})
+        self.assertEqual(parse_boundary(feature)[0][0].tolist(), SQUARE)
+        self.assertEqual(parse_boundary("POINT (-123.1 48.6)")[0][0].tolist(), [[-123.1, 48.6]])
+        self.assertEqual(parse_boundary(""), [])
+        with self.assertRaises(ValueError):
+            parse_boundary("north of Lime Kiln")
+
+    def test_lookup_matches_ray_casting_every_zone(self):
+        """Grid lookups agree with a brute-force ray cast, holes and overlaps included"""
+        rng = np.random.default_rng(3)
+        zones = [(n, json.dumps({"type": "Polygon", "coordinates": [
+            _jagged(rng, 48 + n % 3 * 0.4, -123 + n // 3 * 0.4, 0.3)
+        ]})) for n in range(1, 10)]
+        zones.append((10, SQUARE_WITH_HOLE))
+        zones.append((11, "POINT (-123.1 48.6)"))
+        zones.append((12, "not a boundary"))
+        geometry = ZoneGeometry(zones, resolution=32)
+        self.assertEqual(geometry.numbers.tolist(), list(range(1, 11)))
+
+        lat = rng.uniform(47.5, 49.5, 20000)
+        lon = rng.uniform(-123.5, -121.5, 20000)
+        expected = np.full(len(lat), NO_ZONE)
+        # Lowest zone number wins where zones overlap
+        for number, boundary in reversed(zones[:10]):
+            expected[_points_in_edges(lon, lat, polygon_edges(parse_boundary(boundary)))] = number
+        found = geometry.lookup(lat, lon)
+        np.testing.assert_array_equal(found, expected)
+        self.assertTrue((found == NO_ZONE).any() and (found == 10).any())
+
+        square = ZoneGeometry([(10, SQUARE_WITH_HOLE)])
+        self.assertIsNone(square.locate(48.5, -122.5))  # in the hole
+        self.assertEqual(square.locate(48.1, -122.1), 10)
+        self.assertIsNone(square.locate(10.0, 10.0))
+        self.assertEqual(ZoneGeometry([]).lookup([48.5], [-122.5]).tolist(), [NO_ZONE])
+
+
+class ZoneLookupTests(TestCase):
+
+    def setUp(self):
+        Zone.objects.create(zoneNumber=6, name="Haro Strait", localities="",
+                            boundary=json.dumps({"type": "Polygon", "coordinates": [SQUARE]}))
+        self.raw = RawReport.objects.create(messageId="geometry-1", body="report", subject="s", sender="x")
+
+    def test_cache_is_rebuilt_after_zone_changes(self):
+        self.assertEqual(zone_geometry().locate(48.5, -122.5), 6)
+        self.assertIs(zone_geometry(), zone_geometry())
+        Zone.objects.create(zoneNumber=2, name="Overlap", localities="", boundary=SQUARE_WITH_HOLE)
+        self.assertEqual(zone_geometry().locate(48.1, -122.1), 2)
+        Zone.objects.filter(zoneNumber=2).get().delete()
+        self.assertEqual(zone_geometry().locate(48.1, -122.1), 6)
+
+    def test_lookup_endpoint(self):
+        response = self.client.get("/api/zones/lookup/", {"lat": "48.5,10", "lon": "-122.5,10"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"zones": [6, None]})
+        self.assertEqual(self.client.get("/api/zones/lookup/", {"lat": "48.5,x", "lon": "1,2"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/zones/lookup/", {"lat": "48.5", "lon": "1,2"}).status_code, 400)
+
+    def test_coordinates_set_the_zone(self):
+        Zone.objects.create(zoneNumber=7, name="San Juan Channel", localities="", boundary="")
+        sightings = [
+            {"time": "2024-06-20T18:00:00Z", "zone": "Lime Kiln", "direction": "N", "count": 2,
+             "latitude": 48.5, "longitude": -122.5},
+            {"time": "2024-06-20T18:00:00Z", "zone": "7", "direction": "N", "count": 2,
+             "latitude": "48.2", "longitude": "-122.9"},
+            # Outside every zone, or no usable coordinates: the extracted zone stands
+            {"time": "2024-06-20T18:00:00Z", "zone": "7", "direction": "N", "count": 2,
+             "latitude": 10.0, "longitude": 10.0},
+            {"time": "2024-06-20T18:00:00Z", "zone": "7", "direction": "N", "count": 2,
+             "latitude": 148.5, "longitude": -122.5},
+        ]
+        self.assertEqual(_write_report_sightings(self.raw, sightings, ZoneRegistry()), 4)
+        self.assertEqual(
+            list(OrcaSighting.objects.order_by("id").values_list("zone", "ZoneNumber")),
+            [("6", 6), ("6", 6), ("7", 7), ("7", 7)],
+        )
@@ -0,0 +1,70 @@
+"""
+Effort(hour) x seasonality(month) sampling weights as dense arrays.
+
+ZoneEffort and ZoneSeasonality rows become an effort [zone index, 24] and a seasonality
+[zone index, 12] array plus a zone number -> index map, so the weights of any number of
+(zone, hour, month) triples come from one fancy-indexing lookup. Zones, hours or months
+without a row weigh 1.0 on that side; absences without a zone (zone number -1) weigh
+MIN_WEIGHT, which is also the floor for everything else.
+"""
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from .models import ZoneEffort, ZoneSeasonality
+
+MIN_WEIGHT = 1e-6
+
+
+class WeightStore:
+    """Dense effort and seasonality tables with vectorized weight lookup."""
+
+    def __init__(self, zone_numbers: np.ndarray, effort: np.ndarray, season: np.ndarray):
+        """`effort` is [zone, hour 0-23] and `season` [zone, month 1-12 at 0-11], rows in `zone_numbers` order."""
+        self.zone_numbers = np.asarray(zone_numbers, dtype=np.int64)
+        self.index: Dict[int, int] = {int(n): i for i, n in enumerate(self.zone_numbers)}
+        # A trailing row of ones for zones without effort or seasonality rows
+        self.effort = np.vstack([effort, np.ones((1, 24))])
+        self.season = np.vstack([season, np.ones((1, 12))])
+
+    @classmethod
+    def from_rows(cls, effort_rows: Iterable[Tuple[int, int, float]],
+                  season_rows: Iterable[Tuple[int, int, float]]) -> "WeightStore":
+        """From (zone number, hour, avg) and (zone number, month, avg) rows; out-of-range hours and months are dropped."""
+        effort_rows = np.array(list(effort_rows), dtype=np.float64).reshape(-1, 3)
+        season_rows = np.array(list(season_rows), dtype=np.float64).reshape(-1, 3)
+        numbers = np.union1d(effort_rows[:, 0], season_rows[:, 0]).astype(np.int64)
+        effort = np.ones((len(numbers), 24))
+        season = np.ones((len(numbers), 12))
+        for table, rows, first in ((effort, effort_rows, 0), (season, season_rows, 1)):
+            column = rows[:, 1].astype(np.int64) - first
+            valid = (column >= 0) & (column < table.shape[1])
+            table[np.searchsorted(numbers, rows[valid, 0].astype(np.int64)), column[valid]] = rows[valid, 2]
+        return cls(numbers, effort, season)
+
+    @classmethod
+    def load(cls) -> "WeightStore":
+        """From the ZoneEffort and ZoneSeasonality tables."""
+        return cls.from_rows(
+            ZoneEffort.objects.values_list("zone_id", "hour", "avg_sightings"),
+            ZoneSeasonality.objects.values_list("zone_id", "month", "avg_sightings"),
+        )
+
+    def rows(self, zone_numbers) -> np.ndarray:
+        """Table row of each zone number; the trailing row of ones for unknown zones."""
+        zone_numbers = np.asarray(zone_numbers, dtype=np.int64)
+        row = np.searchsorted(self.zone_numbers, zone_numbers)
+        known = row < len(self.zone_numbers)
+        known[known] = self.zone_numbers[row[known]] == zone_numbers[known]
+        row[~known] = len(self.zone_numbers)
+        return row
+
+    def weights(self, zone_numbers, hours, months) -> np.ndarray:
+        """Effort(hour) * seasonality(month) per (zone, hour, month); MIN_WEIGHT for zone -1 and as the floor."""
+        zone_numbers = np.asarray(zone_numbers, dtype=np.int64)
+        row = self.rows(zone_numbers)
+        weights = (self.effort[row, np.clip(hours, 0, 23)]
+                   * self.season[row, np.clip(np.asarray(months) - 1, 0, 11)])
+        weights = np.maximum(weights, MIN_WEIGHT)
+        weights[zone_numbers < 0] = MIN_WEIGHT
+        return weights
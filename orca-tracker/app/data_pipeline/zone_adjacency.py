@@ -0,0 +1,94 @@
+"""
+Zone adjacency as boolean matrices.
+
+Zone.adjacentZones and Zone.nextAdjacentZones are self-referential M2M tables. ZoneAdjacency
+reads both once into [zone, zone] boolean arrays over the sorted zone numbers, so a
+neighbourhood question about every zone at once - which zones have a neighbour with a
+recent sighting, how many sightings their neighbours had - is one matrix product.
+
+zone_adjacency() keeps one instance per process; adjacency edits and Zone saves/deletes
+invalidate it (see signals.py) and it is rebuilt after ADJACENCY_TTL seconds regardless,
+for processes that didn't see the change.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .models import Zone
+
+logger = logging.getLogger(__name__)
+
+ADJACENCY_TTL = 600
+
+
+class ZoneAdjacency:
+    """Adjacent and next-adjacent zones as [zone, zone] boolean matrices, rows and columns in zone number order."""
+
+    def __init__(self, zone_numbers: Iterable[int], adjacent: Iterable[Tuple[int, int]] = (),
+                 next_adjacent: Iterable[Tuple[int, int]] = ()):
+        """From every zone number and (from zone, to zone) pairs; pairs naming unknown zones are ignored."""
+        self.numbers = np.array(sorted(set(zone_numbers)), dtype=np.int64)
+        self.index: Dict[int, int] = {int(n): i for i, n in enumerate(self.numbers)}
+        self.adjacent = self._matrix(adjacent)
+        self.next_adjacent = self._matrix(next_adjacent)
+
+    def _matrix(self, pairs: Iterable[Tuple[int, int]]) -> np.ndarray:
+        matrix = np.zeros((len(self.numbers), len(self.numbers)), dtype=bool)
+        for from_zone, to_zone in pairs:
+            if from_zone in self.index and to_zone in self.index:
+                matrix[self.index[from_zone], self.index[to_zone]] = True
+        return matrix
+
+    @classmethod
+    def load(cls) -> "ZoneAdjacency":
+        """From the Zone table and its two adjacency tables."""
+        return cls(
+            Zone.objects.values_list("zoneNumber", flat=True),
+            Zone.adjacentZones.through.objects.values_list("from_zone_id", "to_zone_id"),
+            Zone.nextAdjacentZones.through.objects.values_list("from_zone_id", "to_zone_id"),
+        )
+
+    def neighbours(self, zone_number: int, next_adjacent: bool = False) -> np.ndarray:
+        """Zone numbers adjacent (or next-adjacent) to one zone; empty for an unknown zone."""
+        row = self.index.get(zone_number)
+        if row is None:
+            return np.empty(0, dtype=np.int64)
+        matrix = self.next_adjacent if next_adjacent else self.adjacent
+        return self.numbers[matrix[row]]
+
+    def neighbour_counts(self, counts: np.ndarray, next_adjacent: bool = False) -> np.ndarray:
+        """For per-zone `counts` in zone number order, the sum over each zone's neighbours."""
+        matrix = self.next_adjacent if next_adjacent else self.adjacent
+        return matrix.astype(counts.dtype) @ counts
+
+    def degree(self, zone_number: int, next_adjacent: bool = False) -> int:
+        """Number of zones adjacent (or next-adjacent) to one zone."""
+        return len(self.neighbours(zone_number, next_adjacent))
+
+    def adjacency_map(self) -> Dict[int, List[int]]:
+        """zone number -> adjacent zone numbers, in zone number order."""
+        return {int(n): self.numbers[row].tolist() for n, row in zip(self.numbers, self.adjacent)}
+
+
+_cache: Dict[str, object] = {"adjacency": None, "built": 0.0}
+_cache_lock = threading.Lock()
+
+
+def zone_adjacency() -> ZoneAdjacency:
+    """This process's ZoneAdjacency, built from the database on first use."""
+    with _cache_lock:
+        if _cache["adjacency"] is None or time.monotonic() - _cache["built"] > ADJACENCY_TTL:
+            started = time.monotonic()
+            _cache["adjacency"] = ZoneAdjacency.load()
+            _cache["built"] = time.monotonic()
+            logger.debug(f"Built zone adjacency in {_cache['built'] - started:.3f}s")
+        return _cache["adjacency"]
+
+
+def invalidate_zone_adjacency(**kwargs):
+    """Drop the cached adjacency; connected to adjacency edits and Zone saves and deletes."""
+    with _cache_lock:
+        _cache["adjacency"] = None
@@ -0,0 +1,243 @@
+"""
+Parsed zone boundaries and a point -> zone lookup.
+
+Zone.boundary holds GeoJSON or WKT text. ZoneGeometry parses every boundary once into
+flat edge arrays and lays a uniform grid over them: cells no boundary passes through
+resolve straight to the zone covering them (or to none), and only points in cells a
+boundary crosses are ray-cast (even-odd, so holes work) against the zones touching
+that cell. Overlapping zones resolve to the lowest zone number.
+
+zone_geometry() keeps one instance per process; Zone saves/deletes invalidate it
+(see signals.py) and it is rebuilt after GEOMETRY_TTL seconds regardless, for
+processes that didn't see the save.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Zone
+
+logger = logging.getLogger(__name__)
+
+NO_ZONE = -1
+GEOMETRY_TTL = 600
+# Cells along the longer side of the zones' bounding box
+GRID_RESOLUTION = 256
+# Upper bound on points x edges evaluated at once by the ray cast
+_CHUNK_CELLS = 4_000_000
+
+_MIXED = -2
+_WKT = re.compile(r"^\s*(MULTIPOLYGON|POLYGON|POINT)\s*(?:ZM|Z|M)?\s*(\(.*\))\s*$", re.IGNORECASE | re.DOTALL)
+_WKT_TUPLE = re.compile(r"[-+0-9.eE]+(?:\s+[-+0-9.eE]+)+")
+
+Polygon = List[np.ndarray]  # exterior ring first, then holes; (n, 2) lon/lat arrays
+
+
+def _wkt_tuple(match) -> str:
+    return "[" + ",".join(repr(float(v)) for v in match.group(0).split()) + "]"
+
+
+def parse_boundary(boundary: str) -> List[Polygon]:
+    """
+    Polygons of a GeoJSON (Polygon, MultiPolygon, Point, or a Feature of one) or WKT
+    (POLYGON, MULTIPOLYGON, POINT) boundary. A point is a one-vertex polygon. Raises
+    ValueError for text that isn't either.
+    """
+    text = (boundary or "").strip()
+    if not text:
+        return []
+    if text.startswith("{"):
+        geometry = json.loads(text)
+        if geometry.get("type") == "Feature":
+            geometry = geometry.get("geometry") or {}
+        kind, coordinates = geometry.get("type"), geometry.get("coordinates") or []
+    else:
+        match = _WKT.match(text)
+        if not match:
+            raise ValueError("not GeoJSON or WKT")
+        kind = {"MULTIPOLYGON": "MultiPolygon", "POLYGON": "Polygon", "POINT": "Point"}[match.group(1).upper()]
+        nested = json.loads(_WKT_TUPLE.sub(_wkt_tuple, match.group(2)).replace("(", "[").replace(")", "]"))
+        coordinates = nested[0] if kind == "Point" else nested
+
+    if kind == "Point":
+        polygons = [[[coordinates]]]
+    elif kind == "Polygon":
+        polygons = [coordinates]
+    elif kind == "MultiPolygon":
+        polygons = coordinates
+    else:
+        raise ValueError(f"unsupported geometry type {kind!r}")
+    return [
+        [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon if len(ring)]
+        for polygon in polygons if polygon
+    ]
+
+
+def polygon_edges(polygons: List[Polygon]) -> np.ndarray:
+    """(E, 4) x0, y0, x1, y1 array of every ring's edges."""
+    rings = [ring for polygon in polygons for ring in polygon if len(ring) >= 3]
+    if not rings:
+        return np.empty((0, 4))
+    return np.concatenate([np.hstack([ring, np.roll(ring, -1, axis=0)]) for ring in rings])
+
+
+def _crossings(edges: np.ndarray, y: float) -> np.ndarray:
+    """Longitudes where the edges cross the parallel `y`."""
+    x0, y0, x1, y1 = edges.T
+    straddles = (y0 > y) != (y1 > y)
+    x0, y0, x1, y1 = x0[straddles], y0[straddles], x1[straddles], y1[straddles]
+    return x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+
+
+def _points_in_edges(px: np.ndarray, py: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Even-odd ray cast of points against one zone's (E, 4) x0, y0, x1, y1 edge array."""
+    inside = np.zeros(len(px), dtype=bool)
+    if not len(edges) or not len(px):
+        return inside
+    x0, y0, x1, y1 = edges.T
+    step = max(1, _CHUNK_CELLS // len(edges))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in range(0, len(px), step):
+            cx, cy = px[i:i + step, None], py[i:i + step, None]
+            straddles = (y0 > cy) != (y1 > cy)
+            crossing_x = x0 + (cy - y0) * (x1 - x0) / (y1 - y0)
+            inside[i:i + step] = np.count_nonzero(straddles & (cx < crossing_x), axis=1) % 2 == 1
+    return inside
+
+
+class ZoneGeometry:
+    """Zone polygons as edge arrays with a uniform grid index for vectorized point lookups."""
+
+    def __init__(self, zones: Iterable[Tuple[int, str]], resolution: int = GRID_RESOLUTION):
+        numbers, edge_arrays = [], []
+        for number, boundary in sorted(zones):
+            try:
+                polygons = parse_boundary(boundary)
+            except (ValueError, TypeError, KeyError, IndexError, AttributeError) as e:
+                logger.warning(f"Could not parse boundary of zone {number}: {e}")
+                continue
+            edges = polygon_edges(polygons)
+            if not len(edges):
+                continue
+            numbers.append(number)
+            edge_arrays.append(edges)
+        self.numbers = np.array(numbers, dtype=np.int64)
+        self._build_grid(edge_arrays, resolution)
+
+    def _build_grid(self, edge_arrays: List[np.ndarray], resolution: int):
+        zones = len(edge_arrays)
+        if not zones:
+            self.origin, self.cell, self.shape = np.zeros(2), 1.0, (0, 0)
+            self.cell_zone = np.full(0, NO_ZONE, dtype=np.int64)
+            self.cell_candidates = np.zeros((0, 0), dtype=bool)
+            self.row_edges: List[List[np.ndarray]] = []
+            return
+        points = np.concatenate([edges[:, :2] for edges in edge_arrays])
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        self.cell = float(max(hi - lo) / resolution) or 1e-6
+        self.origin = lo
+        nx, ny = np.floor((hi - lo) / self.cell).astype(int) + 1
+        self.shape = (ny, nx)
+
+        touched = np.zeros((zones, ny, nx), dtype=bool)
+        covers = np.zeros((zones, ny, nx), dtype=bool)
+        centres_x = lo[0] + (np.arange(nx) + 0.5) * self.cell
+        # zone -> grid row -> edges whose latitude range overlaps the row
+        self.row_edges = []
+        for z, edges in enumerate(edge_arrays):
+            ix = np.floor((edges[:, [0, 2]] - lo[0]) / self.cell).astype(int)
+            iy = np.floor((edges[:, [1, 3]] - lo[1]) / self.cell).astype(int)
+            # Cells each edge may pass through (its bounding box - conservative)
+            for x0, x1, y0, y1 in zip(ix.min(1), ix.max(1), iy.min(1), iy.max(1)):
+                touched[z, y0:y1 + 1, x0:x1 + 1] = True
+            row_min, row_max = iy.min(1), iy.max(1)
+            rows = []
+            for r in range(ny):
+                band = edges[(row_min <= r) & (row_max >= r)]
+                rows.append(band)
+                # Scanline through the row's cell centres: inside where an odd number of edges cross to the left
+                centre_y = lo[1] + (r + 0.5) * self.cell
+                crossings = np.sort(_crossings(band, centre_y))
+                covers[z, r] = np.searchsorted(crossings, centres_x, side="right") % 2 == 1
+            self.row_edges.append(rows)
+
+        # A cell no boundary crosses lies wholly inside (or outside) each zone, as its centre does
+        mixed = touched.any(axis=0)
+        first_cover = np.where(covers.any(axis=0), covers.argmax(axis=0), NO_ZONE)
+        self.cell_zone = np.where(mixed, _MIXED, first_cover).ravel()
+        # zone x cell: zones that may contain part of a mixed cell
+        self.cell_candidates = (touched | covers).reshape(zones, -1)
+
+    def lookup(self, lat, lon) -> np.ndarray:
+        """Zone number for each (lat, lon) pair, NO_ZONE where no zone contains the point."""
+        lat, lon = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(lat, dtype=np.float64)), np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        )
+        result = np.full(lat.shape, NO_ZONE, dtype=np.int64)
+        if not len(self.numbers):
+            return result
+
+        ny, nx = self.shape
+        ix = np.floor((lon - self.origin[0]) / self.cell)
+        iy = np.floor((lat - self.origin[1]) / self.cell)
+        on_grid = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        rows = np.where(on_grid, iy, 0).astype(np.int64)
+        cells = rows * nx + np.where(on_grid, ix, 0).astype(np.int64)
+        state = np.where(on_grid, self.cell_zone[cells], NO_ZONE)
+
+        solid = state >= 0
+        result[solid] = self.numbers[state[solid]]
+
+        pending = np.flatnonzero(state == _MIXED)
+        for z in range(len(self.numbers)):
+            if not len(pending):
+                break
+            candidates = pending[self.cell_candidates[z, cells[pending]]]
+            # Ray cast per grid row against only the edges spanning that row
+            candidates = candidates[np.argsort(rows[candidates], kind="stable")]
+            row_values, starts = np.unique(rows[candidates], return_index=True)
+            hits = [
+                group[_points_in_edges(lon[group], lat[group], self.row_edges[z][r])]
+                for r, group in zip(row_values, np.split(candidates, starts[1:]))
+            ]
+            if hits:
+                hits = np.concatenate(hits)
+                result[hits] = self.numbers[z]
+                pending = np.setdiff1d(pending, hits, assume_unique=True)
+        return result
+
+    def locate(self, lat: float, lon: float) -> Optional[int]:
+        """Zone number containing one point, or None."""
+        number = int(self.lookup(lat, lon)[0])
+        return None if number == NO_ZONE else number
+
+
+_cache: Dict[str, object] = {"geometry": None, "built": 0.0}
+_cache_lock = threading.Lock()
+
+
+def zone_geometry() -> ZoneGeometry:
+    """This process's ZoneGeometry, built from the Zone table on first use."""
+    with _cache_lock:
+        if _cache["geometry"] is None or time.monotonic() - _cache["built"] > GEOMETRY_TTL:
+            started = time.monotonic()
+            _cache["geometry"] = ZoneGeometry(Zone.objects.values_list("zoneNumber", "boundary"))
+            _cache["built"] = time.monotonic()
+            logger.debug(f"Built zone geometry in {_cache['built'] - started:.3f}s")
+        return _cache["geometry"]
+
+
+def invalidate_zone_geometry(**kwargs):
+    """Drop the cached geometry; connected to Zone saves and deletes."""
+    with _cache_lock:
+        _cache["geometry"] = None
+
+
+def locate_zone(lat: float, lon: float) -> Optional[int]:
+    """Number of the zone containing the point, from the cached geometry."""
+    return zone_geometry().locate(lat, lon)